@@ -0,0 +1,292 @@
+# -*- coding: utf-8 -*-
+"""
+端到端吞吐压测：让 batch_crawl.run_batch / crawl_all_hanzi 对本地替身站点（mock_hanyuguoxue.py）完整跑一遍。
+
+ - 抓取走真实的 requests / BeautifulSoup 解析 / 检查点库 / 写线程，只把站点根地址换成替身；
+ - 写库使用 SQLite 存储后端（common/storage.py），写库代码路径与 MySQL 相同，在临时目录中建库；
+ - 退避基数缩短为 --backoff-base 秒，注入的限流风暴能在压测时间内恢复；
+ - 汇总 entries/sec、成功/失败/缺失数、替身站点的请求计数与风暴后的恢复时间，
+   追加到 bench/bench_results.csv（同一 CSV 可比较不同参数或不同提交的结果）。
+
+用法：
+    python bench/bench_crawl.py chengyu --entries 2000 --latency 0.02
+    python bench/bench_crawl.py ciyu --entries 2000 --error-rate 0.01
+    python bench/bench_crawl.py chengyu --entries 500 --storm-status 429 --storm-after 200 --storm-seconds 5
+    python bench/bench_crawl.py hanzi --entries 200
+"""
+import argparse
+import csv
+import importlib
+import os
+import shutil
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(BENCH_DIR)
+sys.path.insert(0, ROOT)
+sys.path.insert(0, BENCH_DIR)
+
+from common.checkpoint_store import CheckpointStore
+from common.dashboard import start_dashboard
+from common.metrics_csv import append_metrics_row
+from mock_hanyuguoxue import MockHanyuguoxue, storm_status_arg
+
+RESULTS_PATH = os.path.join(BENCH_DIR, 'bench_results.csv')
+HANZI_START = 0x4E00
+
+TARGETS = {
+    # target: (目录, 抓取模块, 数据库模块, 基础表, 名称列)
+    'chengyu': ('chengyu', 'extract_chengyu', 'chengyu_mysql', 'hanyuguoxue_chengyu', 'chengyu'),
+    'ciyu': ('ciyu', 'extract_ciyu', 'ciyu_mysql', 'hanyuguoxue_ciyu', 'word'),
+}
+
+
+def synthetic_names(target, n):
+    prefix = '压测成语' if target == 'chengyu' else '压测词语'
+    return [f'{prefix}{i:06d}' for i in range(n)]
+
+
+def load_target(target, workdir, backoff_base=1, backoff_max=4):
+    """
+    导入 target 的 batch_crawl / 抓取模块 / 数据库模块并切换到压测配置（SQLite、临时目录、短退避）。
+    同一进程只能加载一个词表目标（两个目录的模块同名）。返回 (batch_crawl, extract, db)。
+    """
+    directory, extract_name, db_name, _, _ = TARGETS[target]
+    sys.path.insert(0, os.path.join(ROOT, directory))
+    db = importlib.import_module(db_name)
+    db.TEST_MODE = False
+    db.STORAGE_BACKEND = 'sqlite'
+    db.SQLITE_PATH = os.path.join(workdir, f'{target}.db')
+    extract = importlib.import_module(extract_name)
+    batch_crawl = importlib.import_module('batch_crawl')
+    batch_crawl.CSV_PATH = os.path.join(workdir, 'batch_metrics.csv')
+    batch_crawl.RETRY_BACKOFF_BASE = backoff_base
+    batch_crawl.RETRY_BACKOFF_MAX = backoff_max
+    return batch_crawl, extract, db
+
+
+def crawl_words(batch_crawl, store, batch_size, jitter_max=0.0, frontier=None):
+    """
+    按 batch_size 分批调用 run_batch 直到没有 queued 项或批次未完成，返回各批 metrics 列表。
+
+    frontier 为 PriorityFrontier 时按优先级取批（与 batch_crawl.main 的 SCHEDULING = 'priority' 相同），否则按 seq 顺序。
+    批次因断网 / 持续封禁终止（run_batch 抛出 KeyboardInterrupt）时，从指标 CSV 读出该批指标后停止；真正的 Ctrl+C 照常抛出。
+    """
+    all_metrics = []
+    offset = 0
+    while True:
+        chunk = frontier.pop_batch(batch_size) if frontier is not None else store.next_queued(batch_size)
+        if not chunk:
+            break
+        try:
+            metrics, chunk_processed = batch_crawl.run_batch(
+                store.next_batch_idx(), chunk, store, request_delay=0.0, search_delay=0.0, jitter_max=jitter_max,
+                processed_offset_start=offset, is_last_batch=len(chunk) < batch_size)
+        except KeyboardInterrupt:
+            last = last_metrics_row(batch_crawl.CSV_PATH)
+            if not last or last.get('termination_reason') not in ('network_outage', 'blocked_ip'):
+                raise
+            all_metrics.append({k: _num(v) for k, v in last.items()})
+            break
+        all_metrics.append(metrics)
+        offset += chunk_processed
+        if chunk_processed < len(chunk):
+            break
+    return all_metrics
+
+
+def _num(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        try:
+            return float(value)
+        except (TypeError, ValueError):
+            return value
+
+
+def last_metrics_row(csv_path):
+    """返回指标 CSV 的最后一行（dict），文件不存在时返回 None。"""
+    if not os.path.exists(csv_path):
+        return None
+    with open(csv_path, 'r', encoding='utf-8-sig', newline='') as f:
+        rows = list(csv.DictReader(f))
+    return rows[-1] if rows else None
+
+
+def count_rows(db, table, key):
+    """返回 (已爬取行数, 重复键行数)。"""
+    conn = db.get_database_connection()
+    try:
+        cur = conn.cursor()
+        cur.execute(f"SELECT COUNT(*) AS n FROM {table} WHERE url IS NOT NULL")
+        crawled = cur.fetchone()['n']
+        cur.execute(f"SELECT COUNT(*) - COUNT(DISTINCT {key}) AS n FROM {table}")
+        duplicates = cur.fetchone()['n']
+        return crawled, duplicates
+    finally:
+        conn.close()
+
+
+def bench_words(target, args, faults, workdir):
+    batch_crawl, extract, db = load_target(target, workdir, args.backoff_base, args.backoff_max)
+    batch_crawl.DB_WRITERS = args.writers
+    batch_crawl.METRICS.serve(args.metrics_port)
+    batch_crawl.PROFILE_MODE = args.profile
+    batch_crawl.MEMORY_PROFILE = args.memory
+    names = synthetic_names(target, args.entries)
+    # 再加入少量替身站点不收录的词条，覆盖搜索未命中路径
+    missing = [f'未收录{i:04d}' for i in range(args.missing)]
+    site = MockHanyuguoxue(**{target: names}, faults=faults, seed=args.seed).start()
+    extract.BASE_URL = site.base_url
+    store = CheckpointStore(os.path.join(workdir, 'checkpoint.sqlite3'))
+    store.enqueue(names + missing)
+    batch_crawl.METRICS.set_progress(store.total())
+    dashboard = start_dashboard(batch_crawl.METRICS, enabled=args.dashboard, summary_interval=5.0)
+    t0 = time.perf_counter()
+    try:
+        all_metrics = crawl_words(batch_crawl, store, args.batch_size, args.jitter)
+    finally:
+        elapsed = time.perf_counter() - t0
+        dashboard.stop()
+        site.stop()
+    _, _, _, table, key = TARGETS[target]
+    crawled, duplicates = count_rows(db, table, key)
+    counts = store.counts()
+    store.close()
+    return {
+        'entries': len(names) + len(missing),
+        'processed': sum(m['processed'] for m in all_metrics),
+        'success': sum(m['success'] for m in all_metrics),
+        'fail': sum(m['fail'] for m in all_metrics),
+        'missing_detail_pages': sum(m['missing_detail_pages'] for m in all_metrics),
+        'rows_in_db': crawled,
+        'duplicate_rows': duplicates,
+        'checkpoint_counts': counts,
+        'termination_reason': all_metrics[-1]['termination_reason'] if all_metrics else '',
+        'db_writers': args.writers,
+        'writer_rows_per_sec': all_metrics[-1].get('writer_rows_per_sec', '') if all_metrics else '',
+        'elapsed_seconds': round(elapsed, 3),
+        'entries_per_sec': round(sum(m['processed'] for m in all_metrics) / elapsed, 3) if elapsed > 0 else 0.0,
+        'mock': site.stats(),
+    }
+
+
+def bench_hanzi(args, faults, workdir):
+    sys.path.insert(0, os.path.join(ROOT, 'hanzi'))
+    hanyuguoxue = importlib.import_module('hanyuguoxue')
+    hanyuguoxue.HANZI_STORAGE_BACKEND = 'sqlite'
+    hanyuguoxue.HANZI_SQLITE_PATH = os.path.join(workdir, 'hanzi.db')
+    hanyuguoxue.HANZI_METRICS_PORT = args.metrics_port
+    hanyuguoxue.HANZI_PROFILE_MODE = args.profile
+    hanyuguoxue.HANZI_PROFILE_DIR = workdir
+    hanyuguoxue.HANZI_MEMORY_PROFILE = args.memory
+    hanyuguoxue.HANZI_DASHBOARD = args.dashboard
+    end = HANZI_START + args.entries - 1
+    site = MockHanyuguoxue(zidian_range=(HANZI_START, end), faults=faults, seed=args.seed).start()
+    hanyuguoxue.HANZI_BASE_URL = site.base_url
+    t0 = time.perf_counter()
+    try:
+        hanyuguoxue.crawl_all_hanzi(HANZI_START, end, save_to_database=True)
+    finally:
+        elapsed = time.perf_counter() - t0
+        site.stop()
+    conn = hanyuguoxue.get_database_connection()
+    try:
+        cur = conn.cursor()
+        cur.execute("SELECT COUNT(*) AS n FROM hanyuguoxue_hanzi")
+        rows = cur.fetchone()['n']
+    finally:
+        conn.close()
+    return {
+        'entries': args.entries,
+        'processed': args.entries,
+        'rows_in_db': rows,
+        'elapsed_seconds': round(elapsed, 3),
+        'entries_per_sec': round(args.entries / elapsed, 3) if elapsed > 0 else 0.0,
+        'mock': site.stats(),
+    }
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description='对本地替身站点做端到端吞吐压测')
+    parser.add_argument('target', choices=['chengyu', 'ciyu', 'hanzi'])
+    parser.add_argument('--entries', type=int, default=1000, help='替身站点收录的词条数 / 汉字数')
+    parser.add_argument('--missing', type=int, default=0, help='额外加入的未收录词条数（搜索未命中）')
+    parser.add_argument('--batch-size', type=int, default=1000)
+    parser.add_argument('--writers', type=int, default=1, help='batch_crawl.DB_WRITERS（写库线程数）')
+    parser.add_argument('--jitter', type=float, default=0.0, help='run_batch 的 jitter_max（秒）')
+    parser.add_argument('--backoff-base', type=float, default=1.0, help='压测时的退避基数（秒）')
+    parser.add_argument('--backoff-max', type=float, default=4.0, help='压测时的最大退避（秒）')
+    parser.add_argument('--latency', type=float, default=0.0)
+    parser.add_argument('--jitter-latency', type=float, default=0.0)
+    parser.add_argument('--error-rate', type=float, default=0.0)
+    parser.add_argument('--timeout-rate', type=float, default=0.0)
+    parser.add_argument('--truncate-rate', type=float, default=0.0)
+    parser.add_argument('--drop-rate', type=float, default=0.0)
+    parser.add_argument('--storm-status', type=storm_status_arg, default=None, help="状态码或 'drop'（断开连接）")
+    parser.add_argument('--storm-after', type=int, default=0)
+    parser.add_argument('--storm-seconds', type=float, default=0.0)
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--metrics-port', type=int, default=None,
+                        help='压测期间在 127.0.0.1 的该端口提供 /metrics（可用 curl 观察实时指标）')
+    parser.add_argument('--profile', choices=['sample', 'cprofile'], default=None,
+                        help='每批写 batch_{idx}.prof / .collapsed 到临时目录（配合 --keep 保留）')
+    parser.add_argument('--memory', action='store_true',
+                        help='开启 tracemalloc，每批写 batch_{idx}_memory.txt 到临时目录（配合 --keep 保留）')
+    parser.add_argument('--dashboard', action='store_true',
+                        help='压测期间显示终端仪表盘（输出不是终端时每 5 秒一行汇总）')
+    parser.add_argument('--label', default='', help='写入结果 CSV 的标签（如提交号）')
+    parser.add_argument('--keep', action='store_true', help='保留临时目录（数据库与指标 CSV）')
+    return parser
+
+
+def faults_from_args(args):
+    return {
+        'latency': args.latency, 'jitter': args.jitter_latency, 'error_rate': args.error_rate,
+        'timeout_rate': args.timeout_rate, 'truncate_rate': args.truncate_rate, 'drop_rate': args.drop_rate,
+        'storm_status': args.storm_status, 'storm_after': args.storm_after, 'storm_seconds': args.storm_seconds,
+    }
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    faults = faults_from_args(args)
+    workdir = tempfile.mkdtemp(prefix=f'bench_{args.target}_')
+    try:
+        if args.target == 'hanzi':
+            result = bench_hanzi(args, faults, workdir)
+        else:
+            result = bench_words(args.target, args, faults, workdir)
+    finally:
+        if args.keep:
+            print('临时目录已保留:', workdir)
+        else:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    mock = result.pop('mock')
+    checkpoint_counts = result.pop('checkpoint_counts', None)
+    print('=' * 60)
+    print(f"{args.target}: {result['processed']}/{result['entries']} 条，耗时 {result['elapsed_seconds']}s，"
+          f"{result['entries_per_sec']} entries/s，入库 {result['rows_in_db']} 行")
+    if checkpoint_counts:
+        print('检查点状态:', checkpoint_counts)
+    print('替身站点请求:', mock['requests'], mock['by_route_status'])
+    if mock['recovery_seconds'] is not None:
+        print(f"风暴结束后 {mock['recovery_seconds']}s 恢复第一个成功响应")
+
+    row = dict(
+        run_ts=datetime.now().isoformat(timespec='seconds'), label=args.label, target=args.target,
+        **result, requests=mock['requests'], recovery_seconds=mock['recovery_seconds'],
+        **{k: v for k, v in faults.items()},
+    )
+    append_metrics_row(RESULTS_PATH, row)
+    print('结果已追加到', RESULTS_PATH)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
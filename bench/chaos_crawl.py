@@ -0,0 +1,270 @@
+# -*- coding: utf-8 -*-
+"""
+故障注入（混沌）测试：验证 batch_crawl.py 在限流风暴、部分断网与慢响应下的恢复能力。
+
+每个场景 × 每种调度方式（fifo / priority）各跑一次，流程与真实运行一致：
+ 1. 第一阶段：替身站点（mock_hanyuguoxue.py）按场景注入故障，run_batch 分批爬取，
+    直到全部完成或批次因 network_outage / blocked_ip 终止；
+ 2. 第二阶段（模拟重启）：清除故障，replay_fetched 回放已抓取未写库的词条，再按同一调度方式续爬剩余词条。
+
+度量与判定（任一项不满足记为 FAIL，进程返回 1，便于在吞吐改动后回归）：
+    termination_reason    第一阶段最后一批的终止原因，须与场景预期一致
+    recovery_seconds      风暴结束到替身站点返回第一个 200 的秒数，须不超过 --backoff-max + 1
+    lost_work             检查点标记为 saved 但库中没有的词条 + 第二阶段后仍停在 fetched 的词条，须为 0
+    duplicate_writes      同一词条被写库的多余次数（包装 batch_crawl.save_*_to_db / save_*_batch_to_db 计数），须为 0
+    duplicate_rows        基础表中重复键的行数，须为 0
+    complete              第二阶段后所有收录词条都已入库、没有 queued / failed，须为真
+    refetches             替身站点详情页 200 响应数超出 DETAIL_FETCHES_PER_ENTRY × 入库词条数的部分
+                          （超时后服务端仍会记一次 200，只做记录不判定）
+
+结果打印为表格并追加到 bench/chaos_results.csv。两个词表目标的模块同名，每次运行只能测一个目标。
+
+用法：
+    python bench/chaos_crawl.py chengyu
+    python bench/chaos_crawl.py ciyu --scenarios storm_429_short,outage_short --modes fifo
+"""
+import argparse
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, BENCH_DIR)
+
+from bench_crawl import TARGETS, count_rows, crawl_words, load_target, synthetic_names
+from common.checkpoint_store import SAVED, CheckpointStore
+from common.frontier import PriorityFrontier, score_priority
+from common.metrics_csv import append_metrics_row
+from mock_hanyuguoxue import MockHanyuguoxue
+
+RESULTS_PATH = os.path.join(BENCH_DIR, 'chaos_results.csv')
+COMPLETED = ('batch_completed', 'all_done')
+
+# 每个入库词条在替身站点上产生的详情页 200 数：搜索 302 跟随跳转一次 + 爬虫再请求详情页一次
+DETAIL_FETCHES_PER_ENTRY = 2
+# 风暴从第 STORM_AFTER_FRACTION × 请求数 个请求之后开始（每个词条约 2 个请求：搜索 + 详情页）
+STORM_AFTER_FRACTION = 0.5
+
+SCENARIOS = {
+    # name: (故障参数, 第一阶段预期终止原因：str 或 {target: str})
+    'baseline': ({}, COMPLETED),
+    'storm_429_short': ({'storm_status': 429, 'storm_seconds': 3.0}, COMPLETED),
+    'storm_503_short': ({'storm_status': 503, 'storm_seconds': 3.0}, COMPLETED),
+    'outage_short': ({'storm_status': 'drop', 'storm_seconds': 3.0}, COMPLETED),
+    # 搜索会跟随 302 再请求一次详情页，单次尝试的失败概率约为 2 × (drop_rate + truncate_rate)
+    'partial_outage': ({'drop_rate': 0.02, 'truncate_rate': 0.02}, COMPLETED),
+    'slow_responses': ({'latency': 0.01, 'jitter': 0.02, 'timeout_rate': 0.003, 'hang_seconds': 10.5}, COMPLETED),
+    # 持续封禁：成语把 403 视为限流，最大退避后以 blocked_ip 终止；词语对 403 走 raise_for_status，按断网处理
+    'ban_persistent': ({'storm_status': 403, 'storm_seconds': 3600.0},
+                       {'chengyu': ('blocked_ip',), 'ciyu': ('network_outage',)}),
+    'outage_persistent': ({'storm_status': 'drop', 'storm_seconds': 3600.0}, ('network_outage',)),
+}
+MODES = ('fifo', 'priority')
+CLEAR_FAULTS = {'latency': 0.0, 'jitter': 0.0, 'error_rate': 0.0, 'timeout_rate': 0.0, 'truncate_rate': 0.0,
+                'drop_rate': 0.0, 'storm_status': None}
+
+
+def _counting_writers(batch_crawl, target, key, writes):
+    """包装 batch_crawl 中的写库函数（写线程用的整批写入、回放用的逐条写入），按词条统计写入次数；返回原函数以便恢复。"""
+    originals = {}
+
+    def count(item):
+        name = (item.get('data') or {}).get(key)
+        writes[name] = writes.get(name, 0) + 1
+
+    def wrap_one(original):
+        def save(item, *args, **kwargs):
+            count(item)
+            return original(item, *args, **kwargs)
+        return save
+
+    def wrap_batch(original):
+        def save(items, *args, **kwargs):
+            for item in items:
+                count(item)
+            return original(items, *args, **kwargs)
+        return save
+
+    for name, wrap in ((f'save_{target}_to_db', wrap_one), (f'save_{target}_batch_to_db', wrap_batch)):
+        originals[name] = getattr(batch_crawl, name)
+        setattr(batch_crawl, name, wrap(originals[name]))
+    return originals
+
+
+def _frontier(store, mode):
+    return PriorityFrontier.from_store(store) if mode == 'priority' else None
+
+
+def _expected(expect, target):
+    return expect.get(target, ()) if isinstance(expect, dict) else expect
+
+
+def lost_work(db, table, key, store):
+    """返回 (检查点为 saved 但库中没有的词条数, 仍停在 fetched 的词条数)。"""
+    saved = store.names_with_status(SAVED)
+    conn = db.get_database_connection()
+    try:
+        cur = conn.cursor()
+        cur.execute(f"SELECT {key} AS name FROM {table} WHERE url IS NOT NULL")
+        in_db = {row['name'] for row in cur.fetchall()}
+    finally:
+        conn.close()
+    return sum(1 for name in saved if name not in in_db), len(store.fetched_items())
+
+
+def run_scenario(ctx, scenario, mode, args):
+    """跑一个 场景 × 调度方式，返回结果行（dict）。"""
+    target, batch_crawl, extract, db = ctx['target'], ctx['batch_crawl'], ctx['extract'], ctx['db']
+    faults, expect = SCENARIOS[scenario]
+    _, _, _, table, key = TARGETS[target]
+    workdir = tempfile.mkdtemp(prefix=f'chaos_{target}_{scenario}_{mode}_', dir=ctx['workdir'])
+    db.SQLITE_PATH = os.path.join(workdir, f'{target}.db')
+    batch_crawl.CSV_PATH = os.path.join(workdir, 'batch_metrics.csv')
+
+    names = synthetic_names(target, args.entries)
+    missing = [f'未收录{i:04d}' for i in range(args.missing)]
+    faults = dict(faults)
+    if 'storm_status' in faults:
+        faults['storm_after'] = int(args.entries * 2 * STORM_AFTER_FRACTION)
+    site = MockHanyuguoxue(**{target: names}, faults=faults, seed=args.seed).start()
+    extract.BASE_URL = site.base_url
+    store = CheckpointStore(os.path.join(workdir, 'checkpoint.sqlite3'))
+    store.enqueue(names + missing)
+    if mode == 'priority':
+        rng = random.Random(args.seed)
+        store.set_priorities((name, score_priority(degree=rng.randint(0, 50), mentions=rng.randint(0, 200),
+                                                   is_common=rng.random() < 0.2))
+                             for name in names + missing)
+
+    writes = {}
+    originals = _counting_writers(batch_crawl, target, key, writes)
+    try:
+        print(f'--- {target} / {scenario} / {mode}: 第一阶段（故障注入 {faults or "无"}）')
+        t0 = time.perf_counter()
+        phase1 = crawl_words(batch_crawl, store, args.batch_size, frontier=_frontier(store, mode))
+        phase1_seconds = time.perf_counter() - t0
+        storm = site.stats()
+
+        print(f'--- {target} / {scenario} / {mode}: 第二阶段（清除故障、回放并续爬）')
+        site.set_faults(**CLEAR_FAULTS)
+        t1 = time.perf_counter()
+        replayed = batch_crawl.replay_fetched(store)
+        phase2 = crawl_words(batch_crawl, store, args.batch_size, frontier=_frontier(store, mode))
+        phase2_seconds = time.perf_counter() - t1
+        final = site.stats()
+    finally:
+        for name, original in originals.items():
+            setattr(batch_crawl, name, original)
+        site.stop()
+
+    crawled, duplicate_rows = count_rows(db, table, key)
+    lost_saved, stuck_fetched = lost_work(db, table, key, store)
+    counts = store.counts()
+    store.close()
+    if not args.keep:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    reason = phase1[-1]['termination_reason'] if phase1 else ''
+    detail_ok = final['by_route_status'].get(f'{target}_detail 200', 0)
+    result = {
+        'run_ts': datetime.now().isoformat(timespec='seconds'), 'label': args.label,
+        'target': target, 'scenario': scenario, 'mode': mode, 'entries': len(names) + len(missing),
+        'termination_reason': reason,
+        'phase1_processed': sum(m['processed'] for m in phase1),
+        'phase1_fail': sum(m['fail'] for m in phase1),
+        'phase1_seconds': round(phase1_seconds, 3),
+        'recovery_seconds': storm['recovery_seconds'],
+        'replayed': replayed,
+        'phase2_processed': sum(m['processed'] for m in phase2),
+        'phase2_seconds': round(phase2_seconds, 3),
+        'rows_in_db': crawled,
+        'duplicate_rows': duplicate_rows,
+        'duplicate_writes': sum(n - 1 for n in writes.values() if n > 1),
+        'lost_work': lost_saved + stuck_fetched,
+        'refetches': max(0, detail_ok - DETAIL_FETCHES_PER_ENTRY * crawled),
+        'requests': final['requests'],
+        'checkpoint_counts': ' '.join(f'{k}={v}' for k, v in sorted(counts.items())),
+    }
+    result['complete'] = (crawled == len(names) and counts.get('saved', 0) == len(names)
+                          and not counts.get('queued') and not counts.get('failed') and not counts.get('fetched'))
+
+    failures = []
+    if reason not in _expected(expect, target):
+        failures.append(f'termination_reason={reason}')
+    if storm['recovery_seconds'] is not None and storm['recovery_seconds'] > args.backoff_max + 1:
+        failures.append(f"recovery_seconds={storm['recovery_seconds']}")
+    for k in ('lost_work', 'duplicate_writes', 'duplicate_rows'):
+        if result[k]:
+            failures.append(f'{k}={result[k]}')
+    if reason in COMPLETED and result['phase1_fail']:
+        failures.append(f"phase1_fail={result['phase1_fail']}")
+    if not result['complete']:
+        failures.append('incomplete')
+    result['verdict'] = 'PASS' if not failures else 'FAIL: ' + ', '.join(failures)
+    return result
+
+
+def print_table(results):
+    cols = ('scenario', 'mode', 'termination_reason', 'recovery_seconds', 'lost_work', 'duplicate_writes',
+            'refetches', 'phase1_seconds', 'verdict')
+    widths = [max(len(c), *(len(str(r[c])) for r in results)) for c in cols]
+    print('  '.join(c.ljust(w) for c, w in zip(cols, widths)))
+    for r in results:
+        print('  '.join(str(r[c]).ljust(w) for c, w in zip(cols, widths)))
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description='对本地替身站点做故障注入测试（恢复时间、丢失工作、重复写入）')
+    parser.add_argument('target', choices=sorted(TARGETS))
+    parser.add_argument('--scenarios', default=','.join(SCENARIOS), help='逗号分隔的场景名')
+    parser.add_argument('--modes', default=','.join(MODES), help='逗号分隔的调度方式（fifo / priority）')
+    parser.add_argument('--entries', type=int, default=200, help='替身站点收录的词条数')
+    parser.add_argument('--missing', type=int, default=5, help='额外加入的未收录词条数')
+    parser.add_argument('--batch-size', type=int, default=50)
+    parser.add_argument('--writers', type=int, default=1, help='batch_crawl.DB_WRITERS（写库线程数）')
+    parser.add_argument('--backoff-base', type=float, default=1.0, help='测试时的退避基数（秒）')
+    parser.add_argument('--backoff-max', type=float, default=4.0, help='测试时的最大退避（秒）')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--label', default='', help='写入结果 CSV 的标签（如提交号）')
+    parser.add_argument('--keep', action='store_true', help='保留各场景的临时目录')
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    scenarios = [s for s in args.scenarios.split(',') if s]
+    modes = [m for m in args.modes.split(',') if m]
+    unknown = [s for s in scenarios if s not in SCENARIOS] + [m for m in modes if m not in MODES]
+    if unknown:
+        print('未知的场景或调度方式:', ', '.join(unknown))
+        return 2
+
+    workdir = tempfile.mkdtemp(prefix=f'chaos_{args.target}_')
+    batch_crawl, extract, db = load_target(args.target, workdir, args.backoff_base, args.backoff_max)
+    batch_crawl.DB_WRITERS = args.writers
+    ctx = {'target': args.target, 'batch_crawl': batch_crawl, 'extract': extract, 'db': db, 'workdir': workdir}
+    results = []
+    try:
+        for scenario in scenarios:
+            for mode in modes:
+                result = run_scenario(ctx, scenario, mode, args)
+                append_metrics_row(RESULTS_PATH, result)
+                results.append(result)
+    finally:
+        if args.keep:
+            print('临时目录已保留:', workdir)
+        else:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    print('=' * 60)
+    print_table(results)
+    print('结果已追加到', RESULTS_PATH)
+    return 0 if all(r['verdict'] == 'PASS' for r in results) else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
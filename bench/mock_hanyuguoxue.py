@@ -0,0 +1,395 @@
+# -*- coding: utf-8 -*-
+"""
+本地的汉语国学站点替身（压测 / 故障注入用）。
+
+不访问真实站点就无法压测 batch_crawl.py，而真实压测又会被封。这里用标准库 http.server 起一个本地服务：
+
+ - `/chengyu/search?words=X`、`/cidian/search?words=X`：与真实站点一样，精确命中时 302 跳转到详情页，
+   否则返回不含对应 <h1> 的搜索结果页（爬虫记为 missing_detail_pages）；
+ - `/chengyu/cy-<n>.html`、`/cidian/ci-<n>.html`、`/zidian/zi-<unicode>`：详情页；
+ - 页面优先取 fixtures/<chengyu|ciyu|zidian>/<名称>.html 中录制的真实页面（`python mock_hanyuguoxue.py record ...`），
+   没有录制的词条按解析器所需的结构生成（近/反义词取词表中的相邻词条，以覆盖关系写入）。
+
+故障注入（set_faults() 或 `POST /__faults` JSON，`GET /__stats` 查看计数）：
+    latency / jitter      每个请求固定延迟 + 0~jitter 的随机延迟（秒）
+    error_rate            以该概率返回 error_statuses 中的随机状态码（429 / 403 / 503）
+    timeout_rate          以该概率挂起 hang_seconds 秒后才响应（爬虫 timeout=10s，用于制造超时）
+    truncate_rate         以该概率只发送一半正文后断开（Content-Length 不符，requests 抛 ChunkedEncodingError）
+    drop_rate             以该概率不响应直接断开连接（ConnectionError）
+    storm_status          风暴期间所有请求都返回该状态码；'drop' 表示风暴期间直接断开连接（模拟断网）；None 表示关闭
+    storm_after           第几个请求之后开始风暴
+    storm_seconds         风暴持续秒数
+风暴结束时间与其后第一个 200 响应的时间会记录在 stats() 中，用于计算恢复时间。
+
+用法：
+    python mock_hanyuguoxue.py serve --port 8765 --latency 0.05 --error-rate 0.01
+    python mock_hanyuguoxue.py record chengyu 一心一意 画蛇添足
+"""
+import argparse
+import json
+import os
+import random
+import re
+import socket
+import sys
+import threading
+import time
+import urllib.parse
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures')
+REAL_BASE_URL = 'https://www.hanyuguoxue.com'
+
+DEFAULT_FAULTS = {
+    'latency': 0.0,
+    'jitter': 0.0,
+    'error_rate': 0.0,
+    'error_statuses': [429, 403, 503],
+    'timeout_rate': 0.0,
+    'hang_seconds': 12.0,
+    'truncate_rate': 0.0,
+    'drop_rate': 0.0,
+    'storm_status': None,
+    'storm_after': 0,
+    'storm_seconds': 0.0,
+}
+
+KINDS = {
+    # kind: (搜索路径, 详情页前缀)
+    'chengyu': ('/chengyu/search', '/chengyu/cy-'),
+    'ciyu': ('/cidian/search', '/cidian/ci-'),
+}
+
+
+# ================= 生成页面 =================
+
+def _chengyu_page(name, synonyms, antonyms):
+    syn = ''.join(f'<a href="#">{s}</a>' for s in synonyms)
+    ant = ''.join(f'<a href="#">{a}</a>' for a in antonyms)
+    pinyin = ''.join(f'<span>py{i}</span>' for i in range(len(name)))
+    return (
+        f'<html><body><div class="ci-title"><h1>{name}</h1><div class="pinyin">{pinyin}</div></div>'
+        '<div class="ci-attrs">'
+        f'<p>注音：ㄅㄆㄇ</p><p>感情：<a href="#">中性</a></p>'
+        f'<p>近义词：{syn}</p><p>反义词：{ant}</p></div>'
+        '<div class="ci-content">'
+        f'<p class="explain primary">{name}的释义。<button class="btn-copy">复制</button></p>'
+        f'<p class="ext">出处：某书</p><p class="ext">用法：作谓语</p><p class="ext">例子：{name}的例句</p></div>'
+        '<ol class="ci-fanyi"><li><label>英语</label>translation</li></ol>'
+        '</body></html>'
+    )
+
+
+def _ciyu_page(name, synonyms, antonyms):
+    syn = ''.join(f'<a href="#">{s}</a>' for s in synonyms)
+    ant = ''.join(f'<a href="#">{a}</a>' for a in antonyms)
+    return (
+        '<html><body><div class="ci-title-wrap">'
+        f'<h1>{name}</h1><div class="pinyin"><span>py</span></div><div class="ci-tag">常用词</div></div>'
+        '<div class="ci-attrs">'
+        '<p><label>注音</label><span>ㄅㄆㄇ</span></p><p><label>词性</label><span>名词</span></p>'
+        f'<p><label>近义词</label><span class="ci-list">{syn}</span></p>'
+        f'<p><label>反义词</label><span class="ci-list">{ant}</span></p></div>'
+        f'<div><div><h3>网络解释</h3></div><div>{name}的网络解释。</div></div>'
+        '</body></html>'
+    )
+
+
+def _zidian_page(unicode_decimal):
+    char = chr(unicode_decimal)
+    return (
+        '<html><body><div class="card" data-id="基本信息"><div class="zi-title">'
+        f'<h2>{char}</h2><div class="pinyin"><span class="voice" data-voice="x.mp3">'
+        '<em class="py">zì</em><em class="zy">ㄗˋ</em></span></div>'
+        f'<div class="zi-title-extra"><span>部首：一部</span><span>共 1 画</span><span>独体字</span>'
+        f'<span>U+{unicode_decimal:X}</span></div></div></div>'
+        f'<div class="card"><h2 id="zyzx">{char}的字源字形</h2><div class="zi-zyxc">'
+        f'<p><img alt="{char}-甲骨文" src="/static/zy-{unicode_decimal}.png"><span class="period">商</span>'
+        '<span class="style">甲骨文</span><span class="source">合集</span></p></div></div>'
+        '</body></html>'
+    )
+
+
+def _search_miss_page(name):
+    return f'<html><body><h1>搜索结果</h1><p>未找到“{name}”的精确匹配。</p></body></html>'
+
+
+def _load_fixture(kind, name):
+    path = os.path.join(FIXTURES_DIR, kind, f'{name}.html')
+    if os.path.exists(path):
+        with open(path, 'r', encoding='utf-8') as f:
+            return f.read()
+    return None
+
+
+# ================= 服务 =================
+
+class MockHanyuguoxue:
+    """
+    本地替身站点。
+
+    Args:
+        chengyu / ciyu: 可命中的词条列表（顺序决定详情页编号与生成页面中的近/反义词）
+        zidian_range: (start, end) 可命中的 Unicode 范围（含两端）
+        faults: 覆盖 DEFAULT_FAULTS 的故障配置
+        seed: 随机故障的种子（相同种子、相同请求序列得到相同故障）
+    """
+
+    def __init__(self, chengyu=(), ciyu=(), zidian_range=None, faults=None, host='127.0.0.1', port=0, seed=None):
+        self.entries = {'chengyu': list(chengyu), 'ciyu': list(ciyu)}
+        self.index = {kind: {n: i for i, n in enumerate(names)} for kind, names in self.entries.items()}
+        self.zidian_range = zidian_range
+        self.faults = dict(DEFAULT_FAULTS)
+        self.lock = threading.Lock()
+        self.rng = random.Random(seed)
+        self._reset_stats()
+        if faults:
+            self.set_faults(**faults)
+        self.httpd = ThreadingHTTPServer((host, port), self._handler_class())
+        self.httpd.daemon_threads = True
+        self.thread = None
+
+    @property
+    def base_url(self):
+        host, port = self.httpd.server_address[:2]
+        return f'http://{host}:{port}'
+
+    def _reset_stats(self):
+        self.counts = {}
+        self.requests = 0
+        self.storm_started_at = None
+        self.storm_ended_at = None
+        self.first_ok_after_storm = None
+        self.started_at = time.time()
+
+    def set_faults(self, **faults):
+        unknown = set(faults) - set(DEFAULT_FAULTS)
+        if unknown:
+            raise ValueError(f'未知的故障参数: {", ".join(sorted(unknown))}')
+        with self.lock:
+            self.faults.update(faults)
+            if 'storm_status' in faults or 'storm_after' in faults:
+                self.storm_started_at = self.storm_ended_at = self.first_ok_after_storm = None
+
+    def stats(self):
+        with self.lock:
+            recovery = None
+            if self.storm_ended_at and self.first_ok_after_storm:
+                recovery = round(self.first_ok_after_storm - self.storm_ended_at, 3)
+            return {
+                'requests': self.requests,
+                'by_route_status': {f'{route} {status}': n for (route, status), n in sorted(self.counts.items(), key=str)},
+                'storm_started_at': self.storm_started_at,
+                'storm_ended_at': self.storm_ended_at,
+                'first_ok_after_storm': self.first_ok_after_storm,
+                'recovery_seconds': recovery,
+            }
+
+    def start(self):
+        self.thread = threading.Thread(target=self.httpd.serve_forever, name='mock-hanyuguoxue', daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    # ---------- 请求处理 ----------
+
+    def _decide(self, now):
+        """返回本次请求的故障动作：('status', code) / ('hang', s) / ('truncate',) / ('drop',) / None。"""
+        with self.lock:
+            self.requests += 1
+            f = self.faults
+            if f['storm_status'] is not None and self.requests > f['storm_after']:
+                if self.storm_started_at is None:
+                    self.storm_started_at = now
+                if now - self.storm_started_at < f['storm_seconds']:
+                    if f['storm_status'] == 'drop':
+                        return ('drop',)
+                    return ('status', int(f['storm_status']))
+                if self.storm_ended_at is None:
+                    self.storm_ended_at = self.storm_started_at + f['storm_seconds']
+            r = self.rng.random()
+            for key, action in (('drop_rate', ('drop',)), ('timeout_rate', ('hang', f['hang_seconds'])),
+                                ('truncate_rate', ('truncate',))):
+                if r < f[key]:
+                    return action
+                r -= f[key]
+            if r < f['error_rate']:
+                return ('status', self.rng.choice(f['error_statuses']))
+            return None
+
+    def _record(self, route, status):
+        with self.lock:
+            key = (route, status)
+            self.counts[key] = self.counts.get(key, 0) + 1
+            if status == 200 and self.storm_ended_at and self.first_ok_after_storm is None:
+                self.first_ok_after_storm = time.time()
+
+    def _route(self, path, query):
+        """返回 (route, status, body, location)。"""
+        for kind, (search_path, detail_prefix) in KINDS.items():
+            if path == search_path:
+                name = (query.get('words') or [''])[0]
+                idx = self.index[kind].get(name)
+                if idx is None:
+                    return f'{kind}_search', 200, _search_miss_page(name), None
+                return f'{kind}_search', 302, '', f'{detail_prefix}{idx}.html'
+            if path.startswith(detail_prefix):
+                m = re.match(r'(\d+)\.html$', path[len(detail_prefix):])
+                names = self.entries[kind]
+                if not m or int(m.group(1)) >= len(names):
+                    return f'{kind}_detail', 404, 'not found', None
+                i = int(m.group(1))
+                name = names[i]
+                page = _load_fixture(kind, name)
+                if page is None:
+                    neighbours = [names[j] for j in (i - 1, i + 1) if 0 <= j < len(names)]
+                    render = _chengyu_page if kind == 'chengyu' else _ciyu_page
+                    page = render(name, neighbours[:1], neighbours[1:])
+                return f'{kind}_detail', 200, page, None
+        m = re.match(r'/zidian/zi-(\d+)$', path)
+        if m:
+            n = int(m.group(1))
+            lo, hi = self.zidian_range or (0, -1)
+            if not lo <= n <= hi:
+                return 'zidian', 404, 'not found', None
+            return 'zidian', 200, _load_fixture('zidian', f'zi-{n}') or _zidian_page(n), None
+        return 'other', 404, 'not found', None
+
+    def _handler_class(self):
+        site = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+            disable_nagle_algorithm = True  # 头部与正文分两次写出，避免 Nagle + 延迟 ACK 给每个请求加 40ms
+
+            def log_message(self, fmt, *args):
+                pass
+
+            def _send(self, status, body, location=None, content_type='text/html; charset=utf-8', truncate=False):
+                payload = body.encode('utf-8')
+                self.send_response(status)
+                self.send_header('Content-Type', content_type)
+                self.send_header('Content-Length', str(len(payload)))
+                if location:
+                    self.send_header('Location', location)
+                self.end_headers()
+                if truncate:
+                    self.wfile.write(payload[:len(payload) // 2])
+                    self.wfile.flush()
+                    self.close_connection = True
+                    self.connection.shutdown(socket.SHUT_RDWR)
+                else:
+                    self.wfile.write(payload)
+
+            def do_GET(self):
+                parsed = urllib.parse.urlparse(self.path)
+                if parsed.path == '/__stats':
+                    return self._send(200, json.dumps(site.stats(), ensure_ascii=False),
+                                      content_type='application/json')
+                f = site.faults
+                delay = f['latency'] + (site.rng.uniform(0, f['jitter']) if f['jitter'] else 0.0)
+                if delay > 0:
+                    time.sleep(delay)
+                route, status, body, location = site._route(parsed.path, urllib.parse.parse_qs(parsed.query))
+                action = site._decide(time.time())
+                if action is not None:
+                    if action[0] == 'drop':
+                        site._record(route, 'drop')
+                        self.close_connection = True
+                        self.connection.shutdown(socket.SHUT_RDWR)
+                        return
+                    if action[0] == 'hang':
+                        time.sleep(action[1])
+                    elif action[0] == 'truncate':
+                        site._record(route, 'truncated')
+                        return self._send(200, body or ' ' * 64, location, truncate=True)
+                    elif action[0] == 'status':
+                        status, body, location = action[1], f'<html><body>{action[1]}</body></html>', None
+                site._record(route, status)
+                self._send(status, body, location)
+
+            def do_POST(self):
+                if urllib.parse.urlparse(self.path).path != '/__faults':
+                    return self._send(404, 'not found')
+                length = int(self.headers.get('Content-Length') or 0)
+                try:
+                    site.set_faults(**json.loads(self.rfile.read(length) or b'{}'))
+                except (ValueError, TypeError) as e:
+                    return self._send(400, str(e))
+                self._send(200, json.dumps(site.faults, ensure_ascii=False), content_type='application/json')
+
+        return Handler
+
+
+# ================= 录制 =================
+
+def record_fixtures(kind, names, delay=2.0):
+    """从真实站点录制详情页到 fixtures/<kind>/（逐个请求、间隔 delay 秒，只用于准备少量样本）。"""
+    import requests
+
+    out_dir = os.path.join(FIXTURES_DIR, 'zidian' if kind == 'zidian' else kind)
+    os.makedirs(out_dir, exist_ok=True)
+    headers = {'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 '
+                             '(KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36'}
+    for name in names:
+        if kind == 'zidian':
+            url, file_name = f'{REAL_BASE_URL}/zidian/zi-{ord(name)}', f'zi-{ord(name)}'
+        else:
+            url, file_name = f'{REAL_BASE_URL}{KINDS[kind][0]}?words={urllib.parse.quote(name)}', name
+        resp = requests.get(url, headers=headers, timeout=10, allow_redirects=True)
+        if resp.status_code != 200:
+            print(f'  {name}: HTTP {resp.status_code}，跳过')
+        else:
+            with open(os.path.join(out_dir, f'{file_name}.html'), 'w', encoding='utf-8') as f:
+                f.write(resp.text)
+            print(f'  {name}: 已录制 {resp.url}')
+        time.sleep(delay)
+
+
+def storm_status_arg(value):
+    return value if value == 'drop' else int(value)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='本地汉语国学站点替身')
+    sub = parser.add_subparsers(dest='cmd', required=True)
+    serve = sub.add_parser('serve', help='启动替身服务')
+    serve.add_argument('--port', type=int, default=8765)
+    serve.add_argument('--words', help='词条列表文件（每行一个），同时作为成语与词语词表')
+    serve.add_argument('--zidian', default='19968-20967', help='可命中的汉字 Unicode 范围，如 19968-20967')
+    for key, value in DEFAULT_FAULTS.items():
+        if isinstance(value, float):
+            serve.add_argument('--' + key.replace('_', '-'), type=float, default=value)
+    serve.add_argument('--storm-status', type=storm_status_arg, default=None, help="状态码或 'drop'")
+    serve.add_argument('--storm-after', type=int, default=0)
+    record = sub.add_parser('record', help='从真实站点录制少量页面作为 fixtures')
+    record.add_argument('kind', choices=['chengyu', 'ciyu', 'zidian'])
+    record.add_argument('names', nargs='+')
+    record.add_argument('--delay', type=float, default=2.0)
+    args = parser.parse_args(argv)
+
+    if args.cmd == 'record':
+        record_fixtures(args.kind, args.names, delay=args.delay)
+        return 0
+
+    words = []
+    if args.words:
+        with open(args.words, 'r', encoding='utf-8') as f:
+            words = [line.strip() for line in f if line.strip()]
+    lo, hi = (int(x) for x in args.zidian.split('-'))
+    faults = {k: getattr(args, k) for k in DEFAULT_FAULTS if k != 'error_statuses'}
+    site = MockHanyuguoxue(chengyu=words, ciyu=words, zidian_range=(lo, hi), faults=faults, port=args.port).start()
+    print(f'替身站点已启动: {site.base_url}（{len(words)} 个词条，汉字 {lo}-{hi}），Ctrl+C 退出')
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        site.stop()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,74 @@
+# -*- coding: utf-8 -*-
+"""
+比较两份 .prof（batch_{idx}.prof，见 common/batch_profiler.py）的逐函数耗时差异。
+
+按函数（文件:行号(函数名)）对齐两份 pstats，输出 tottime / cumtime 变化最大的函数，
+解析或写库回归时能直接看到是哪个函数变慢了。两份剖析的总时长不同（批次条数不同）时，
+可加 --per-entry 按各自的条目数归一化后再比较。
+
+使用示例：
+    python bench/profile_diff.py chengyu/batch_12.prof chengyu/batch_13.prof
+    python bench/profile_diff.py old.prof new.prof --sort cumtime --top 40 --filter extract_
+    python bench/profile_diff.py old.prof new.prof --per-entry 1000 800
+"""
+import argparse
+import os
+import pstats
+import sys
+
+
+def load_times(path):
+    """返回 {函数标签: (调用次数, tottime, cumtime)} 与总时长。"""
+    stats = pstats.Stats(path)
+    times = {}
+    for (filename, line, func), (cc, nc, tt, ct, _) in stats.stats.items():
+        label = f'{os.path.basename(filename)}:{line}({func})'
+        prev = times.get(label, (0, 0.0, 0.0))
+        times[label] = (prev[0] + nc, prev[1] + tt, prev[2] + ct)
+    return times, stats.total_tt
+
+
+def diff_profiles(old_path, new_path, sort='tottime', old_scale=1.0, new_scale=1.0):
+    """返回按 |变化量| 降序的 [(函数, 旧值, 新值, 变化量, 旧调用次数, 新调用次数)]，以及两份的总时长。"""
+    old, old_total = load_times(old_path)
+    new, new_total = load_times(new_path)
+    idx = 1 if sort == 'tottime' else 2
+    rows = []
+    for label in set(old) | set(new):
+        o = old.get(label, (0, 0.0, 0.0))
+        n = new.get(label, (0, 0.0, 0.0))
+        ov, nv = o[idx] / old_scale, n[idx] / new_scale
+        rows.append((label, ov, nv, nv - ov, o[0], n[0]))
+    rows.sort(key=lambda r: abs(r[3]), reverse=True)
+    return rows, old_total / old_scale, new_total / new_scale
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description='比较两份 .prof 的逐函数耗时差异')
+    parser.add_argument('old', help='基准 .prof')
+    parser.add_argument('new', help='对比 .prof')
+    parser.add_argument('--sort', choices=['tottime', 'cumtime'], default='tottime',
+                        help='tottime 为函数自身耗时（定位热点），cumtime 含子调用（定位慢的调用链）')
+    parser.add_argument('--top', type=int, default=25)
+    parser.add_argument('--filter', default='', help='只显示标签包含该子串的函数（如 extract_ 或 mysql）')
+    parser.add_argument('--per-entry', nargs=2, type=int, metavar=('OLD_N', 'NEW_N'),
+                        help='两份剖析各自处理的条目数，按条目归一化（单位变为 ms/条）')
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    old_scale, new_scale = (args.per_entry if args.per_entry else (1, 1))
+    rows, old_total, new_total = diff_profiles(args.old, args.new, args.sort, old_scale, new_scale)
+    if args.filter:
+        rows = [r for r in rows if args.filter in r[0]]
+    unit = 'ms/条' if args.per_entry else 'ms'
+    print(f'总耗时: {old_total * 1000:.1f} → {new_total * 1000:.1f} {unit}（{args.sort}）')
+    print(f"{'变化':>10} {'旧':>10} {'新':>10} {'旧调用':>8} {'新调用':>8}  函数")
+    for label, ov, nv, delta, on, nn in rows[:args.top]:
+        print(f'{delta * 1000:+10.2f} {ov * 1000:10.2f} {nv * 1000:10.2f} {on:8d} {nn:8d}  {label}')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
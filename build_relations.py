@@ -0,0 +1,159 @@
+# -*- coding: utf-8 -*-
+"""爬取结束后用集合 SQL 批量构建近/反义关系：`build_relations.py`
+
+逐条写库时，每条记录要在写事务里查 id、为尚未爬取的关联词 INSERT IGNORE 占位行、再逐条插入关系，
+这些语句占了写库路径的大头。batch_crawl.py 设置 `DEFER_RELATIONS = True` 后只写基础表，
+关系由本脚本在爬取结束后一次性补齐：
+
+ 1. 按 id 区间读取基础表中已爬取的行（url 非空），用 JSON_TABLE 展开 synonyms / antonyms；
+ 2. 一条 `INSERT IGNORE ... SELECT DISTINCT` 为尚不存在的关联词补齐占位行；
+ 3. 按名称 join 出 id，一条 `INSERT IGNORE ... SELECT` 写入全部 (min_id, max_id, relation_type)。
+
+每个 id 区间一个事务，吞吐以 rows/s 计；INSERT IGNORE 保证重复执行结果不变（幂等）。
+每次完整运行结束后把开始时间（取数据库时钟）写入状态文件，下次只处理此后更新过的行；`RESET_STATE = True` 可全量重建。
+需要 MySQL 8.0（JSON_TABLE）。
+
+用法：
+    python build_relations.py
+"""
+import datetime
+import importlib
+import json
+import os
+import time
+
+from common.bulk_load import build_relations_set_based
+
+TARGET_SOURCE = 'chengyu'     # 'chengyu' 或 'ciyu'
+RELATION_CHUNK_ROWS = 5000    # 每个事务处理的基础表 id 区间长度
+RESET_STATE = False           # True 时忽略上次运行时间，重建全部已爬取行的关系
+STATE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'relation_build_state.json')
+# =======================================================================
+
+SOURCES = {
+    'chengyu': 'chengyu.chengyu_mysql',
+    'ciyu': 'ciyu.ciyu_mysql',
+}
+
+
+def load_state(source):
+    if RESET_STATE or not os.path.exists(STATE_PATH):
+        return {}
+    try:
+        with open(STATE_PATH, 'r', encoding='utf-8') as f:
+            return json.load(f).get(source) or {}
+    except Exception as e:
+        print('[WARN] 读取关系构建状态失败，全量重建:', e)
+        return {}
+
+
+def save_state(source, state):
+    """原子写入状态文件（先写临时文件再替换）。"""
+    all_state = {}
+    if os.path.exists(STATE_PATH):
+        try:
+            with open(STATE_PATH, 'r', encoding='utf-8') as f:
+                all_state = json.load(f)
+        except Exception:
+            all_state = {}
+    all_state[source] = state
+    tmp = STATE_PATH + '.tmp'
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump(all_state, f, ensure_ascii=False, indent=2)
+    os.replace(tmp, STATE_PATH)
+
+
+def _db_now(conn):
+    """返回数据库当前时间 'YYYY-MM-DD HH:MM:SS'：水位要与服务端的 updated_at 比较，不能用本机时钟（时差/时区）。"""
+    cur = conn.cursor()
+    cur.execute("SELECT CURRENT_TIMESTAMP AS now")
+    now = cur.fetchone()['now']
+    if isinstance(now, datetime.datetime):
+        return now.strftime('%Y-%m-%d %H:%M:%S')
+    return str(now)[:19]
+
+
+def build_relations(conn, spec, since=None, chunk_rows=RELATION_CHUNK_ROWS):
+    """
+    按 id 区间为基础表中已爬取的行构建关系，每个区间提交一次。
+
+    Args:
+        since: 'YYYY-MM-DD HH:MM:SS'，只处理 updated_at 不早于该时间的行；None 表示全部
+    Returns:
+        {'stub_rows': n, 'relation_rows': n}
+    """
+    table = spec['table']
+    cur = conn.cursor()
+    cur.execute(f"SELECT COALESCE(MIN(id), 0) AS lo, COALESCE(MAX(id), 0) AS hi FROM `{table}` WHERE url IS NOT NULL")
+    bounds = cur.fetchone()
+    lo, hi = int(bounds['lo']), int(bounds['hi'])
+    totals = {'stub_rows': 0, 'relation_rows': 0}
+    if hi == 0:
+        print('没有已爬取的行，无需构建关系')
+        return totals
+
+    where = 's.url IS NOT NULL AND s.id >= %s AND s.id < %s'
+    if since:
+        where += ' AND s.updated_at >= %s'
+    t0 = time.perf_counter()
+    scanned = 0
+    for start in range(lo, hi + 1, chunk_rows):
+        end = start + chunk_rows
+        params = (start, end) + ((since,) if since else ())
+        try:
+            stats = build_relations_set_based(cur, spec, table, where=where, params=params)
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        for k in totals:
+            totals[k] += stats[k]
+        scanned += min(end, hi + 1) - start
+        elapsed = time.perf_counter() - t0
+        print(f'  id < {end}: 新增关系 {stats["relation_rows"]}，占位 {stats["stub_rows"]}'
+              f'（累计 {totals["relation_rows"]} / {totals["stub_rows"]}，{scanned / elapsed:.0f} ids/s）')
+    elapsed = time.perf_counter() - t0
+    print(f'关系构建完成：新增关系 {totals["relation_rows"]} 条，占位行 {totals["stub_rows"]} 条，耗时 {elapsed:.1f}s')
+    return totals
+
+
+def main(source=TARGET_SOURCE):
+    if source not in SOURCES:
+        print('未知的数据源:', source)
+        return 2
+    mod = importlib.import_module(SOURCES[source])
+    spec = mod.BULK_SPEC
+    if mod.get_storage().name != 'mysql':
+        print('集合构建依赖 MySQL 8.0 的 JSON_TABLE，当前存储后端不支持；请关闭 DEFER_RELATIONS 逐条写入关系')
+        return 2
+
+    conn = mod.get_database_connection()
+    if not conn:
+        print('无法连接到数据库，退出')
+        return 2
+    state = load_state(source)
+    since = state.get('last_started_at')
+    print(f'开始构建 {spec["relation_table"]}'
+          + (f'，只处理 {since} 之后更新的行' if since else '，处理全部已爬取的行'))
+    try:
+        started_at = _db_now(conn)
+        totals = build_relations(conn, spec, since=since)
+        # 记录开始时间而非结束时间：运行期间写入的行下次仍会被处理
+        save_state(source, dict(totals, last_started_at=started_at,
+                                finished_at=time.strftime('%Y-%m-%d %H:%M:%S')))
+        return 0
+    except KeyboardInterrupt:
+        print('收到中断信号，已提交的区间保留；下次运行仍从上次的时间点开始（INSERT IGNORE 可安全重复）。')
+        return 130
+    except Exception as e:
+        print('关系构建失败:', e)
+        return 3
+    finally:
+        try:
+            conn.close()
+        except Exception:
+            pass
+
+
+if __name__ == '__main__':
+    exit(main())
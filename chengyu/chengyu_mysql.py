@@ -11,10 +11,37 @@
 """
 import pymysql
 import json
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from common.bulk_load import bulk_upsert
+from common.content_hash import content_hash, parse_json_list
+from common.storage import open_storage
+from common.sampled_log import SampledLogger
 
 # 模式标志：是否为测试模式（不实际写入数据库）
 # TEST_MODE = False
 TEST_MODE = True
+# TEST_MODE 的 SQL 计划按事件（save / skip_error）抽样输出为 JSON 行：前 TEST_MODE_LOG_FIRST 条与之后每 TEST_MODE_LOG_EVERY 条，其余只计数
+TEST_MODE_LOG_FIRST = 3
+TEST_MODE_LOG_EVERY = 100
+TEST_LOG = SampledLogger('chengyu_mysql', first=TEST_MODE_LOG_FIRST, every=TEST_MODE_LOG_EVERY)
+
+# 参与内容哈希的字段（不含 url 与时间戳），见 common/content_hash.py
+CONTENT_FIELDS = ('pinyin', 'zhuyin', 'emotion', 'explanation', 'source', 'usage', 'example',
+                  'synonyms', 'antonyms', 'translation')
+
+# LOAD DATA 批量导入的表结构描述（见 common/bulk_load.py）
+BULK_SPEC = {
+    "table": "hanyuguoxue_chengyu",
+    "key": "chengyu",
+    "columns": ["chengyu", "url", "pinyin", "zhuyin", "emotion", "explanation", "source", "usage",
+                "example", "synonyms", "antonyms", "translation", "content_hash"],
+    "relation_table": "chengyu_relation",
+    "relation_columns": {"synonym": "synonyms", "antonym": "antonyms"},
+    "term_length": 50,
+}
 
 # MySQL 连接配置
 mysql_config = {
@@ -25,22 +52,73 @@ mysql_config = {
     "port": 3307,
 }
 
+# 存储后端：'mysql' 写入 mysql_config 指向的库；'sqlite' 写入本地文件库（离线运行与本地压测用，见 common/storage.py）
+STORAGE_BACKEND = 'mysql'
+SQLITE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'chengyu_local.db')
 
-def get_database_connection():
+# SQLite 后端的建表语句，列与唯一键和 create_table_chengyu.py 中的 MySQL 表一致
+SQLITE_SCHEMA = [
+    """
+    CREATE TABLE IF NOT EXISTS hanyuguoxue_chengyu (
+        `id` INTEGER PRIMARY KEY AUTOINCREMENT,
+        `chengyu` TEXT NOT NULL UNIQUE,
+        `url` TEXT,
+        `pinyin` TEXT,
+        `zhuyin` TEXT,
+        `emotion` TEXT,
+        `explanation` TEXT,
+        `source` TEXT,
+        `usage` TEXT,
+        `example` TEXT,
+        `synonyms` TEXT,
+        `antonyms` TEXT,
+        `translation` TEXT,
+        `error` TEXT,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        checked_at TIMESTAMP NULL DEFAULT NULL,
+        content_hash TEXT NULL DEFAULT NULL
+    );
+    CREATE INDEX IF NOT EXISTS idx_pinyin ON hanyuguoxue_chengyu (pinyin);
+    CREATE INDEX IF NOT EXISTS idx_emotion ON hanyuguoxue_chengyu (emotion);
+    CREATE INDEX IF NOT EXISTS idx_updated_at ON hanyuguoxue_chengyu (updated_at);
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS chengyu_relation (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        min_id INTEGER NOT NULL REFERENCES hanyuguoxue_chengyu(id) ON DELETE CASCADE,
+        max_id INTEGER NOT NULL REFERENCES hanyuguoxue_chengyu(id) ON DELETE CASCADE,
+        relation_type TEXT NOT NULL CHECK (relation_type IN ('synonym', 'antonym')),
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        UNIQUE (min_id, max_id, relation_type)
+    );
+    CREATE INDEX IF NOT EXISTS idx_relation_max ON chengyu_relation (max_id);
+    """,
+]
+SQLITE_CONFLICT_KEYS = {"hanyuguoxue_chengyu": "chengyu"}
+
+_storage = None
+_storage_key = None
+
+
+def get_storage():
+    """按 STORAGE_BACKEND / SQLITE_PATH 返回存储后端（两者修改后自动重建）。"""
+    global _storage, _storage_key
+    key = (STORAGE_BACKEND, SQLITE_PATH)
+    if _storage is None or _storage_key != key:
+        _storage = open_storage(STORAGE_BACKEND, mysql_config=mysql_config, sqlite_path=SQLITE_PATH,
+                                sqlite_schema=SQLITE_SCHEMA, conflict_keys=SQLITE_CONFLICT_KEYS)
+        _storage_key = key
+    return _storage
+
+
+def get_database_connection(local_infile=False):
     """
-    获取 MySQL 数据库连接（返回 pymysql.Connection 或 None）。
+    获取数据库连接（pymysql.Connection 或 SQLite 兼容连接，失败返回 None）。
+    local_infile=True 时允许 LOAD DATA LOCAL INFILE（批量导入用，仅 MySQL）。
     """
     try:
-        connection = pymysql.connect(
-            host=mysql_config["host"],
-            user=mysql_config["user"],
-            password=mysql_config["password"],
-            database=mysql_config["database"],
-            port=mysql_config["port"],
-            charset="utf8mb4",
-            cursorclass=pymysql.cursors.DictCursor
-        )
-        return connection
+        return get_storage().connect(local_infile=local_infile)
     except Exception as e:
         print(f"无法建立数据库连接: {e}")
         return None
@@ -70,68 +148,172 @@ if __name__ == '__main__':
     exit(main())
 
 
-def save_chengyu_to_db(chengyu_data):
+def _write_chengyu(cursor, chengyu_data, build_relations=True):
+    """
+    在给定游标上写入一条成语（基础表 upsert + 关联词占位 + 关系表），不提交事务。
+    解析结果带 error 或缺少基础信息时返回 False，由调用方回滚。
+    build_relations=False 时只写基础表，关联词占位与关系表留给 build_relations.py 集合构建。
+    """
+    chengyu = ""
+    data = chengyu_data.get('data', {})
+    if data and 'chengyu' in data:
+        chengyu = data['chengyu']
+
+    # 如果解析返回 error 或未解析到基础信息（chengyu 为空），则放弃写入
+    if 'error' in chengyu_data:
+        return False
+    if not data or not chengyu:
+        return False
+
+    synonyms = data.get('synonyms', []) or []
+    antonyms = data.get('antonyms', []) or []
+
+    sql = """
+    INSERT INTO hanyuguoxue_chengyu
+    (`chengyu`, `url`, `pinyin`, `zhuyin`, `emotion`, `explanation`, 
+     `source`, `usage`, `example`, `synonyms`, `antonyms`, `translation`, `content_hash`)
+    VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+    ON DUPLICATE KEY UPDATE
+    `url` = VALUES(`url`),
+    `pinyin` = VALUES(`pinyin`),
+    `zhuyin` = VALUES(`zhuyin`),
+    `emotion` = VALUES(`emotion`),
+    `explanation` = VALUES(`explanation`),
+    `source` = VALUES(`source`),
+    `usage` = VALUES(`usage`),
+    `example` = VALUES(`example`),
+    `synonyms` = VALUES(`synonyms`),
+    `antonyms` = VALUES(`antonyms`),
+    `translation` = VALUES(`translation`),
+    `content_hash` = VALUES(`content_hash`),
+    updated_at = CURRENT_TIMESTAMP
+    """
+    cursor.execute(sql, (
+        chengyu,
+        chengyu_data.get('url', ''),
+        data.get('pinyin', ''),
+        data.get('zhuyin', ''),
+        data.get('emotion', ''),
+        data.get('explanation', ''),
+        data.get('source', ''),
+        data.get('usage', ''),
+        data.get('example', ''),
+        json.dumps(synonyms, ensure_ascii=False),
+        json.dumps(antonyms, ensure_ascii=False),
+        data.get('translation', ''),
+        chengyu_content_hash(chengyu_data)
+    ))
+
+    if not build_relations:
+        return True
+
+    # 确保主成语有 id
+    cursor.execute("SELECT id FROM hanyuguoxue_chengyu WHERE chengyu=%s", (chengyu,))
+    row = cursor.fetchone()
+    if not row:
+        cursor.execute("INSERT IGNORE INTO hanyuguoxue_chengyu (chengyu) VALUES (%s)", (chengyu,))
+        cursor.execute("SELECT id FROM hanyuguoxue_chengyu WHERE chengyu=%s", (chengyu,))
+        row = cursor.fetchone()
+    if not row:
+        raise RuntimeError('无法获取主成语 id')
+    main_id = row['id']
+
+    def normalize_term(t):
+        if not t:
+            return None
+        return t.strip()
+
+    def ensure_terms_have_ids(term_list):
+        terms = [normalize_term(t) for t in set(term_list) if t and normalize_term(t)]
+        if not terms:
+            return {}
+        insert_vals = [(t,) for t in terms]
+        cursor.executemany("INSERT IGNORE INTO hanyuguoxue_chengyu (chengyu) VALUES (%s)", insert_vals)
+        placeholders = ','.join(['%s'] * len(terms))
+        cursor.execute(f"SELECT id, chengyu FROM hanyuguoxue_chengyu WHERE chengyu IN ({placeholders})", terms)
+        rows = cursor.fetchall()
+        return {r['chengyu']: r['id'] for r in rows}
+
+    def insert_relations_for(main_id, related_terms, relation_type):
+        if not related_terms:
+            return
+        term_map = ensure_terms_have_ids(related_terms + [chengyu])
+        values = []
+        for t in related_terms:
+            tn = normalize_term(t)
+            if not tn:
+                continue
+            rid = term_map.get(tn)
+            if not rid or rid == main_id:
+                continue
+            a = min(main_id, rid)
+            b = max(main_id, rid)
+            values.append((a, b, relation_type))
+        if values:
+            cursor.executemany(
+                "INSERT IGNORE INTO chengyu_relation (min_id, max_id, relation_type) VALUES (%s, %s, %s)",
+                values
+            )
+
+    synonyms = data.get('synonyms', []) or []
+    antonyms = data.get('antonyms', []) or []
+    insert_relations_for(main_id, synonyms, 'synonym')
+    insert_relations_for(main_id, antonyms, 'antonym')
+    return True
+
+
+def _test_mode_plan(chengyu_data, build_relations=True):
+    """TEST_MODE 下一条成语将要执行的基础表 SQL、参数与关系计划（供抽样日志输出）。"""
+    data = chengyu_data.get('data', {})
+    chengyu = data.get('chengyu', '')
+    synonyms = data.get('synonyms', []) or []
+    antonyms = data.get('antonyms', []) or []
+
+    sql = (
+        "INSERT INTO hanyuguoxue_chengyu (chengyu, url, pinyin, zhuyin, emotion, explanation,"
+        " source, usage, example, synonyms, antonyms, translation, content_hash) VALUES (...)"
+    )
+
+    params = (
+        chengyu,
+        chengyu_data.get('url', ''),
+        data.get('pinyin', ''),
+        data.get('zhuyin', ''),
+        data.get('emotion', ''),
+        data.get('explanation', ''),
+        data.get('source', ''),
+        data.get('usage', ''),
+        data.get('example', ''),
+        json.dumps(synonyms, ensure_ascii=False),
+        json.dumps(antonyms, ensure_ascii=False),
+        data.get('translation', ''),
+        chengyu_content_hash(chengyu_data),
+    )
+    plan = {'chengyu': chengyu, 'sql': sql, 'params': params}
+
+    if not build_relations:
+        plan['relations'] = '延后构建（build_relations.py）'
+        return plan
+
+    # 关系表计划操作：先确保相关词在基础表存在 (INSERT IGNORE)，再插入 (主词, 相关词, 类型)
+    related_terms = sorted({t.strip() for t in synonyms + antonyms if t and t.strip()})
+    plan['related_terms'] = related_terms
+    plan['relations'] = [(chengyu, t, 'synonym') for t in synonyms] + [(chengyu, t, 'antonym') for t in antonyms]
+    return plan
+
+
+def save_chengyu_to_db(chengyu_data, build_relations=True):
     """
     将成语数据保存到数据库。
     该函数从原来的 `extract_chengyu.py` 中抽出，放在数据库模块中以便于管理。
     """
-    # 测试模式：打印将要执行的 SQL 与数据并返回 True（不实际写入 DB）
+    # 测试模式：按抽样输出将要执行的 SQL 与数据并返回 True（不实际写入 DB）
     if TEST_MODE:
-        chengyu = ""
-        if 'data' in chengyu_data and 'chengyu' in chengyu_data['data']:
-            chengyu = chengyu_data['data']['chengyu']
-
         if 'error' in chengyu_data:
-            print("[TEST_MODE] 遇到错误，原本会跳过写入：", chengyu_data.get('error'))
+            TEST_LOG.log('skip_error', error=chengyu_data.get('error'))
             return False
-
-        data = chengyu_data.get('data', {})
-        synonyms = data.get('synonyms', []) or []
-        antonyms = data.get('antonyms', []) or []
-
-        sql = (
-            "INSERT INTO hanyuguoxue_chengyu (chengyu, url, pinyin, zhuyin, emotion, explanation,"
-            " source, usage, example, synonyms, antonyms, translation) VALUES (...)"
-        )
-
-        params = (
-            chengyu,
-            chengyu_data.get('url', ''),
-            data.get('pinyin', ''),
-            data.get('zhuyin', ''),
-            data.get('emotion', ''),
-            data.get('explanation', ''),
-            data.get('source', ''),
-            data.get('usage', ''),
-            data.get('example', ''),
-            json.dumps(synonyms, ensure_ascii=False),
-            json.dumps(antonyms, ensure_ascii=False),
-            data.get('translation', ''),
-        )
-
-        print("[TEST_MODE] 将执行基础表 SQL:")
-        print(sql)
-        print("[TEST_MODE] 参数:", params)
-
-        # 关系表计划操作
-        def normalize_term(t):
-            if not t:
-                return None
-            return t.strip()
-
-        related_terms = set([normalize_term(t) for t in synonyms + antonyms if t and normalize_term(t)])
-        print("[TEST_MODE] 将确保下列相关词在基础表存在 (INSERT IGNORE):", related_terms)
-
-        planned_relations = []
-        for t in synonyms:
-            planned_relations.append((chengyu, t, 'synonym'))
-        for t in antonyms:
-            planned_relations.append((chengyu, t, 'antonym'))
-
-        print("[TEST_MODE] 将插入到 chengyu_relation 的关系数据 (主词, 相关词, 类型):")
-        for r in planned_relations:
-            print("  ", r)
-
+        # 计划只在这一条被抽中时才拼装
+        TEST_LOG.log('save', lambda: _test_mode_plan(chengyu_data, build_relations))
         return True
 
     # 非测试模式：正常写入数据库
@@ -143,108 +325,9 @@ def save_chengyu_to_db(chengyu_data):
         # 开始事务
         connection.begin()
 
-        chengyu = ""
-        data = chengyu_data.get('data', {})
-        if data and 'chengyu' in data:
-            chengyu = data['chengyu']
-
-        # 如果解析返回 error 或未解析到基础信息（chengyu 为空），则放弃写入
-        if 'error' in chengyu_data:
+        if not _write_chengyu(cursor, chengyu_data, build_relations):
             connection.rollback()
             return False
-        if not data or not chengyu:
-            connection.rollback()
-            return False
-
-        synonyms = data.get('synonyms', []) or []
-        antonyms = data.get('antonyms', []) or []
-
-        sql = """
-        INSERT INTO hanyuguoxue_chengyu
-        (`chengyu`, `url`, `pinyin`, `zhuyin`, `emotion`, `explanation`, 
-         `source`, `usage`, `example`, `synonyms`, `antonyms`, `translation`)
-        VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-        ON DUPLICATE KEY UPDATE
-        `url` = VALUES(`url`),
-        `pinyin` = VALUES(`pinyin`),
-        `zhuyin` = VALUES(`zhuyin`),
-        `emotion` = VALUES(`emotion`),
-        `explanation` = VALUES(`explanation`),
-        `source` = VALUES(`source`),
-        `usage` = VALUES(`usage`),
-        `example` = VALUES(`example`),
-        `synonyms` = VALUES(`synonyms`),
-        `antonyms` = VALUES(`antonyms`),
-        `translation` = VALUES(`translation`),
-        updated_at = CURRENT_TIMESTAMP
-        """
-        cursor.execute(sql, (
-            chengyu,
-            chengyu_data.get('url', ''),
-            data.get('pinyin', ''),
-            data.get('zhuyin', ''),
-            data.get('emotion', ''),
-            data.get('explanation', ''),
-            data.get('source', ''),
-            data.get('usage', ''),
-            data.get('example', ''),
-            json.dumps(synonyms, ensure_ascii=False),
-            json.dumps(antonyms, ensure_ascii=False),
-            data.get('translation', '')
-        ))
-
-        # 确保主成语有 id
-        cursor.execute("SELECT id FROM hanyuguoxue_chengyu WHERE chengyu=%s", (chengyu,))
-        row = cursor.fetchone()
-        if not row:
-            cursor.execute("INSERT IGNORE INTO hanyuguoxue_chengyu (chengyu) VALUES (%s)", (chengyu,))
-            cursor.execute("SELECT id FROM hanyuguoxue_chengyu WHERE chengyu=%s", (chengyu,))
-            row = cursor.fetchone()
-        if not row:
-            raise RuntimeError('无法获取主成语 id')
-        main_id = row['id']
-
-        def normalize_term(t):
-            if not t:
-                return None
-            return t.strip()
-
-        def ensure_terms_have_ids(term_list):
-            terms = [normalize_term(t) for t in set(term_list) if t and normalize_term(t)]
-            if not terms:
-                return {}
-            insert_vals = [(t,) for t in terms]
-            cursor.executemany("INSERT IGNORE INTO hanyuguoxue_chengyu (chengyu) VALUES (%s)", insert_vals)
-            placeholders = ','.join(['%s'] * len(terms))
-            cursor.execute(f"SELECT id, chengyu FROM hanyuguoxue_chengyu WHERE chengyu IN ({placeholders})", terms)
-            rows = cursor.fetchall()
-            return {r['chengyu']: r['id'] for r in rows}
-
-        def insert_relations_for(main_id, related_terms, relation_type):
-            if not related_terms:
-                return
-            term_map = ensure_terms_have_ids(related_terms + [chengyu])
-            values = []
-            for t in related_terms:
-                tn = normalize_term(t)
-                if not tn:
-                    continue
-                rid = term_map.get(tn)
-                if not rid or rid == main_id:
-                    continue
-                a = min(main_id, rid)
-                b = max(main_id, rid)
-                values.append((a, b, relation_type))
-            if values:
-                cursor.executemany(
-                    "INSERT IGNORE INTO chengyu_relation (min_id, max_id, relation_type) VALUES (%s, %s, %s)",
-                    values
-                )
-
-        synonyms = data.get('synonyms', []) or []
-        antonyms = data.get('antonyms', []) or []
-        insert_relations_for(main_id, synonyms, 'synonym')
-        insert_relations_for(main_id, antonyms, 'antonym')
 
         connection.commit()
         return True
@@ -256,4 +339,281 @@ def save_chengyu_to_db(chengyu_data):
             pass
         return False
     finally:
-        connection.close()
\ No newline at end of file
+        connection.close()
+
+
+def save_chengyu_batch_to_db(items, connection=None, build_relations=True):
+    """
+    在一个连接、一个事务中写入一批成语，整批只提交一次。
+
+    每条使用 SAVEPOINT 隔离：单条数据无效或写入出错时只回滚该条，不影响同批其他数据。
+    传入 connection 时复用该连接（不关闭），否则临时建立。
+    返回 `(saved_items, [(item, error)], nbytes)`，可直接作为 BatchWriter 的 flush_fn。
+    """
+    if TEST_MODE:
+        saved, failed = [], []
+        for it in items:
+            if save_chengyu_to_db(it, build_relations):
+                saved.append(it)
+            else:
+                failed.append((it, '数据无效'))
+        return saved, failed, 0
+
+    own_connection = connection is None
+    if own_connection:
+        connection = get_database_connection()
+        if not connection:
+            return [], [(it, '无法建立数据库连接') for it in items], 0
+    saved, failed = [], []
+    nbytes = 0
+    try:
+        cursor = connection.cursor()
+        connection.begin()
+        for it in items:
+            cursor.execute("SAVEPOINT chengyu_item")
+            try:
+                ok = _write_chengyu(cursor, it, build_relations)
+                err = None if ok else (it.get('error') or '缺少成语基础信息')
+            except Exception as e:
+                ok, err = False, str(e)
+            if ok:
+                cursor.execute("RELEASE SAVEPOINT chengyu_item")
+                saved.append(it)
+                nbytes += len(json.dumps(it, ensure_ascii=False).encode('utf-8'))
+            else:
+                cursor.execute("ROLLBACK TO SAVEPOINT chengyu_item")
+                failed.append((it, err))
+        connection.commit()
+        return saved, failed, nbytes
+    except Exception as e:
+        print(f"批量保存成语数据失败: {e}")
+        try:
+            connection.rollback()
+        except Exception:
+            pass
+        return [], [(it, str(e)) for it in items], 0
+    finally:
+        if own_connection:
+            connection.close()
+
+
+def _bulk_row(chengyu_data):
+    """把解析结果转换为与 BULK_SPEC['columns'] 对应的一行；数据无效时返回 None（与 _write_chengyu 的判断一致）。"""
+    data = chengyu_data.get('data') or {}
+    if 'error' in chengyu_data or not data.get('chengyu'):
+        return None
+    return (
+        data['chengyu'],
+        chengyu_data.get('url', ''),
+        data.get('pinyin', ''),
+        data.get('zhuyin', ''),
+        data.get('emotion', ''),
+        data.get('explanation', ''),
+        data.get('source', ''),
+        data.get('usage', ''),
+        data.get('example', ''),
+        json.dumps(data.get('synonyms', []) or [], ensure_ascii=False),
+        json.dumps(data.get('antonyms', []) or [], ensure_ascii=False),
+        data.get('translation', ''),
+        chengyu_content_hash(chengyu_data),
+    )
+
+
+def save_chengyu_bulk_to_db(items, stage_dir=None, build_relations=True):
+    """
+    批量导入一批成语：TSV 暂存 + LOAD DATA 临时表 + 集合 SQL 合并基础表与关系表（见 common/bulk_load.py），整批一次提交。
+
+    适合首次全量入库；要求服务端开启 local_infile。返回值与 save_chengyu_batch_to_db 相同：
+    `(saved_items, [(item, error)], nbytes)`，数据无效的条目单独记为失败，整批出错时全部记为失败。
+    """
+    rows, saved, failed = [], [], []
+    for it in items:
+        row = _bulk_row(it)
+        if row is None:
+            failed.append((it, it.get('error') or '缺少成语基础信息'))
+        else:
+            rows.append(row)
+            saved.append(it)
+    if not rows:
+        return [], failed, 0
+
+    if TEST_MODE:
+        print(f"[TEST_MODE] 将以 LOAD DATA 批量导入 {len(rows)} 个成语到 {BULK_SPEC['table']}"
+              f"{'（含关系表）' if build_relations else '（关系表延后构建）'}")
+        return saved, failed, 0
+    if not get_storage().supports_load_data:
+        # SQLite 等不支持 LOAD DATA 的后端：退回单事务批量写入
+        batch_saved, batch_failed, nbytes = save_chengyu_batch_to_db(saved, build_relations=build_relations)
+        return batch_saved, failed + batch_failed, nbytes
+
+    connection = get_database_connection(local_infile=True)
+    if not connection:
+        return [], failed + [(it, '无法建立数据库连接') for it in saved], 0
+    try:
+        stats = bulk_upsert(connection, BULK_SPEC, rows, stage_dir=stage_dir, build_relations=build_relations)
+        print(f"批量导入 {stats['rows']} 个成语：LOAD {stats['load_seconds']}s，合并 {stats['merge_seconds']}s，"
+              f"关系 {stats['relation_seconds']}s（新增关系 {stats['relation_rows']}，占位 {stats['stub_rows']}）")
+        return saved, failed, stats['tsv_bytes']
+    except Exception as e:
+        print(f"批量导入成语失败: {e}")
+        return [], failed + [(it, str(e)) for it in saved], 0
+    finally:
+        connection.close()
+
+
+def iter_crawled_idioms(ordered=False, fetch_size=10000):
+    """
+    流式读取已爬取入库的成语（url 非空；关联关系写入的占位行 url 为 NULL，不算已爬取）。
+
+    ordered=True 时按 utf8mb4_bin（即 Unicode 码点）升序返回，可与 Python 字符串顺序直接归并。
+    使用服务端游标，内存占用与表大小无关。无法连接数据库时抛出 RuntimeError。
+    """
+    connection = get_database_connection()
+    if not connection:
+        raise RuntimeError("无法建立数据库连接")
+    try:
+        sql = "SELECT chengyu FROM hanyuguoxue_chengyu WHERE url IS NOT NULL"
+        if ordered:
+            sql += " ORDER BY chengyu COLLATE utf8mb4_bin"
+        cursor = connection.cursor(pymysql.cursors.SSCursor)
+        cursor.execute(sql)
+        while True:
+            rows = cursor.fetchmany(fetch_size)
+            if not rows:
+                break
+            for (name,) in rows:
+                if name:
+                    yield name
+        cursor.close()
+    finally:
+        connection.close()
+
+
+def iter_idiom_features(fetch_size=10000):
+    """
+    流式返回 (name, is_common, mentions, updated_at, crawled)，供优先级调度打分。
+
+    mentions 为该成语在关联关系表中出现的次数（被其他词条列为近/反义词的次数，可视为使用频度）；
+    crawled 表示 url 非空（占位行未爬取）。无法连接数据库时抛出 RuntimeError。
+    """
+    connection = get_database_connection()
+    if not connection:
+        raise RuntimeError("无法建立数据库连接")
+    try:
+        sql = (
+            "SELECT b.chengyu, 0, COALESCE(m.mentions, 0), b.updated_at, b.url IS NOT NULL "
+            "FROM hanyuguoxue_chengyu b LEFT JOIN ("
+            "  SELECT id, COUNT(*) AS mentions FROM ("
+            "    SELECT min_id AS id FROM chengyu_relation UNION ALL SELECT max_id FROM chengyu_relation"
+            "  ) r GROUP BY id"
+            ") m ON m.id = b.id"
+        )
+        cursor = connection.cursor(pymysql.cursors.SSCursor)
+        cursor.execute(sql)
+        while True:
+            rows = cursor.fetchmany(fetch_size)
+            if not rows:
+                break
+            for name, is_common, mentions, updated_at, crawled in rows:
+                if name:
+                    yield name, int(is_common or 0), int(mentions or 0), updated_at, bool(crawled)
+        cursor.close()
+    finally:
+        connection.close()
+
+
+def chengyu_content_hash(chengyu_data):
+    """解析结果（{'url', 'data'}）中成语内容的哈希，与数据库行的哈希可直接比较。"""
+    return content_hash(chengyu_data.get('data') or {}, CONTENT_FIELDS)
+
+
+def load_content_hashes(names, chunk_size=1000):
+    """
+    批量读取 names 中已入库成语的 content_hash，返回 {chengyu: hash}（未入库或尚无哈希的不在其中）。
+
+    爬取批次开始时调用一次，写库前在内存中比较 chengyu_content_hash()，内容未变化的直接跳过，不发送任何 SQL。
+    读取失败（无法连接、旧表尚无 content_hash 列等）时打印警告并返回已读到的部分，相应条目照常写入。
+    TEST_MODE 下不连库，返回空 dict（每条都按 dry-run 输出写库计划）。
+    """
+    names = [n for n in dict.fromkeys(names) if n]
+    hashes = {}
+    if not names or TEST_MODE:
+        return hashes
+    connection = get_database_connection()
+    if not connection:
+        return hashes
+    try:
+        with connection.cursor() as cursor:
+            for i in range(0, len(names), chunk_size):
+                chunk = names[i:i + chunk_size]
+                placeholders = ", ".join(["%s"] * len(chunk))
+                cursor.execute(
+                    "SELECT chengyu, content_hash FROM hanyuguoxue_chengyu "
+                    f"WHERE content_hash IS NOT NULL AND chengyu IN ({placeholders})",
+                    chunk,
+                )
+                for row in cursor.fetchall():
+                    hashes[row['chengyu']] = row['content_hash']
+    except Exception as e:
+        print(f"[WARN] 读取成语内容哈希失败，本批次不跳过未变化的成语: {e}")
+    finally:
+        connection.close()
+    return hashes
+
+
+def select_stale_idioms(horizon_days, limit):
+    """
+    选出最近一次更新或复查早于 horizon_days 天的已爬取成语，最旧的优先，至多 limit 条。
+
+    返回 [(chengyu, url, 库中内容的哈希)]。无法连接数据库时抛出 RuntimeError。
+    """
+    connection = get_database_connection()
+    if not connection:
+        raise RuntimeError("无法建立数据库连接")
+    try:
+        last_seen = "GREATEST(updated_at, COALESCE(checked_at, updated_at))"
+        sql = (
+            "SELECT `chengyu`, `url`, `pinyin`, `zhuyin`, `emotion`, `explanation`, `source`, `usage`, `example`, "
+            "`synonyms`, `antonyms`, `translation`, `content_hash` "
+            "FROM hanyuguoxue_chengyu WHERE url IS NOT NULL AND url <> '' "
+            f"AND {last_seen} < NOW() - INTERVAL %s DAY ORDER BY {last_seen} LIMIT %s"
+        )
+        with connection.cursor() as cursor:
+            cursor.execute(sql, (int(horizon_days), int(limit)))
+            rows = cursor.fetchall()
+        result = []
+        for row in rows:
+            stored = row.get('content_hash')
+            if not stored:  # 引入 content_hash 列之前写入的行：按库中内容现算
+                row['synonyms'] = parse_json_list(row.get('synonyms'))
+                row['antonyms'] = parse_json_list(row.get('antonyms'))
+                stored = content_hash(row, CONTENT_FIELDS)
+            result.append((row['chengyu'], row['url'], stored))
+        return result
+    finally:
+        connection.close()
+
+
+def mark_idioms_checked(names):
+    """
+    记录内容未变化的成语的复查时间（checked_at），保持 updated_at 不变，返回更新的行数。
+    """
+    names = list(names)
+    if not names:
+        return 0
+    placeholders = ", ".join(["%s"] * len(names))
+    sql = (f"UPDATE hanyuguoxue_chengyu SET checked_at = CURRENT_TIMESTAMP, updated_at = updated_at "
+           f"WHERE chengyu IN ({placeholders})")
+    if TEST_MODE:
+        print(f"[TEST_MODE] 将执行: {sql}（{len(names)} 个成语）")
+        return len(names)
+    connection = get_database_connection()
+    if not connection:
+        raise RuntimeError("无法建立数据库连接")
+    try:
+        with connection.cursor() as cursor:
+            n = cursor.execute(sql, names)
+        connection.commit()
+        return n
+    finally:
+        connection.close()
@@ -5,9 +5,16 @@ Neo4j 相关的配置与工具函数。
 提供：
  - neo4j_config
  - get_idioms_from_neo4j(limit=None)
+ - iter_idioms_from_neo4j(page_size=DEFAULT_PAGE_SIZE, offset=0)
+ - count_idioms_in_neo4j()
+ - get_idiom_fingerprint()
+ - iter_idiom_degrees()
 
 这个模块把 Neo4j 访问逻辑集中，方便被 batch 脚本或测试模块调用。
+所有读取都按 name 升序返回，保证多次运行之间的顺序（以及续爬偏移）稳定。
 """
+import hashlib
+
 from neo4j import GraphDatabase
 
 # Neo4j配置（请按需修改）
@@ -17,21 +24,31 @@ neo4j_config = {
     "password": "xtxzhu2u"
 }
 
+DEFAULT_PAGE_SIZE = 5000  # keyset 分页每页条数
+FINGERPRINT_SAMPLE_SIZE = 64  # 指纹中首尾各取多少个 name 参与哈希
+
+# name 为空的节点无法爬取，统一过滤；DISTINCT 保证与 keyset 分页（name > $after）的结果一致
+_NAME_FILTER = "n.name IS NOT NULL AND n.name <> ''"
+
+
+def _get_driver():
+    return GraphDatabase.driver(neo4j_config["uri"], auth=(neo4j_config["user"], neo4j_config["password"]))
+
 
 def get_idioms_from_neo4j(limit=None):
     """
-    从 Neo4j 数据库获取成语名称列表。
+    从 Neo4j 数据库获取成语名称列表（按 name 升序）。
     返回值为字符串列表，若获取失败返回空列表。
     """
     try:
-        driver = GraphDatabase.driver(neo4j_config["uri"], auth=(neo4j_config["user"], neo4j_config["password"]))
+        driver = _get_driver()
         idiom_list = []
         with driver.session() as session:
             if limit:
-                query = "MATCH (n:Idiom) RETURN n.name AS name LIMIT $limit"
+                query = f"MATCH (n:Idiom) WHERE {_NAME_FILTER} RETURN DISTINCT n.name AS name ORDER BY name LIMIT $limit"
                 result = session.run(query, limit=limit)
             else:
-                query = "MATCH (n:Idiom) RETURN n.name AS name"
+                query = f"MATCH (n:Idiom) WHERE {_NAME_FILTER} RETURN DISTINCT n.name AS name ORDER BY name"
                 result = session.run(query)
             for record in result:
                 idiom_list.append(record["name"])
@@ -40,3 +57,119 @@ def get_idioms_from_neo4j(limit=None):
     except Exception as e:
         print(f"[WARN] 从 Neo4j 获取成语失败: {e}")
         return []
+
+
+def count_idioms_in_neo4j():
+    """返回可爬取的成语数量（与 iter_idioms_from_neo4j 的条数一致），失败返回 0。"""
+    try:
+        driver = _get_driver()
+        with driver.session() as session:
+            record = session.run(
+                f"MATCH (n:Idiom) WHERE {_NAME_FILTER} RETURN count(DISTINCT n.name) AS total"
+            ).single()
+        driver.close()
+        return record["total"] if record else 0
+    except Exception as e:
+        print(f"[WARN] 从 Neo4j 统计成语数量失败: {e}")
+        return 0
+
+
+def get_idiom_fingerprint(sample_size=FINGERPRINT_SAMPLE_SIZE):
+    """返回 Neo4j 中成语列表的指纹："数量:首尾样本哈希"，用于判断本地快照是否过期。
+
+    只做三次轻量查询（count + 按 name 升序/降序各取 sample_size 个），失败返回 None。
+    中间位置的改名且总数不变时无法被察觉，必要时可强制刷新快照。
+    """
+    try:
+        driver = _get_driver()
+        with driver.session() as session:
+            total = session.run(
+                f"MATCH (n:Idiom) WHERE {_NAME_FILTER} RETURN count(DISTINCT n.name) AS total"
+            ).single()["total"]
+            head = [r["name"] for r in session.run(
+                f"MATCH (n:Idiom) WHERE {_NAME_FILTER} RETURN DISTINCT n.name AS name ORDER BY name LIMIT $n",
+                n=sample_size)]
+            tail = [r["name"] for r in session.run(
+                f"MATCH (n:Idiom) WHERE {_NAME_FILTER} RETURN DISTINCT n.name AS name ORDER BY name DESC LIMIT $n",
+                n=sample_size)]
+        driver.close()
+        digest = hashlib.sha1("\n".join(head + ["|"] + tail).encode("utf-8")).hexdigest()[:16]
+        return f"{total}:{digest}"
+    except Exception as e:
+        print(f"[WARN] 获取 Neo4j 成语指纹失败: {e}")
+        return None
+
+
+def iter_idioms_from_neo4j(page_size=DEFAULT_PAGE_SIZE, offset=0, after=None):
+    """
+    按 name 升序流式返回成语名称（keyset 分页，内存占用与总数无关）。
+
+    Args:
+        page_size: 每页条数
+        offset: 跳过前 offset 条（先用一次 SKIP 查询定位第 offset 条的 name，再从其后 keyset 翻页）
+        after: 直接从该 name 之后开始（优先于 offset）
+
+    中途出错时打印警告并抛出异常，避免调用方把不完整的结果当作全量。
+    """
+    driver = _get_driver()
+    try:
+        last = after
+        if last is None and offset > 0:
+            with driver.session() as session:
+                record = session.run(
+                    f"MATCH (n:Idiom) WHERE {_NAME_FILTER} "
+                    "WITH DISTINCT n.name AS name ORDER BY name SKIP $skip LIMIT 1 RETURN name",
+                    skip=offset - 1
+                ).single()
+            if record is None:
+                return
+            last = record["name"]
+
+        # 每页使用独立 session：批次之间可能间隔很久，避免长时间占用同一连接
+        while True:
+            if last is None:
+                query = (f"MATCH (n:Idiom) WHERE {_NAME_FILTER} "
+                         "RETURN DISTINCT n.name AS name ORDER BY name LIMIT $limit")
+            else:
+                query = (f"MATCH (n:Idiom) WHERE {_NAME_FILTER} AND n.name > $after "
+                         "RETURN DISTINCT n.name AS name ORDER BY name LIMIT $limit")
+            with driver.session() as session:
+                names = [record["name"] for record in session.run(query, after=last, limit=page_size)]
+            yield from names
+            if len(names) < page_size:
+                return
+            last = names[-1]
+    except Exception as e:
+        print(f"[WARN] 分页读取 Neo4j 成语失败: {e}")
+        raise
+    finally:
+        driver.close()
+
+
+def iter_idiom_degrees(page_size=DEFAULT_PAGE_SIZE):
+    """
+    按 name 升序流式返回 (name, degree)，degree 为该成语节点的关系数（同名多个节点时累加）。
+
+    供优先级调度（common/frontier.py）使用；中途出错时打印警告并抛出异常。
+    """
+    driver = _get_driver()
+    try:
+        last = None
+        while True:
+            after = "" if last is None else "AND n.name > $after "
+            # 先按 keyset 取一页 name，再只为这一页统计度数，避免每页都对全部节点聚合
+            query = (f"MATCH (n:Idiom) WHERE {_NAME_FILTER} {after}"
+                     "WITH DISTINCT n.name AS name ORDER BY name LIMIT $limit "
+                     "MATCH (m:Idiom {name: name}) "
+                     "RETURN name, sum(size([(m)--() | 1])) AS degree ORDER BY name")
+            with driver.session() as session:
+                rows = [(r["name"], r["degree"]) for r in session.run(query, after=last, limit=page_size)]
+            yield from rows
+            if len(rows) < page_size:
+                return
+            last = rows[-1][0]
+    except Exception as e:
+        print(f"[WARN] 读取 Neo4j 成语度数失败: {e}")
+        raise
+    finally:
+        driver.close()
@@ -1,10 +1,20 @@
 # -*- coding: utf-8 -*-
+import os
+import sys
 import requests
 import urllib.parse
 import time
 import re
 from bs4 import BeautifulSoup
 
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from common.sampled_log import SampledLogger
+
+# 站点根地址（本地压测时改为 bench/mock_hanyuguoxue.py 的地址）
+BASE_URL = "https://www.hanyuguoxue.com"
+
+# 搜索未命中 / 出错按事件抽样输出（前 3 条与之后每 100 条），批量爬取时不再逐条刷屏
+SEARCH_LOG = SampledLogger('extract_chengyu', first=3, every=100)
 
 
 def get_chengyu_url(chengyu, delay=0.5, session=None):
@@ -23,7 +33,7 @@ def get_chengyu_url(chengyu, delay=0.5, session=None):
         'Accept-Language': 'zh-CN,zh;q=0.8,zh-TW;q=0.7,zh-HK;q=0.5,en-US;q=0.3,en;q=0.2',
     }
 
-    search_url = f"https://www.hanyuguoxue.com/chengyu/search?words={urllib.parse.quote(chengyu)}"
+    search_url = f"{BASE_URL}/chengyu/search?words={urllib.parse.quote(chengyu)}"
 
     try:
         # 防止被封IP，添加延时（可由调用方控制抖动）
@@ -49,13 +59,13 @@ def get_chengyu_url(chengyu, delay=0.5, session=None):
                 return response.url
 
         # 如果走到这里，说明当前 URL 不是明确的详情页，返回 None 交由上层记录为失败
-        print(f"未能在搜索结果中识别到成语 '{chengyu}' 的详情页，返回 None")
+        SEARCH_LOG.log('search_miss', chengyu=chengyu)
         return None
     except requests.exceptions.RequestException as e:
-        print(f"获取成语'{chengyu}'的URL失败: {str(e)}")
+        SEARCH_LOG.log('search_request_error', chengyu=chengyu, error=str(e))
         raise
     except Exception as e:
-        print(f"获取成语'{chengyu}'的URL时发生未知错误: {str(e)}")
+        SEARCH_LOG.log('search_error', chengyu=chengyu, error=str(e))
         return {'error': str(e)}
 
 
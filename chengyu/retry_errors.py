@@ -1,132 +1,115 @@
 # -*- coding: utf-8 -*-
 """
-简单的错误成语重试脚本
-读取所有 batch_*_errors.csv 文件中的错误成语，重新尝试爬取并保存到数据库。
+错误成语重试脚本
+读取所有 batch_*_errors.csv 文件（以及检查点库中状态为 failed 的项）中的错误成语，按成语去重、
+按错误类别分流后并发重新爬取，并通过后台批量写线程保存到数据库。
+
+ - 解析失败、找不到详情页等永久性错误默认跳过（RETRY_PERMANENT = True 可强制重试）；
+ - 网络、限流、写库等临时性错误由 RETRY_WORKERS 个线程并发重试，共用 RETRY_RATE_PER_SEC 的令牌桶限速；
+ - 结果写入 retry_results.csv，并同步更新检查点库中的状态。
 
 使用示例：
     python retry_errors.py
 """
 import os
-import csv
-import glob
-import time
+import sys
 
 from extract_chengyu import get_chengyu_url, extract_chengyu_details_from_url
-from chengyu_mysql import save_chengyu_to_db
-
-
-def read_error_idioms():
-    """读取所有错误CSV文件中的成语"""
-    error_idioms = []
-    error_files = glob.glob(os.path.join(os.path.dirname(__file__), 'batch_*_errors.csv'))
-    
-    for error_file in error_files:
-        try:
-            with open(error_file, 'r', encoding='utf-8-sig') as f:
-                reader = csv.DictReader(f)
-                for row in reader:
-                    chengyu = row.get('chengyu', '').strip()
-                    error = row.get('error', '').strip()
-                    if chengyu:
-                        error_idioms.append((chengyu, error, os.path.basename(error_file)))
-        except Exception as e:
-            print(f"读取错误文件 {error_file} 失败: {e}")
-    
-    return error_idioms
-
-
-def retry_idiom(chengyu, delay=1.0):
-    """重试单个成语的爬取"""
-    try:
-        # 添加延迟避免请求过快
-        time.sleep(delay)
-        
-        # 获取成语URL
-        url_result = get_chengyu_url(chengyu)
-        if isinstance(url_result, dict) and url_result.get('error'):
-            return False, f"获取URL失败: {url_result.get('error')}"
-        
-        url = url_result
-        if url is None:
-            return False, "无法获取成语详情页URL"
-        
-        # 再次延迟
-        time.sleep(delay)
-        
-        # 提取成语详情
-        data = extract_chengyu_details_from_url(url)
-        if isinstance(data, dict) and 'error' in data:
-            return False, f"提取详情失败: {data.get('error')}"
-        
-        # 确保数据格式正确
-        if 'data' not in data or not data.get('data'):
-            data = {'url': url, 'data': {'chengyu': chengyu}}
-        else:
-            if not data['data'].get('chengyu'):
-                data['data']['chengyu'] = chengyu
-        
-        # 保存到数据库
-        success = save_chengyu_to_db(data)
-        if success:
-            return True, "成功保存到数据库"
-        else:
-            return False, "保存到数据库失败"
-            
-    except Exception as e:
-        return False, f"处理异常: {str(e)}"
+from chengyu_mysql import save_chengyu_batch_to_db
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from common.checkpoint_store import CheckpointStore
+from common.retry_engine import load_error_entries, merge_entries, run_retries, write_results_csv
+
+# === 重试配置 ===
+RETRY_WORKERS = 4           # 并发重试线程数
+RETRY_RATE_PER_SEC = 1.0    # 所有线程合计每秒最多发出的请求数
+RETRY_BURST = 2             # 令牌桶容量（允许的突发请求数）
+RETRY_MAX_ATTEMPTS = 3      # 每个成语最多尝试次数（仅临时性错误会再次尝试）
+RETRY_BACKOFF_BASE = 2.0    # 临时性错误的退避基数（秒），按 2 的幂增长
+RETRY_PERMANENT = False     # 是否连解析失败、找不到详情页等永久性错误也重试
+DB_BATCH_SIZE = 50          # 每次写入数据库的批量大小
+CHECKPOINT_PATH = os.path.join(os.path.dirname(__file__), 'checkpoint.sqlite3')
+RESULT_PATH = os.path.join(os.path.dirname(__file__), 'retry_results.csv')
+# ==========================================
+
+
+def fetch_idiom(chengyu, session, wait):
+    """抓取单个成语，返回 (data, None) 或 (None, 错误信息)；网络异常直接抛出由重试引擎分类。"""
+    wait()
+    url = get_chengyu_url(chengyu, delay=0, session=session)
+    if isinstance(url, dict) and url.get('blocked'):
+        return None, f"blocked status={url.get('blocked')}"
+    if isinstance(url, dict) and url.get('error'):
+        return None, f"获取URL失败: {url.get('error')}"
+    if url is None:
+        return None, "无法获取成语详情页URL"
+
+    wait()
+    data = extract_chengyu_details_from_url(url, delay=0, session=session)
+    if isinstance(data, dict) and data.get('error') == 'blocked':
+        return None, f"blocked status={data.get('status')}"
+    if isinstance(data, dict) and 'error' in data:
+        return None, f"提取详情失败: {data.get('error')}"
+
+    # 确保数据格式正确
+    if 'data' not in data or not data.get('data'):
+        data = {'url': url, 'data': {'chengyu': chengyu}}
+    elif not data['data'].get('chengyu'):
+        data['data']['chengyu'] = chengyu
+    return data, None
 
 
 def main():
     print("开始处理错误成语...")
-    
-    # 读取所有错误成语
-    error_idioms = read_error_idioms()
-    
-    if not error_idioms:
+
+    entries = load_error_entries(os.path.dirname(os.path.abspath(__file__)), ('chengyu',))
+    store = CheckpointStore(CHECKPOINT_PATH) if os.path.exists(CHECKPOINT_PATH) else None
+    if store:
+        merge_entries(entries, [(name, error, 'checkpoint') for name, error in store.failed_items()])
+
+    if not entries:
         print("没有找到错误成语文件或文件为空")
+        if store:
+            store.close()
         return 0
-    
-    print(f"找到 {len(error_idioms)} 个错误成语")
-    
-    # 统计结果
-    success_count = 0
-    fail_count = 0
-    results = []
-    
-    # 处理每个错误成语
-    for i, (chengyu, original_error, file_name) in enumerate(error_idioms, 1):
-        print(f"\n[{i}/{len(error_idioms)}] 处理成语: {chengyu} (来自 {file_name})")
-        print(f"原错误: {original_error[:100]}{'...' if len(original_error) > 100 else ''}")
-        
-        success, message = retry_idiom(chengyu, delay=1.5)
-        
-        if success:
-            print(f"✓ 成功: {message}")
-            success_count += 1
-        else:
-            print(f"✗ 失败: {message}")
-            fail_count += 1
-        
-        results.append((chengyu, original_error, file_name, success, message))
-    
-    # 输出统计结果
+
+    by_category = {}
+    for e in entries.values():
+        by_category[e['category']] = by_category.get(e['category'], 0) + 1
+    print(f"找到 {len(entries)} 个错误成语（已去重），按类别: {by_category}")
+
+    try:
+        results, summary = run_retries(
+            entries, fetch_idiom, save_chengyu_batch_to_db,
+            workers=RETRY_WORKERS, rate_per_sec=RETRY_RATE_PER_SEC, burst=RETRY_BURST,
+            max_attempts=RETRY_MAX_ATTEMPTS, backoff_base=RETRY_BACKOFF_BASE,
+            db_batch_size=DB_BATCH_SIZE, include_permanent=RETRY_PERMANENT)
+    except KeyboardInterrupt:
+        print("已中断，本次结果未写入 retry_results.csv")
+        if store:
+            store.close()
+        return 130
+
+    if store:
+        for word, r in results.items():
+            if r['success']:
+                store.mark_saved(word)
+            elif r['attempts']:
+                store.mark_failed(word, r['message'])
+        store.close()
+
     print(f"\n处理完成!")
-    print(f"成功: {success_count}")
-    print(f"失败: {fail_count}")
-    print(f"总计: {len(error_idioms)}")
-    
-    # 保存重试结果
-    if results:
-        retry_result_file = os.path.join(os.path.dirname(__file__), 'retry_results.csv')
-        with open(retry_result_file, 'w', encoding='utf-8-sig', newline='') as f:
-            writer = csv.writer(f)
-            writer.writerow(['chengyu', 'original_error', 'source_file', 'retry_success', 'retry_message'])
-            for result in results:
-                writer.writerow(result)
-        print(f"重试结果已保存到: {retry_result_file}")
-    
-    return 0 if fail_count == 0 else 1
+    print(f"成功: {summary['success']}")
+    print(f"失败: {summary['fail']}（其中跳过永久性错误 {summary['skipped_permanent']}）")
+    print(f"总计: {summary['total']}，耗时 {summary['elapsed_seconds']}s，"
+          f"限速等待 {summary['rate_limit_wait_seconds']}s，写库 {summary['writer']['rows_per_sec']} rows/s")
+
+    write_results_csv(RESULT_PATH, results, 'chengyu')
+    print(f"重试结果已保存到: {RESULT_PATH}")
+
+    return 0 if summary['fail'] == 0 else 1
 
 
 if __name__ == '__main__':
-    exit(main())
\ No newline at end of file
+    exit(main())
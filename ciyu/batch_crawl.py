@@ -1,10 +1,10 @@
 # -*- coding: utf-8 -*-
 """
-分批爬取词语并记录每批性能指标（耗时、插入速率、错误率）、可续爬的 pending 清理逻辑及后台批量写入。
-默认每批 1000 条，结果会追加写入 ciyu/batch_metrics.csv，并自动按照上次运行的 end 值续爬。
+分批爬取词语并记录每批性能指标（耗时、插入速率、错误率）、基于检查点库的逐条续爬及后台批量写入。
+默认每批 1000 条，结果会追加写入 ciyu/batch_metrics.csv；每条的抓取/写库状态记录在 checkpoint.sqlite3 中，中断后从原位置继续。
 错误记录追加到 ciyu/batch_{batch_idx}_errors.csv，包含词语与错误信息。
 
-注意：这个脚本会实际请求网页并写入数据库（含 pending 回写、限流重试、网络异常重试等机制），
+注意：这个脚本会实际请求网页并写入数据库（含检查点回放、限流重试、网络异常重试等机制），
 请确认批量操作前已准备好网络与数据库权限。
 
 使用示例：
@@ -13,18 +13,32 @@
 import time
 import csv
 import os
-import queue
 import random
 import threading
 import requests
 import json
+import sys
 
+from ciyu_neo4j import iter_words_from_neo4j, get_word_fingerprint, iter_word_degrees
 from extract_ciyu import (
-    get_words_from_neo4j,
     get_ciyu_url,
     extract_ciyu_details_from_url,
 )
-from ciyu_mysql import save_ciyu_to_db
+import ciyu_mysql
+from ciyu_mysql import (save_ciyu_to_db, save_ciyu_batch_to_db, save_ciyu_bulk_to_db, get_database_connection,
+                        iter_crawled_words, iter_word_features, load_content_hashes, ciyu_content_hash)
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from common.word_snapshot import load_snapshot
+from common.work_plan import plan_missing, print_plan_summary
+from common.checkpoint_store import CheckpointStore, QUEUED
+from common.frontier import PriorityFrontier, rescore_queued
+from common.metrics_csv import append_metrics_row
+from common.sharded_writer import ShardedWriter
+from common.crawl_metrics import CrawlMetrics
+from common.batch_profiler import start_batch_profiler
+from common.memory_tracker import MemoryTracker
+from common.dashboard import start_dashboard
 
 # === 网络异常（断网、封IP、限流等）重试配置 ===
 RETRY_BACKOFF_BASE = 300  # 初始退避秒数
@@ -45,6 +59,10 @@ class TransientAccessError(Exception):
         super().__init__(detail)
         self.detail = detail
 
+
+class IPBlockedError(Exception):
+    """限流/封禁在最大退避后仍未解除：停止本批次（termination_reason = blocked_ip），当前词条保持 queued。"""
+
 CSV_PATH = os.path.join(os.path.dirname(__file__), 'batch_metrics.csv')
 
 # === 批量爬取的配置 ===
@@ -52,10 +70,37 @@ DEFAULT_BATCH_SIZE = 1000  # 批量处理的词语数量
 DEFAULT_REQUEST_DELAY = 0.0  # 词语详情请求的固定延迟
 DEFAULT_SEARCH_DELAY = 0.0   # 搜索词语 URL 的固定延迟
 DEFAULT_JITTER_MAX = 0.8     # 每次请求的最大随机抖动秒数
-PENDING_PATH = os.path.join(os.path.dirname(__file__), 'pending.json')
+PENDING_PATH = os.path.join(os.path.dirname(__file__), 'pending.json') # 旧版 pending 文件，仅在首次创建检查点库时迁移
+CHECKPOINT_PATH = os.path.join(os.path.dirname(__file__), 'checkpoint.sqlite3') # 逐条状态检查点库（SQLite WAL）
 DB_BATCH_SIZE = 50 # 每次写入数据库的批量大小
 DB_FLUSH_INTERVAL = 3.0 # 数据库写入缓冲区最大等待秒数
-DEFAULT_GRACEFUL_SHUTDOWN_WAIT = 3.0 # Ctrl+C 后等待写库的秒数（可调整）
+NEO4J_PAGE_SIZE = 5000 # 从 Neo4j 按 name 有序分页读取词语的每页条数
+SNAPSHOT_PATH = os.path.join(os.path.dirname(__file__), 'words.snapshot') # Neo4j 词语列表的本地快照
+SNAPSHOT_VERIFY = True # 启动时是否向 Neo4j 校验快照指纹（False 则直接使用本地快照）
+USE_WORK_PLAN = True # 建立或刷新检查点库时对 Neo4j 与 MySQL 做集合差校正状态，只爬尚未入库的词语（False 则首次建库时按 CSV 的 end 偏移迁移）
+WORK_PLAN_SORTED_MERGE_THRESHOLD = 2000000 # 候选数超过该值时改用有序归并求差集，避免把已入库的键全部读入内存
+SCHEDULING = 'priority' # 'fifo' 按快照顺序爬取；'priority' 按 Neo4j 度数、使用频度、陈旧度与重试紧迫度从高到低爬取（见 common/frontier.py）
+PRIORITY_REFRESH_HOURS = 24 # 优先级超过该小时数或快照变化后重新计算（陈旧度随时间变化）
+SKIP_UNCHANGED = True # 批次开始时预读已入库词语的 content_hash，内容未变化的不再写库（需先运行 create_table 补齐 content_hash 列）
+WRITE_MODE = 'upsert' # 'upsert' 逐条事务写库；'bulk' 整批 TSV + LOAD DATA + 集合 SQL 导入（首次全量入库用，需开启 local_infile）
+BULK_BATCH_SIZE = 1000 # bulk 模式下每次导入的条数（通常取一个爬取批次）
+BULK_FLUSH_INTERVAL = 120.0 # bulk 模式下缓冲区最长等待秒数
+DEFER_RELATIONS = False # True 时只写基础表，近/反义关系与占位行留给 build_relations.py 爬完后集合构建
+DB_WRITERS = 1 # 写库线程数：按键哈希分片，每个线程有自己的队列、缓冲区与数据库连接（远程库往返慢时调大）
+WRITE_QUEUE_MAX_ITEMS = 2000 # 抓取→写库队列（各写线程均分）最多容纳的记录数，满了抓取端阻塞等待写库（背压）
+WRITE_QUEUE_MAX_BYTES = 64 * 1024 * 1024 # 队列中记录（按解析结果 JSON 计）的总字节上限
+PROFILE_MODE = None # None 不剖析；'sample' 统计采样（低开销，含写线程）；'cprofile' 确定性剖析抓取线程。每批在 CSV 同目录写 batch_{idx}.prof 与 batch_{idx}.collapsed（见 common/batch_profiler.py）
+PROFILE_SAMPLE_INTERVAL = 0.005 # 采样间隔（秒）
+MEMORY_PROFILE = False # True 时用 tracemalloc 统计 Python 分配，每批在 CSV 同目录写 batch_{idx}_memory.txt（新增最多的分配位置）；会拖慢解析，排查时再开
+MEMORY_ALARM_BATCHES = 3 # 常驻内存连续增长多少批后检查泄漏
+MEMORY_ALARM_MB = 50.0 # 上述批次内累计增长超过该值（MB）时告警并在指标列 leak_alarm 记 1
+METRICS_PORT = None # 设为端口号（如 9108）时在 127.0.0.1 上提供 Prometheus 格式的 /metrics 端点（见 common/crawl_metrics.py）
+DASHBOARD = True # 终端实时仪表盘：进度与剩余时间、速率、成功/失败/缺失、退避状态与写库滞后（见 common/dashboard.py）；输出不是终端时改为定期一行汇总
+DASHBOARD_REFRESH = 0.5 # 仪表盘刷新间隔（秒），与吞吐无关
+DASHBOARD_SUMMARY_INTERVAL = 30.0 # 输出不是终端时每隔多少秒打印一行汇总
+
+METRICS = CrawlMetrics('ciyu')
+MEMORY = MemoryTracker(alarm_batches=MEMORY_ALARM_BATCHES, alarm_mb=MEMORY_ALARM_MB)
 # ==========================================
 
 
@@ -82,7 +127,11 @@ def _retry_with_backoff(action, label):
                     raise
                 waited_max_delay = True
             print(msg)
-            time.sleep(delay)
+            METRICS.backoff(label, delay)
+            try:
+                time.sleep(delay)
+            finally:
+                METRICS.backoff_done()
             attempt += 1
 
 
@@ -106,12 +155,46 @@ def read_total_processed_from_csv():
         return 0
 
 
-def run_batch(batch_idx, words, request_delay=DEFAULT_REQUEST_DELAY, search_delay=DEFAULT_SEARCH_DELAY,
-              jitter_max=DEFAULT_JITTER_MAX, db_batch_size=DB_BATCH_SIZE,
-              graceful_wait_seconds=DEFAULT_GRACEFUL_SHUTDOWN_WAIT, processed_offset_start=0,
+def read_next_batch_idx_from_csv():
+    """返回 batch_metrics.csv 中最大 batch_idx + 1，避免覆盖已有的 batch_{idx}_errors.csv。"""
+    try:
+        if not os.path.exists(CSV_PATH):
+            return 0
+        with open(CSV_PATH, 'r', encoding='utf-8-sig') as f:
+            next_idx = 0
+            for row in csv.DictReader(f):
+                try:
+                    next_idx = max(next_idx, int(row.get('batch_idx') or 0) + 1)
+                except Exception:
+                    continue
+            return next_idx
+    except Exception:
+        return 0
+
+
+def plan_missing_words(words):
+    """用集合差计算 Neo4j 中尚未爬取入库的词语；无法读取 MySQL 时返回 None（退回按偏移续爬）。"""
+    # 快照与 MySQL（utf8mb4_bin）都按 Unicode 码点排序时才能做有序归并
+    sorted_merge = (len(words) > WORK_PLAN_SORTED_MERGE_THRESHOLD
+                    and words.meta.get('python_sorted', False))
+    try:
+        todo, stats = plan_missing(words, iter_crawled_words(ordered=sorted_merge), sorted_merge=sorted_merge)
+    except Exception as exc:
+        print(f'[WARN] 任务规划失败，退回按 batch_metrics.csv 偏移续爬: {exc}')
+        return None
+    print_plan_summary(stats, noun='词语')
+    return todo
+
+
+def run_batch(batch_idx, words, store, request_delay=DEFAULT_REQUEST_DELAY, search_delay=DEFAULT_SEARCH_DELAY,
+              jitter_max=DEFAULT_JITTER_MAX, db_batch_size=DB_BATCH_SIZE, processed_offset_start=0,
               is_last_batch=False):
-    """单线程抓取 + 后台批量写入（生产者-消费者），支持随机抖动与断点续爬。"""
+    """单线程抓取 + DB_WRITERS 个按键分片的后台批量写线程（生产者-消费者），支持随机抖动；每条的状态实时记录到检查点库 store。"""
     start_time = time.perf_counter()
+    METRICS.begin_batch(f'第 {batch_idx} 批')  # 本批各阶段耗时（search / detail / parse / jitter / backoff / db_write）
+    MEMORY.begin_batch(trace=MEMORY_PROFILE)
+    profiler = start_batch_profiler(PROFILE_MODE, os.path.dirname(CSV_PATH), f'batch_{batch_idx}',
+                                    interval=PROFILE_SAMPLE_INTERVAL)
     processed = 0
     success = 0
     fail = 0
@@ -120,32 +203,10 @@ def run_batch(batch_idx, words, request_delay=DEFAULT_REQUEST_DELAY, search_dela
     was_interrupted = False
     termination_reason = 'batch_completed'
 
-    def read_json_list(path):
-        try:
-            if not os.path.exists(path):
-                return []
-            with open(path, 'r', encoding='utf-8') as pf:
-                txt = pf.read()
-                if not txt or not txt.strip():
-                    return []
-                return json.loads(txt)
-        except Exception:
-            return []
-
-    def write_json_list(path, lst):
-        try:
-            with open(path, 'w', encoding='utf-8') as pf:
-                json.dump(lst, pf, ensure_ascii=False)
-        except Exception as exc:
-            print(f'写入 JSON 文件失败 ({path}):', exc)
-
-    pending_list = read_json_list(PENDING_PATH)
-    pending_set = set(pending_list)
-
-    q = queue.Queue()
-    writer_stop = threading.Event()
-    writer_stats = {'success': 0, 'fail': 0}
-    lock = threading.Lock()
+    writer_stats = {'success': 0, 'fail': 0, 'skipped_unchanged': 0}
+    stats_lock = threading.Lock()  # 多个写线程共同累加 writer_stats
+    # 预读本批词语已入库内容的哈希：写库前在内存中比较，未变化的不发送任何 SQL（TEST_MODE 不连库，不预读）
+    known_hashes = load_content_hashes(words) if SKIP_UNCHANGED and not ciyu_mysql.TEST_MODE else {}
 
     def _call_with_network_retry(func, *args, **kwargs):
         """包装函数，遇到网络异常时等待后重试，超过限制则抛出 NetworkOutageError。"""
@@ -161,60 +222,61 @@ def run_batch(batch_idx, words, request_delay=DEFAULT_REQUEST_DELAY, search_dela
             print('网络异常持续存在，已达到最大退避时长，终止本批次。')
             raise NetworkOutageError from exc
 
-    def persist_pending(word):
-        try:
-            with lock:
-                lst = read_json_list(PENDING_PATH)
-                if word not in lst:
-                    lst.append(word)
-                    write_json_list(PENDING_PATH, lst)
-        except Exception as exc:
-            print('写入 pending 文件失败:', exc)
-
-    def db_writer():
-        buffer = []
-        last_flush = time.time()
-        while not writer_stop.is_set() or not q.empty():
-            try:
-                item = q.get(timeout=0.5)
-            except queue.Empty:
-                item = None
-
-            if item is not None:
-                buffer.append(item)
-
-            if (len(buffer) >= db_batch_size) or (buffer and (time.time() - last_flush) > DB_FLUSH_INTERVAL) or (writer_stop.is_set() and buffer):
-                for it in buffer:
-                    try:
-                        ok = save_ciyu_to_db(it)
-                        if ok:
-                            writer_stats['success'] += 1
-                            word = None
-                            try:
-                                word = it.get('data', {}).get('word')
-                            except Exception:
-                                word = None
-                            if word:
-                                try:
-                                    with lock:
-                                        lst = read_json_list(PENDING_PATH)
-                                        if word in lst:
-                                            lst.remove(word)
-                                            write_json_list(PENDING_PATH, lst)
-                                except Exception as exc:
-                                    print('更新 pending 失败:', exc)
-                        else:
-                            writer_stats['fail'] += 1
-                    except Exception as exc:
-                        writer_stats['fail'] += 1
-                        print('DB 写入异常:', exc)
-                buffer = []
-                last_flush = time.time()
-
-    writer = threading.Thread(target=db_writer, daemon=True)
-    writer.start()
+    bulk = WRITE_MODE == 'bulk'
+    flush_size = BULK_BATCH_SIZE if bulk else db_batch_size
+    flush_interval = BULK_FLUSH_INTERVAL if bulk else DB_FLUSH_INTERVAL
+
+    def _flush(buffer, connection):
+        """一个写线程的一次刷新；队列元素为 (检查点中的词语, 解析结果)。返回 (成功条数, 失败条数)。"""
+        pending = []
+        skipped = 0
+        for word, it in buffer:
+            # 内容未变化的直接标记为已入库，不发送任何 SQL
+            old_hash = known_hashes.get((it.get('data') or {}).get('word') or word)
+            if old_hash and old_hash == ciyu_content_hash(it):
+                skipped += 1
+                store.mark_saved(word)
+            else:
+                pending.append((word, it))
+        saved, failed = [], []
+        if pending:
+            names = {id(it): word for word, it in pending}
+            with METRICS.stage('db_write'):
+                if bulk:
+                    saved, failed, _ = save_ciyu_bulk_to_db([it for _, it in pending],
+                                                            build_relations=not DEFER_RELATIONS)
+                else:
+                    # 每个写线程复用自己的连接，整批一个事务（每条一个 SAVEPOINT）、一次提交；长时间空闲后先检查连接
+                    if connection is not None:
+                        connection.ping(reconnect=True)
+                    saved, failed, _ = save_ciyu_batch_to_db([it for _, it in pending], connection=connection,
+                                                             build_relations=not DEFER_RELATIONS)
+            for it in saved:
+                store.mark_saved(names[id(it)])
+            for it, err in failed:
+                store.mark_failed(names[id(it)], f'DB 写入失败: {err}', attempt=False)
+        with stats_lock:
+            writer_stats['success'] += len(saved)
+            writer_stats['fail'] += len(failed)
+            writer_stats['skipped_unchanged'] += skipped
+        return len(saved) + skipped, len(failed)
+
+    def _open_writer_connection():
+        # TEST_MODE 不连库；bulk 模式每批自建 local_infile 连接
+        if ciyu_mysql.TEST_MODE or bulk:
+            return None
+        return get_database_connection()
+
+    # 按词语分片到 DB_WRITERS 个写线程：同一词语的写入总在同一线程内按先后顺序执行
+    writer = ShardedWriter(_flush, num_writers=DB_WRITERS, key_fn=lambda item: item[0],
+                           batch_size=flush_size, flush_interval=flush_interval,
+                           max_items=WRITE_QUEUE_MAX_ITEMS, max_bytes=WRITE_QUEUE_MAX_BYTES,
+                           open_fn=_open_writer_connection).start()
+
+    session = METRICS.session()
 
     chunk_processed = 0
+    METRICS.track_writer(writer, remaining_fn=lambda: len(words) - chunk_processed)
 
     def _process_word(word):
         nonlocal processed, success, fail, was_interrupted, missing_detail_pages, termination_reason
@@ -224,13 +286,15 @@ def run_batch(batch_idx, words, request_delay=DEFAULT_REQUEST_DELAY, search_dela
             processed += 1
 
         def _resolve_search_url():
-            url = _call_with_network_retry(get_ciyu_url, word, delay=search_delay)
+            url = _call_with_network_retry(METRICS.timed, 'search', get_ciyu_url, word, delay=search_delay,
+                                           session=session, idle_seconds=search_delay)
             if isinstance(url, dict) and url.get('blocked'):
                 raise TransientAccessError(f"status={url.get('blocked')}")
             return url
 
         def _fetch_detail():
-            data = _call_with_network_retry(extract_ciyu_details_from_url, url, delay=request_delay)
+            data = _call_with_network_retry(METRICS.timed, 'detail', extract_ciyu_details_from_url, url,
+                                            delay=request_delay, session=session, idle_seconds=request_delay)
             if isinstance(data, dict) and (data.get('error') in ('blocked',) or (data.get('status') in (429, 403, 503))):
                 blocked_status = data.get('status')
                 if not blocked_status and data.get('error') == 'blocked':
@@ -239,24 +303,30 @@ def run_batch(batch_idx, words, request_delay=DEFAULT_REQUEST_DELAY, search_dela
             return data
 
         try:
-            time.sleep(random.uniform(0, jitter_max))
+            METRICS.sleep('jitter', random.uniform(0, jitter_max))
             url = _retry_with_backoff(_resolve_search_url, '限流/封禁 (搜索)')
             if isinstance(url, dict) and url.get('error'):
                 fail += 1
+                METRICS.entry('fail')
                 errors.append((word, url.get('error')))
+                store.mark_failed(word, url.get('error'), batch_idx=batch_idx)
                 mark_processed()
                 return True
 
             if url is None:
                 missing_detail_pages += 1
+                METRICS.entry('missing')
+                store.mark_missing(word, batch_idx=batch_idx)
                 mark_processed()
                 return True
 
-            time.sleep(random.uniform(0, jitter_max))
+            METRICS.sleep('jitter', random.uniform(0, jitter_max))
             data = _retry_with_backoff(_fetch_detail, '限流/封禁 (详情页)')
             if isinstance(data, dict) and 'error' in data:
                 fail += 1
+                METRICS.entry('fail')
                 errors.append((word, data.get('error')))
+                store.mark_failed(word, data.get('error'), batch_idx=batch_idx)
                 mark_processed()
                 return True
 
@@ -266,61 +336,76 @@ def run_batch(batch_idx, words, request_delay=DEFAULT_REQUEST_DELAY, search_dela
                 if not data['data'].get('word'):
                     data['data']['word'] = word
 
-            normalized_word = data.get('data', {}).get('word') or word
-            persist_pending(normalized_word)
-            pending_set.add(normalized_word)
-            q.put(data)
+            # 先落检查点（含解析结果）再入队：中断后可直接回放写库，无需重新抓取
+            nbytes = store.mark_fetched(word, data, batch_idx=batch_idx)
+            writer.put((word, data), nbytes)
             success += 1
+            METRICS.entry('success')
             mark_processed()
             return True
         except KeyboardInterrupt:
+            # 当前这条保持 queued；已抓取的由下方收尾整批写库
             termination_reason = 'manual_exit'
-            print('收到中断信号，等待短时间写库后退出...')
-            writer_stop.set()
-            try:
-                writer.join(timeout=graceful_wait_seconds)
-            except Exception:
-                pass
             was_interrupted = True
             return False
         except NetworkOutageError:
             raise
+        except TransientAccessError as exc:
+            # 只有限流/封禁的退避会把 TransientAccessError 抛到这里（网络异常已转换为 NetworkOutageError）。
+            # 不再记为单条失败继续下一条，否则持续封禁会把整个队列都标记为 failed
+            raise IPBlockedError(exc.detail) from exc
         except Exception as exc:
             fail += 1
+            METRICS.entry('fail')
             errors.append((word, str(exc)))
+            store.mark_failed(word, exc, batch_idx=batch_idx)
             mark_processed()
             return True
 
-    def _process_pending_words():
-        for pending in pending_list:
-            if not _process_word(pending):
-                return False
-        return True
-
     def _process_chunk_words():
         nonlocal chunk_processed
         for word in words:
-            if word in pending_set:
-                continue
             if not _process_word(word):
                 return False
             chunk_processed += 1
         return True
 
-    pending_completed = False # 是否已完成 pending 列表的处理
     try:
-        pending_completed = _process_pending_words()
-        if pending_completed and not was_interrupted:
-            _process_chunk_words()
+        _process_chunk_words()
     except NetworkOutageError:
         print('网络异常仍未恢复，终止本批次以便下次重试。')
         was_interrupted = True
         termination_reason = 'network_outage'
+    except IPBlockedError as exc:
+        print(f'限流/封禁持续存在（{exc}），终止本批次，请稍后或更换出口 IP 后重启。')
+        was_interrupted = True
+        termination_reason = 'blocked_ip'
+    except KeyboardInterrupt:
+        # Ctrl+C 落在两条之间（不在单条处理内）
+        termination_reason = 'manual_exit'
+        was_interrupted = True
     finally:
-        writer_stop.set()
-        writer.join()
+        # 收尾：停止抓取后等写线程把队列与缓冲区全部写完（每个写线程整批一次提交），不设超时；
+        # 再次 Ctrl+C 则不再等待，未写完的词语保持 fetched，下次启动时直接回放写库
+        shutdown_flush_items = writer.pending()
+        if termination_reason == 'manual_exit':
+            print(f'收到中断信号，已停止抓取，正在把 {shutdown_flush_items} 条已抓取的词语整批写库（再次 Ctrl+C 强制退出）...')
+        flush_t0 = time.perf_counter()
+        try:
+            writer.stop()
+        except KeyboardInterrupt:
+            termination_reason = 'forced_exit'
+            was_interrupted = True
+            # 写线程不再发起新的刷新，避免在检查点库关闭后继续写状态
+            writer.abandon()
+            print(f'再次收到中断信号，强制退出：{writer.pending()} 条未确认写库的词语保留为 fetched，下次启动时回放写库。')
+        shutdown_flush_seconds = time.perf_counter() - flush_t0
+        if termination_reason == 'manual_exit':
+            print(f'收尾写库完成：{shutdown_flush_items} 条，耗时 {shutdown_flush_seconds:.2f}s')
+        profiler.stop()
 
-    fail += writer_stats.get('fail', 0)
+    # 取各写线程的失败数：除 _flush 返回的逐条失败外，还包括 flush_fn 抛异常时整批记失败的条目
+    fail += sum(w['fail'] for w in writer.writer_stats())
 
     if termination_reason == 'batch_completed':
         if chunk_processed == 0:
@@ -328,7 +413,16 @@ def run_batch(batch_idx, words, request_delay=DEFAULT_REQUEST_DELAY, search_dela
         elif is_last_batch and words and chunk_processed >= len(words):
             termination_reason = 'all_done'
 
+    interrupted_flush = termination_reason in ('manual_exit', 'forced_exit')
     elapsed = time.perf_counter() - start_time
+    stage_columns = METRICS.end_batch()
+    memory_columns = MEMORY.end_batch(f'第 {batch_idx} 批', report_path=os.path.join(
+        os.path.dirname(CSV_PATH), f'batch_{batch_idx}_memory.txt'))
+    queue_stats = writer.stats()
+    per_writer = writer.writer_stats()
+    if queue_stats['producer_waits']:
+        print(f"  写库队列满导致抓取等待 {queue_stats['producer_waits']} 次、共 {queue_stats['producer_wait_seconds']}s，"
+              f"峰值 {queue_stats['peak_items']} 条 / {queue_stats['peak_bytes'] / 1024 / 1024:.1f} MB")
     insert_rate = success / elapsed if elapsed > 0 else 0
     error_rate = fail / processed if processed > 0 else 0
 
@@ -340,6 +434,19 @@ def run_batch(batch_idx, words, request_delay=DEFAULT_REQUEST_DELAY, search_dela
         'success': success,
         'fail': fail,
         'missing_detail_pages': missing_detail_pages,
+        'skipped_unchanged': writer_stats['skipped_unchanged'],
+        'queue_peak_items': queue_stats['peak_items'],
+        'queue_peak_bytes': queue_stats['peak_bytes'],
+        'producer_wait_seconds': queue_stats['producer_wait_seconds'],
+        'writer_lag_avg_seconds': queue_stats['lag_avg_seconds'],
+        'writer_lag_max_seconds': queue_stats['lag_max_seconds'],
+        'db_writers': len(per_writer),
+        'writer_rows_per_sec': '/'.join(str(w['rows_per_sec']) for w in per_writer),
+        # 只记录中断后的收尾写库；正常结束的批次留空
+        'shutdown_flush_items': shutdown_flush_items if interrupted_flush else '',
+        'shutdown_flush_seconds': round(shutdown_flush_seconds, 3) if interrupted_flush else '',
+        **stage_columns,
+        **memory_columns,
         'termination_reason': termination_reason,
         'elapsed_seconds': round(elapsed, 3),
         'insert_rate_per_sec': round(insert_rate, 3),
@@ -347,15 +454,10 @@ def run_batch(batch_idx, words, request_delay=DEFAULT_REQUEST_DELAY, search_dela
         'timestamp': time.strftime('%Y-%m-%d %H:%M:%S')
     }
 
-    write_header = not os.path.exists(CSV_PATH)
-    with open(CSV_PATH, 'a', encoding='utf-8-sig', newline='') as f:
-        writer = csv.DictWriter(f, fieldnames=list(metrics.keys()))
-        if write_header:
-            writer.writeheader()
-        writer.writerow(metrics)
+    append_metrics_row(CSV_PATH, metrics)
 
     if errors:
-        err_path = os.path.join(os.path.dirname(__file__), f'batch_{batch_idx}_errors.csv')
+        err_path = os.path.join(os.path.dirname(CSV_PATH), f'batch_{batch_idx}_errors.csv')
         with open(err_path, 'w', encoding='utf-8-sig', newline='') as ef:
             ew = csv.writer(ef)
             ew.writerow(['word', 'error'])
@@ -368,55 +470,169 @@ def run_batch(batch_idx, words, request_delay=DEFAULT_REQUEST_DELAY, search_dela
     return metrics, chunk_processed
 
 
+def open_checkpoint_store(words):
+    """
+    打开检查点库，并在首次创建或快照变化时登记词语、校正状态。
+
+    - 登记：按快照顺序 INSERT OR IGNORE，已有条目保持原状态，Neo4j 新增的词语进入 queued；
+    - 校正：USE_WORK_PLAN 时用 MySQL 集合差把已入库的标为 saved；否则首次建库时按旧的 CSV end 偏移迁移；
+    - 首次建库还会迁移 pending.json（重新排队）与 CSV 中的批次号。
+    快照未变化时直接复用，启动不再扫描 batch_metrics.csv。
+    """
+    store = CheckpointStore(CHECKPOINT_PATH)
+    migrating = store.is_new or store.get_meta('snapshot_fingerprint') is None
+    if not migrating and store.get_meta('snapshot_fingerprint') == words.fingerprint:
+        return store
+
+    t0 = time.perf_counter()
+    store.enqueue(words)
+    todo = plan_missing_words(words) if USE_WORK_PLAN else None
+    if todo is not None:
+        done, requeued = store.reconcile(todo)
+        print(f'检查点校正：{done} 个标记为已入库，{requeued} 个重新排队')
+    elif migrating:
+        end = read_total_processed_from_csv()
+        if end:
+            print(f'从 batch_metrics.csv 迁移续爬位置：前 {store.mark_saved_before(end)} 个词语标记为已入库')
+
+    if migrating:
+        store.set_meta('next_batch_idx', read_next_batch_idx_from_csv())
+        if os.path.exists(PENDING_PATH):
+            try:
+                with open(PENDING_PATH, 'r', encoding='utf-8') as pf:
+                    pending = json.loads(pf.read() or '[]')
+                store.requeue(pending)
+                os.replace(PENDING_PATH, PENDING_PATH + '.migrated')
+                print(f'已把 pending.json 中的 {len(pending)} 个词语重新排队')
+            except Exception as e:
+                print('[WARN] 迁移 pending.json 失败:', e)
+    store.set_meta('snapshot_fingerprint', words.fingerprint)
+    print(f'检查点库已就绪（{time.perf_counter() - t0:.1f}s）：{store.counts()}')
+    return store
+
+
+def rescore_words(store, fingerprint):
+    """优先级调度时，在快照变化或优先级过期后为 queued 项重新打分（结果持久化在检查点库中）。"""
+    scored_at = float(store.get_meta('priority_scored_at') or 0)
+    if (store.get_meta('priority_fingerprint') == fingerprint
+            and time.time() - scored_at < PRIORITY_REFRESH_HOURS * 3600):
+        return
+    rescore_queued(store, lambda: iter_word_degrees(page_size=NEO4J_PAGE_SIZE), iter_word_features, noun='词语')
+    store.set_meta('priority_fingerprint', fingerprint)
+    store.set_meta('priority_scored_at', str(time.time()))
+
+
+def replay_fetched(store):
+    """把上次已抓取、尚未确认写库的词语直接写库（不重新抓取），返回成功条数。"""
+    items = store.fetched_items()
+    if not items:
+        return 0
+    print(f'回放 {len(items)} 个已抓取未写库的词语...')
+    if WRITE_MODE == 'bulk':
+        names = {}
+        for word, data in items:
+            if data is None:
+                store.requeue([word])
+            else:
+                names[id(data)] = word
+        saved_items, failed, _ = save_ciyu_bulk_to_db([d for word, d in items if d is not None],
+                                                      build_relations=not DEFER_RELATIONS)
+        for data in saved_items:
+            store.mark_saved(names[id(data)])
+        for data, err in failed:
+            store.mark_failed(names[id(data)], f'DB 批量导入失败（回放）: {err}', attempt=False)
+        print(f'回放完成：成功 {len(saved_items)}/{len(items)}')
+        return len(saved_items)
+
+    saved = 0
+    for word, data in items:
+        if data is None:
+            store.requeue([word])
+            continue
+        try:
+            ok = save_ciyu_to_db(data, build_relations=not DEFER_RELATIONS)
+        except Exception as e:
+            ok = False
+            print('DB 写入异常:', e)
+        if ok:
+            store.mark_saved(word)
+            saved += 1
+        else:
+            store.mark_failed(word, 'DB 写入失败（回放）', attempt=False)
+    print(f'回放完成：成功 {saved}/{len(items)}')
+    return saved
+
+
 def main(batch_size=100, request_delay=DEFAULT_REQUEST_DELAY, search_delay=DEFAULT_SEARCH_DELAY):
-    words = get_words_from_neo4j()
+    METRICS.serve(METRICS_PORT)
+    # 词语列表来自本地 mmap 快照：与 Neo4j 指纹一致时直接打开，否则按 name 有序 keyset 分页全量刷新。
+    words = load_snapshot(SNAPSHOT_PATH, get_word_fingerprint,
+                          lambda: iter_words_from_neo4j(page_size=NEO4J_PAGE_SIZE),
+                          label='Word', verify=SNAPSHOT_VERIFY)
     if not words:
         print('未从 Neo4j 获取到词语列表，退出')
         return 2
-    total = len(words)
-    print(f'获取到 {total} 个词语，分批大小: {batch_size}')
+    print(f'获取到 {len(words)} 个词语，分批大小: {batch_size}')
 
-    processed_total = read_total_processed_from_csv()
-    if processed_total >= total:
-        print('所有词语已处理，跳过爬取。性能指标已追加到', CSV_PATH)
+    # 续爬以检查点库中每个词语的状态为准：按调度方式从剩余 queued 项继续，中断的批次不会从头重来
+    dashboard = None
+    store = open_checkpoint_store(words)
+    try:
+        replay_fetched(store)
+        total = store.total()
+        remaining = store.counts().get(QUEUED, 0)
+        if remaining == 0:
+            print('所有词语已处理，跳过爬取。')
+            return 0
+        print(f'待爬取 {remaining} 个词语（共 {total} 个），调度方式: {SCHEDULING}')
+
+        frontier = None
+        if SCHEDULING == 'priority':
+            rescore_words(store, words.fingerprint)
+            frontier = PriorityFrontier.from_store(store)
+            top = frontier.peek()
+            if top:
+                print(f'优先级最高的词语: {top[0]}（{top[1]:.2f}）')
+
+        # 仪表盘的进度与剩余时间按检查点中的总数计算（以前运行已处理的也算已完成）
+        METRICS.set_progress(total, total - remaining)
+        dashboard = start_dashboard(METRICS, enabled=DASHBOARD, refresh=DASHBOARD_REFRESH,
+                                    summary_interval=DASHBOARD_SUMMARY_INTERVAL)
+        while remaining > 0:
+            chunk = frontier.pop_batch(batch_size) if frontier is not None else store.next_queued(batch_size)
+            if not chunk:
+                break
+            batch_idx = store.next_batch_idx()
+            finished = total - remaining
+            print(f'开始第 {batch_idx} 批: {finished+1}-{finished+len(chunk)} (已处理 {finished})')
+            try:
+                m, chunk_processed = run_batch(batch_idx, chunk, store, request_delay=request_delay,
+                                                search_delay=search_delay,
+                                                processed_offset_start=finished,
+                                                is_last_batch=(len(chunk) >= remaining))
+                print('  批次指标:', m)
+            except KeyboardInterrupt:
+                print('收到中断信号，停止后续批次。下次运行将从检查点继续。')
+                return 130
+
+            if chunk_processed == 0:
+                print('本批次未处理新的词语，可能被封或空闲，先停止以便下次继续。')
+                break
+
+            remaining -= chunk_processed
+            if chunk_processed < len(chunk):
+                print('本批次未完全完成，将在下一次运行继续剩余词语。')
+                break
+
+        if remaining <= 0:
+            print('全部批次完成。性能指标已追加到', CSV_PATH)
+        else:
+            print(f'本次运行结束，剩余 {remaining} 个词语，下一次将从检查点继续。')
         return 0
-
-    start_index = processed_total
-    batch_idx = start_index // batch_size
-
-    while start_index < total:
-        current_batch_end = min(((start_index // batch_size) + 1) * batch_size, total)
-        if start_index >= current_batch_end:
-            break
-        chunk = words[start_index:current_batch_end]
-        chunk_end = current_batch_end
-        print(f'开始第 {batch_idx} 批: {start_index+1}-{chunk_end} (已处理 {start_index})')
-        try:
-            m, chunk_processed = run_batch(batch_idx, chunk, request_delay=request_delay,
-                                            search_delay=search_delay,
-                                            processed_offset_start=start_index,
-                                            is_last_batch=(chunk_end >= total))
-            print('  批次指标:', m)
-        except KeyboardInterrupt:
-            print('收到中断信号，停止后续批次。下次运行将从上次退出位置继续。')
-            return 130
-
-        if chunk_processed == 0:
-            print('本批次未处理新的词语，可能被封或空闲，先停止以便下次继续。')
-            break
-
-        start_index += chunk_processed
-        if chunk_processed < len(chunk):
-            print('本批次未完全完成，将在下一次运行继续剩余词语。')
-            break
-
-        batch_idx += 1
-
-    if start_index >= total:
-        print('全部批次完成。性能指标已追加到', CSV_PATH)
-    else:
-        print('本次运行处理到', start_index, '条词语，下一次将从此位置继续。')
-    return 0
+    finally:
+        if dashboard is not None:
+            dashboard.stop()
+        store.close()
 
 
 if __name__ == '__main__':
@@ -5,10 +5,36 @@
 """
 import json
 import pymysql
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from common.bulk_load import bulk_upsert
+from common.content_hash import content_hash, parse_json_list
+from common.storage import open_storage
+from common.sampled_log import SampledLogger
 
 # 模式标志：是否为测试模式（不实际写入数据库）
 # TEST_MODE = False
 TEST_MODE = True
+# TEST_MODE 的 SQL 计划按事件（save / skip_error）抽样输出为 JSON 行：前 TEST_MODE_LOG_FIRST 条与之后每 TEST_MODE_LOG_EVERY 条，其余只计数
+TEST_MODE_LOG_FIRST = 3
+TEST_MODE_LOG_EVERY = 100
+TEST_LOG = SampledLogger("ciyu_mysql", first=TEST_MODE_LOG_FIRST, every=TEST_MODE_LOG_EVERY)
+
+# 参与内容哈希的字段（不含 url 与时间戳），见 common/content_hash.py
+CONTENT_FIELDS = ('pinyin', 'zhuyin', 'part_of_speech', 'is_common', 'definition', 'synonyms', 'antonyms')
+
+# LOAD DATA 批量导入的表结构描述（见 common/bulk_load.py）
+BULK_SPEC = {
+    "table": "hanyuguoxue_ciyu",
+    "key": "word",
+    "columns": ["word", "url", "pinyin", "zhuyin", "part_of_speech", "is_common", "definition",
+                "synonyms", "antonyms", "content_hash"],
+    "relation_table": "ciyu_relation",
+    "relation_columns": {"synonym": "synonyms", "antonym": "antonyms"},
+    "term_length": 100,
+}
 
 # MySQL 连接配置
 mysql_config = {
@@ -20,75 +46,232 @@ mysql_config = {
 }
 
 
-def get_database_connection():
+# 存储后端：'mysql' 写入 mysql_config 指向的库；'sqlite' 写入本地文件库（离线运行与本地压测用，见 common/storage.py）
+STORAGE_BACKEND = 'mysql'
+SQLITE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'ciyu_local.db')
+
+# SQLite 后端的建表语句，列与唯一键和 create_table_ciyu.py 中的 MySQL 表一致
+SQLITE_SCHEMA = [
+    """
+    CREATE TABLE IF NOT EXISTS hanyuguoxue_ciyu (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        word TEXT NOT NULL UNIQUE,
+        url TEXT,
+        pinyin TEXT,
+        zhuyin TEXT,
+        part_of_speech TEXT,
+        is_common INTEGER DEFAULT 0,
+        definition TEXT,
+        synonyms TEXT,
+        antonyms TEXT,
+        error TEXT,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        checked_at TIMESTAMP NULL DEFAULT NULL,
+        content_hash TEXT NULL DEFAULT NULL
+    );
+    CREATE INDEX IF NOT EXISTS idx_pos ON hanyuguoxue_ciyu (part_of_speech);
+    CREATE INDEX IF NOT EXISTS idx_updated_at ON hanyuguoxue_ciyu (updated_at);
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS ciyu_relation (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        min_id INTEGER NOT NULL REFERENCES hanyuguoxue_ciyu(id) ON DELETE CASCADE,
+        max_id INTEGER NOT NULL REFERENCES hanyuguoxue_ciyu(id) ON DELETE CASCADE,
+        relation_type TEXT NOT NULL CHECK (relation_type IN ('synonym', 'antonym')),
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        UNIQUE (min_id, max_id, relation_type)
+    );
+    CREATE INDEX IF NOT EXISTS idx_relation_max ON ciyu_relation (max_id);
+    """,
+]
+SQLITE_CONFLICT_KEYS = {"hanyuguoxue_ciyu": "word"}
+
+_storage = None
+_storage_key = None
+
+
+def get_storage():
+    """按 STORAGE_BACKEND / SQLITE_PATH 返回存储后端（两者修改后自动重建）。"""
+    global _storage, _storage_key
+    key = (STORAGE_BACKEND, SQLITE_PATH)
+    if _storage is None or _storage_key != key:
+        _storage = open_storage(STORAGE_BACKEND, mysql_config=mysql_config, sqlite_path=SQLITE_PATH,
+                                sqlite_schema=SQLITE_SCHEMA, conflict_keys=SQLITE_CONFLICT_KEYS)
+        _storage_key = key
+    return _storage
+
+
+def get_database_connection(local_infile=False):
+    """local_infile=True 时允许 LOAD DATA LOCAL INFILE（批量导入用，仅 MySQL）。"""
     try:
-        return pymysql.connect(
-            host=mysql_config["host"],
-            user=mysql_config["user"],
-            password=mysql_config["password"],
-            database=mysql_config["database"],
-            port=mysql_config["port"],
-            charset="utf8mb4",
-            cursorclass=pymysql.cursors.DictCursor,
-        )
+        return get_storage().connect(local_infile=local_infile)
     except Exception as exc:
         print(f"数据库连接失败: {exc}")
         return None
 
 
-def save_ciyu_to_db(ciyu_data: dict) -> bool:
-    """将词语数据保存到 MySQL。
+def _write_ciyu(cursor, ciyu_data: dict, build_relations: bool = True) -> bool:
+    """在给定游标上写入一条词语（基础表 upsert + 关联词占位 + 关系表），不提交事务。
 
-    若 `TEST_MODE` 为 True，则只打印将要执行的 SQL/参数与关系计划，不实际写入。
+    解析结果带 error 或缺少基础信息时返回 False，由调用方回滚。
+    build_relations=False 时只写基础表，关联词占位与关系表留给 build_relations.py 集合构建。
     """
-    # 测试模式：打印将要执行的 SQL 与数据，不连接数据库
-    if TEST_MODE:
-        data = ciyu_data.get("data", {})
-        word = data.get("word", "")
+    data = ciyu_data.get("data", {})
+    # 要求必须有基础信息（至少要有 word），否则丢弃不写入
+    if not data or not data.get("word"):
+        # 与 chengyu 的逻辑保持一致：遇到无效/缺失基础信息则不写入
+        return False
 
-        # 与 chengyu 的 TEST_MODE 输出严格对齐：遇到 error 时给出提示并返回 False（表示不会写入）
-        if "error" in ciyu_data:
-            print("[TEST_MODE] 遇到错误，原本会跳过写入：", ciyu_data.get("error"))
-            return False
+    word = data.get("word", "")
 
+    # 如果解析时返回 error，则丢弃（不写入），与 chengyu 保持一致
+    if "error" in ciyu_data:
+        return False
+
+    else:
         sql = (
-            "INSERT INTO hanyuguoxue_ciyu (word, url, pinyin, zhuyin, part_of_speech, is_common, definition, synonyms, antonyms)"
-            " VALUES (...) ON DUPLICATE KEY UPDATE ..."
+            "INSERT INTO hanyuguoxue_ciyu "
+            "(word, url, pinyin, zhuyin, part_of_speech, is_common, "
+            "definition, synonyms, antonyms, content_hash) "
+            "VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s) "
+            "ON DUPLICATE KEY UPDATE "
+            "url = VALUES(url), "
+            "pinyin = VALUES(pinyin), "
+            "zhuyin = VALUES(zhuyin), "
+            "part_of_speech = VALUES(part_of_speech), "
+            "is_common = VALUES(is_common), "
+            "definition = VALUES(definition), "
+            "synonyms = VALUES(synonyms), "
+            "antonyms = VALUES(antonyms), "
+            "content_hash = VALUES(content_hash), "
+            "updated_at = CURRENT_TIMESTAMP"
         )
-
-        params = (
-            word,
-            ciyu_data.get("url", ""),
-            data.get("pinyin", ""),
-            data.get("zhuyin", ""),
-            data.get("part_of_speech", ""),
-            int(bool(data.get("is_common"))),
-            data.get("definition", ""),
-            json.dumps(data.get("synonyms", []), ensure_ascii=False),
-            json.dumps(data.get("antonyms", []), ensure_ascii=False),
+        cursor.execute(
+            sql,
+            (
+                word,
+                ciyu_data.get("url", ""),
+                data.get("pinyin", ""),
+                data.get("zhuyin", ""),
+                data.get("part_of_speech", ""),
+                int(bool(data.get("is_common"))),
+                data.get("definition", ""),
+                json.dumps(data.get("synonyms", []), ensure_ascii=False),
+                json.dumps(data.get("antonyms", []), ensure_ascii=False),
+                ciyu_content_hash(ciyu_data),
+            ),
         )
 
-        print("[TEST_MODE] 将执行基础表 SQL:")
-        print(sql)
-        print("[TEST_MODE] 参数:", params)
+    if not build_relations:
+        return True
+
+    # 确保主词语有 id（如果基础表刚插入，则能获取到）
+    cursor.execute("SELECT id FROM hanyuguoxue_ciyu WHERE word=%s", (word,))
+    row = cursor.fetchone()
+    if not row:
+        cursor.execute("INSERT IGNORE INTO hanyuguoxue_ciyu (word) VALUES (%s)", (word,))
+        cursor.execute("SELECT id FROM hanyuguoxue_ciyu WHERE word=%s", (word,))
+        row = cursor.fetchone()
+    if not row:
+        raise RuntimeError('无法获取主词语 id')
+    main_id = row['id']
+
+    # 辅助：规范化词
+    def normalize_term(t: str) -> str:
+        return t.strip() if t else ''
+
+    # 批量确保词存在并返回 name->id 映射
+    def ensure_terms_have_ids(term_list):
+        terms = [normalize_term(t) for t in set(term_list) if t and normalize_term(t)]
+        if not terms:
+            return {}
+        insert_vals = [(t,) for t in terms]
+        cursor.executemany("INSERT IGNORE INTO hanyuguoxue_ciyu (word) VALUES (%s)", insert_vals)
+        placeholders = ','.join(['%s'] * len(terms))
+        cursor.execute(f"SELECT id, word FROM hanyuguoxue_ciyu WHERE word IN ({placeholders})", terms)
+        rows = cursor.fetchall()
+        return {r['word']: r['id'] for r in rows}
+
+    # 插入关系（min_id,max_id）
+    def insert_relations_for(main_id: int, related_terms, relation_type: str):
+        if not related_terms:
+            return
+        term_map = ensure_terms_have_ids(related_terms + [word])
+        values = []
+        for t in related_terms:
+            tn = normalize_term(t)
+            if not tn:
+                continue
+            rid = term_map.get(tn)
+            if not rid or rid == main_id:
+                continue
+            a = min(main_id, rid)
+            b = max(main_id, rid)
+            values.append((a, b, relation_type))
+        if values:
+            cursor.executemany(
+                "INSERT IGNORE INTO ciyu_relation (min_id, max_id, relation_type) VALUES (%s, %s, %s)",
+                values,
+            )
+
+    synonyms = data.get("synonyms", []) or []
+    antonyms = data.get("antonyms", []) or []
+    insert_relations_for(main_id, synonyms, 'synonym')
+    insert_relations_for(main_id, antonyms, 'antonym')
+    return True
+
+
+def _test_mode_plan(ciyu_data: dict, build_relations: bool = True) -> dict:
+    """TEST_MODE 下一个词语将要执行的基础表 SQL、参数与关系计划（供抽样日志输出）。"""
+    data = ciyu_data.get("data", {})
+    word = data.get("word", "")
+    synonyms = data.get("synonyms", []) or []
+    antonyms = data.get("antonyms", []) or []
+
+    sql = (
+        "INSERT INTO hanyuguoxue_ciyu (word, url, pinyin, zhuyin, part_of_speech, is_common, definition, synonyms, antonyms,"
+        " content_hash)"
+        " VALUES (...) ON DUPLICATE KEY UPDATE ..."
+    )
+
+    params = (
+        word,
+        ciyu_data.get("url", ""),
+        data.get("pinyin", ""),
+        data.get("zhuyin", ""),
+        data.get("part_of_speech", ""),
+        int(bool(data.get("is_common"))),
+        data.get("definition", ""),
+        json.dumps(data.get("synonyms", []), ensure_ascii=False),
+        json.dumps(data.get("antonyms", []), ensure_ascii=False),
+        ciyu_content_hash(ciyu_data),
+    )
+    plan = {"word": word, "sql": sql, "params": params}
+
+    if not build_relations:
+        plan["relations"] = "延后构建（build_relations.py）"
+        return plan
 
-        # 打印将要确保存在的相关词集合（INSERT IGNORE）与计划的关系插入
-        synonyms = data.get("synonyms", []) or []
-        antonyms = data.get("antonyms", []) or []
+    # 关系表计划：先确保相关词在基础表存在 (INSERT IGNORE)，再插入 (主词, 相关词, 类型)
+    plan["related_terms"] = sorted({t.strip() for t in synonyms + antonyms if t and t.strip()})
+    plan["relations"] = [(word, t, "synonym") for t in synonyms] + [(word, t, "antonym") for t in antonyms]
+    return plan
 
-        # 规范化并去重相关词（简洁版本，不定义额外函数以避免命名冲突）
-        related_terms = set([t.strip() for t in synonyms + antonyms if t and t.strip()])
-        print("[TEST_MODE] 将确保下列相关词在基础表存在 (INSERT IGNORE):", related_terms)
 
-        planned_relations = []
-        for t in synonyms:
-            planned_relations.append((word, t, 'synonym'))
-        for t in antonyms:
-            planned_relations.append((word, t, 'antonym'))
+def save_ciyu_to_db(ciyu_data: dict, build_relations: bool = True) -> bool:
+    """将词语数据保存到 MySQL。
 
-        print("[TEST_MODE] 将插入到 ciyu_relation 的关系 (主词, 相关词, 类型):")
-        for r in planned_relations:
-            print("  ", r)
+    若 `TEST_MODE` 为 True，则不实际写入，只按抽样（见 TEST_LOG）输出将要执行的 SQL/参数与关系计划。
+    """
+    # 测试模式：按抽样输出将要执行的 SQL 与数据，不连接数据库
+    if TEST_MODE:
+        # 与 chengyu 的 TEST_MODE 输出严格对齐：遇到 error 时记一条 skip_error 并返回 False（表示不会写入）
+        if "error" in ciyu_data:
+            TEST_LOG.log("skip_error", error=ciyu_data.get("error"))
+            return False
+        # 计划只在这一条被抽中时才拼装
+        TEST_LOG.log("save", lambda: _test_mode_plan(ciyu_data, build_relations))
         return True
 
     connection = get_database_connection()
@@ -97,110 +280,289 @@ def save_ciyu_to_db(ciyu_data: dict) -> bool:
 
     try:
         cursor = connection.cursor()
-        data = ciyu_data.get("data", {})
-        # 要求必须有基础信息（至少要有 word），否则丢弃不写入
-        if not data or not data.get("word"):
-            # 与 chengyu 的逻辑保持一致：遇到无效/缺失基础信息则不写入
+        connection.begin()
+        if not _write_ciyu(cursor, ciyu_data, build_relations):
+            connection.rollback()
             return False
+        connection.commit()
+        return True
+    except Exception as exc:
+        print(f"保存词语数据失败: {exc}")
+        connection.rollback()
+        return False
+    finally:
+        connection.close()
 
-        word = data.get("word", "")
 
-        # 如果解析时返回 error，则丢弃（不写入），与 chengyu 保持一致
-        if "error" in ciyu_data:
-            return False
+def save_ciyu_batch_to_db(items, connection=None, build_relations=True):
+    """在一个连接、一个事务中写入一批词语，整批只提交一次。
+
+    每条使用 SAVEPOINT 隔离：单条数据无效或写入出错时只回滚该条，不影响同批其他数据。
+    传入 connection 时复用该连接（不关闭），否则临时建立。
+    返回 `(saved_items, [(item, error)], nbytes)`，可直接作为 BatchWriter 的 flush_fn。
+    """
+    if TEST_MODE:
+        saved, failed = [], []
+        for it in items:
+            if save_ciyu_to_db(it, build_relations):
+                saved.append(it)
+            else:
+                failed.append((it, "数据无效"))
+        return saved, failed, 0
 
+    own_connection = connection is None
+    if own_connection:
+        connection = get_database_connection()
+        if not connection:
+            return [], [(it, "无法建立数据库连接") for it in items], 0
+    saved, failed = [], []
+    nbytes = 0
+    try:
+        cursor = connection.cursor()
+        connection.begin()
+        for it in items:
+            cursor.execute("SAVEPOINT ciyu_item")
+            try:
+                ok = _write_ciyu(cursor, it, build_relations)
+                err = None if ok else (it.get("error") or "缺少词语基础信息")
+            except Exception as exc:
+                ok, err = False, str(exc)
+            if ok:
+                cursor.execute("RELEASE SAVEPOINT ciyu_item")
+                saved.append(it)
+                nbytes += len(json.dumps(it, ensure_ascii=False).encode("utf-8"))
+            else:
+                cursor.execute("ROLLBACK TO SAVEPOINT ciyu_item")
+                failed.append((it, err))
+        connection.commit()
+        return saved, failed, nbytes
+    except Exception as exc:
+        print(f"批量保存词语数据失败: {exc}")
+        try:
+            connection.rollback()
+        except Exception:
+            pass
+        return [], [(it, str(exc)) for it in items], 0
+    finally:
+        if own_connection:
+            connection.close()
+
+
+def _bulk_row(ciyu_data):
+    """把解析结果转换为与 BULK_SPEC['columns'] 对应的一行；数据无效时返回 None（与 _write_ciyu 的判断一致）。"""
+    data = ciyu_data.get("data") or {}
+    if "error" in ciyu_data or not data.get("word"):
+        return None
+    return (
+        data["word"],
+        ciyu_data.get("url", ""),
+        data.get("pinyin", ""),
+        data.get("zhuyin", ""),
+        data.get("part_of_speech", ""),
+        int(bool(data.get("is_common"))),
+        data.get("definition", ""),
+        json.dumps(data.get("synonyms", []) or [], ensure_ascii=False),
+        json.dumps(data.get("antonyms", []) or [], ensure_ascii=False),
+        ciyu_content_hash(ciyu_data),
+    )
+
+
+def save_ciyu_bulk_to_db(items, stage_dir=None, build_relations=True):
+    """
+    批量导入一批词语：TSV 暂存 + LOAD DATA 临时表 + 集合 SQL 合并基础表与关系表（见 common/bulk_load.py），整批一次提交。
+
+    适合首次全量入库；要求服务端开启 local_infile。返回值与 save_ciyu_batch_to_db 相同：
+    `(saved_items, [(item, error)], nbytes)`，数据无效的条目单独记为失败，整批出错时全部记为失败。
+    """
+    rows, saved, failed = [], [], []
+    for it in items:
+        row = _bulk_row(it)
+        if row is None:
+            failed.append((it, it.get('error') or '缺少词语基础信息'))
         else:
-            sql = (
-                "INSERT INTO hanyuguoxue_ciyu "
-                "(word, url, pinyin, zhuyin, part_of_speech, is_common, "
-                "definition, synonyms, antonyms) "
-                "VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s) "
-                "ON DUPLICATE KEY UPDATE "
-                "url = VALUES(url), "
-                "pinyin = VALUES(pinyin), "
-                "zhuyin = VALUES(zhuyin), "
-                "part_of_speech = VALUES(part_of_speech), "
-                "is_common = VALUES(is_common), "
-                "definition = VALUES(definition), "
-                "synonyms = VALUES(synonyms), "
-                "antonyms = VALUES(antonyms), "
-                "updated_at = CURRENT_TIMESTAMP"
-            )
-            cursor.execute(
-                sql,
-                (
-                    word,
-                    ciyu_data.get("url", ""),
-                    data.get("pinyin", ""),
-                    data.get("zhuyin", ""),
-                    data.get("part_of_speech", ""),
-                    int(bool(data.get("is_common"))),
-                    data.get("definition", ""),
-                    json.dumps(data.get("synonyms", []), ensure_ascii=False),
-                    json.dumps(data.get("antonyms", []), ensure_ascii=False),
-                ),
-            )
+            rows.append(row)
+            saved.append(it)
+    if not rows:
+        return [], failed, 0
 
-        # 确保主词语有 id（如果基础表刚插入，则能获取到）
-        cursor.execute("SELECT id FROM hanyuguoxue_ciyu WHERE word=%s", (word,))
-        row = cursor.fetchone()
-        if not row:
-            cursor.execute("INSERT IGNORE INTO hanyuguoxue_ciyu (word) VALUES (%s)", (word,))
-            cursor.execute("SELECT id FROM hanyuguoxue_ciyu WHERE word=%s", (word,))
-            row = cursor.fetchone()
-        if not row:
-            raise RuntimeError('无法获取主词语 id')
-        main_id = row['id']
-
-        # 辅助：规范化词
-        def normalize_term(t: str) -> str:
-            return t.strip() if t else ''
-
-        # 批量确保词存在并返回 name->id 映射
-        def ensure_terms_have_ids(term_list):
-            terms = [normalize_term(t) for t in set(term_list) if t and normalize_term(t)]
-            if not terms:
-                return {}
-            insert_vals = [(t,) for t in terms]
-            cursor.executemany("INSERT IGNORE INTO hanyuguoxue_ciyu (word) VALUES (%s)", insert_vals)
-            placeholders = ','.join(['%s'] * len(terms))
-            cursor.execute(f"SELECT id, word FROM hanyuguoxue_ciyu WHERE word IN ({placeholders})", terms)
-            rows = cursor.fetchall()
-            return {r['word']: r['id'] for r in rows}
-
-        # 插入关系（min_id,max_id）
-        def insert_relations_for(main_id: int, related_terms, relation_type: str):
-            if not related_terms:
-                return
-            term_map = ensure_terms_have_ids(related_terms + [word])
-            values = []
-            for t in related_terms:
-                tn = normalize_term(t)
-                if not tn:
-                    continue
-                rid = term_map.get(tn)
-                if not rid or rid == main_id:
-                    continue
-                a = min(main_id, rid)
-                b = max(main_id, rid)
-                values.append((a, b, relation_type))
-            if values:
-                cursor.executemany(
-                    "INSERT IGNORE INTO ciyu_relation (min_id, max_id, relation_type) VALUES (%s, %s, %s)",
-                    values,
+    if TEST_MODE:
+        print(f"[TEST_MODE] 将以 LOAD DATA 批量导入 {len(rows)} 个词语到 {BULK_SPEC['table']}"
+              f"{'（含关系表）' if build_relations else '（关系表延后构建）'}")
+        return saved, failed, 0
+    if not get_storage().supports_load_data:
+        # SQLite 等不支持 LOAD DATA 的后端：退回单事务批量写入
+        batch_saved, batch_failed, nbytes = save_ciyu_batch_to_db(saved, build_relations=build_relations)
+        return batch_saved, failed + batch_failed, nbytes
+
+    connection = get_database_connection(local_infile=True)
+    if not connection:
+        return [], failed + [(it, '无法建立数据库连接') for it in saved], 0
+    try:
+        stats = bulk_upsert(connection, BULK_SPEC, rows, stage_dir=stage_dir, build_relations=build_relations)
+        print(f"批量导入 {stats['rows']} 个词语：LOAD {stats['load_seconds']}s，合并 {stats['merge_seconds']}s，"
+              f"关系 {stats['relation_seconds']}s（新增关系 {stats['relation_rows']}，占位 {stats['stub_rows']}）")
+        return saved, failed, stats['tsv_bytes']
+    except Exception as e:
+        print(f"批量导入词语失败: {e}")
+        return [], failed + [(it, str(e)) for it in saved], 0
+    finally:
+        connection.close()
+
+
+def iter_crawled_words(ordered=False, fetch_size=10000):
+    """流式读取已爬取入库的词语（url 非空；关联关系写入的占位行 url 为 NULL，不算已爬取）。
+
+    ordered=True 时按 utf8mb4_bin（即 Unicode 码点）升序返回，可与 Python 字符串顺序直接归并。
+    使用服务端游标，内存占用与表大小无关。无法连接数据库时抛出 RuntimeError。
+    """
+    connection = get_database_connection()
+    if not connection:
+        raise RuntimeError("无法建立数据库连接")
+    try:
+        sql = "SELECT word FROM hanyuguoxue_ciyu WHERE url IS NOT NULL"
+        if ordered:
+            sql += " ORDER BY word COLLATE utf8mb4_bin"
+        cursor = connection.cursor(pymysql.cursors.SSCursor)
+        cursor.execute(sql)
+        while True:
+            rows = cursor.fetchmany(fetch_size)
+            if not rows:
+                break
+            for (name,) in rows:
+                if name:
+                    yield name
+        cursor.close()
+    finally:
+        connection.close()
+
+
+def iter_word_features(fetch_size=10000):
+    """
+    流式返回 (name, is_common, mentions, updated_at, crawled)，供优先级调度打分。
+
+    mentions 为该词语在关联关系表中出现的次数（被其他词条列为近/反义词的次数，可视为使用频度）；
+    crawled 表示 url 非空（占位行未爬取）。无法连接数据库时抛出 RuntimeError。
+    """
+    connection = get_database_connection()
+    if not connection:
+        raise RuntimeError("无法建立数据库连接")
+    try:
+        sql = (
+            "SELECT b.word, b.is_common, COALESCE(m.mentions, 0), b.updated_at, b.url IS NOT NULL "
+            "FROM hanyuguoxue_ciyu b LEFT JOIN ("
+            "  SELECT id, COUNT(*) AS mentions FROM ("
+            "    SELECT min_id AS id FROM ciyu_relation UNION ALL SELECT max_id FROM ciyu_relation"
+            "  ) r GROUP BY id"
+            ") m ON m.id = b.id"
+        )
+        cursor = connection.cursor(pymysql.cursors.SSCursor)
+        cursor.execute(sql)
+        while True:
+            rows = cursor.fetchmany(fetch_size)
+            if not rows:
+                break
+            for name, is_common, mentions, updated_at, crawled in rows:
+                if name:
+                    yield name, int(is_common or 0), int(mentions or 0), updated_at, bool(crawled)
+        cursor.close()
+    finally:
+        connection.close()
+
+
+def ciyu_content_hash(ciyu_data):
+    """解析结果（{'url', 'data'}）中词语内容的哈希，与数据库行的哈希可直接比较。"""
+    data = dict(ciyu_data.get('data') or {})
+    data['is_common'] = int(bool(data.get('is_common')))  # 与写库时的取值一致
+    return content_hash(data, CONTENT_FIELDS)
+
+
+def load_content_hashes(names, chunk_size=1000):
+    """
+    批量读取 names 中已入库词语的 content_hash，返回 {word: hash}（未入库或尚无哈希的不在其中）。
+
+    爬取批次开始时调用一次，写库前在内存中比较 ciyu_content_hash()，内容未变化的直接跳过，不发送任何 SQL。
+    读取失败（无法连接、旧表尚无 content_hash 列等）时打印警告并返回已读到的部分，相应条目照常写入。
+    TEST_MODE 下不连库，返回空 dict（每条都按 dry-run 输出写库计划）。
+    """
+    names = [n for n in dict.fromkeys(names) if n]
+    hashes = {}
+    if not names or TEST_MODE:
+        return hashes
+    connection = get_database_connection()
+    if not connection:
+        return hashes
+    try:
+        with connection.cursor() as cursor:
+            for i in range(0, len(names), chunk_size):
+                chunk = names[i:i + chunk_size]
+                placeholders = ", ".join(["%s"] * len(chunk))
+                cursor.execute(
+                    "SELECT word, content_hash FROM hanyuguoxue_ciyu "
+                    f"WHERE content_hash IS NOT NULL AND word IN ({placeholders})",
+                    chunk,
                 )
+                for row in cursor.fetchall():
+                    hashes[row['word']] = row['content_hash']
+    except Exception as e:
+        print(f"[WARN] 读取词语内容哈希失败，本批次不跳过未变化的词语: {e}")
+    finally:
+        connection.close()
+    return hashes
+
+
+def select_stale_words(horizon_days, limit):
+    """
+    选出最近一次更新或复查早于 horizon_days 天的已爬取词语，最旧的优先，至多 limit 条。
+
+    返回 [(word, url, 库中内容的哈希)]。无法连接数据库时抛出 RuntimeError。
+    """
+    connection = get_database_connection()
+    if not connection:
+        raise RuntimeError("无法建立数据库连接")
+    try:
+        last_seen = "GREATEST(updated_at, COALESCE(checked_at, updated_at))"
+        sql = (
+            "SELECT word, url, pinyin, zhuyin, part_of_speech, is_common, definition, synonyms, antonyms, content_hash "
+            "FROM hanyuguoxue_ciyu WHERE url IS NOT NULL AND url <> '' "
+            f"AND {last_seen} < NOW() - INTERVAL %s DAY ORDER BY {last_seen} LIMIT %s"
+        )
+        with connection.cursor() as cursor:
+            cursor.execute(sql, (int(horizon_days), int(limit)))
+            rows = cursor.fetchall()
+        result = []
+        for row in rows:
+            stored = row.get('content_hash')
+            if not stored:  # 引入 content_hash 列之前写入的行：按库中内容现算
+                row['synonyms'] = parse_json_list(row.get('synonyms'))
+                row['antonyms'] = parse_json_list(row.get('antonyms'))
+                stored = content_hash(row, CONTENT_FIELDS)
+            result.append((row['word'], row['url'], stored))
+        return result
+    finally:
+        connection.close()
 
-        synonyms = data.get("synonyms", []) or []
-        antonyms = data.get("antonyms", []) or []
-        insert_relations_for(main_id, synonyms, 'synonym')
-        insert_relations_for(main_id, antonyms, 'antonym')
 
+def mark_words_checked(names):
+    """
+    记录内容未变化的词语的复查时间（checked_at），保持 updated_at 不变，返回更新的行数。
+    """
+    names = list(names)
+    if not names:
+        return 0
+    placeholders = ", ".join(["%s"] * len(names))
+    sql = (f"UPDATE hanyuguoxue_ciyu SET checked_at = CURRENT_TIMESTAMP, updated_at = updated_at "
+           f"WHERE word IN ({placeholders})")
+    if TEST_MODE:
+        print(f"[TEST_MODE] 将执行: {sql}（{len(names)} 个词语）")
+        return len(names)
+    connection = get_database_connection()
+    if not connection:
+        raise RuntimeError("无法建立数据库连接")
+    try:
+        with connection.cursor() as cursor:
+            n = cursor.execute(sql, names)
         connection.commit()
-        return True
-    except Exception as exc:
-        print(f"保存词语数据失败: {exc}")
-        connection.rollback()
-        return False
+        return n
     finally:
         connection.close()
 
@@ -4,11 +4,18 @@
 提供：
  - neo4j_config
  - get_words_from_neo4j(limit=None)
+ - iter_words_from_neo4j(page_size=DEFAULT_PAGE_SIZE, offset=0)
+ - count_words_in_neo4j()
+ - get_word_fingerprint()
+ - iter_word_degrees()
 
 将词语（Word 节点）的读取逻辑放在这里，便于 batch 脚本或其他模块调用。
+所有读取都按 name 升序返回，保证多次运行之间的顺序（以及续爬偏移）稳定。
 """
+import hashlib
+
 from neo4j import GraphDatabase
-from typing import List, Optional
+from typing import Iterator, List, Optional
 
 # Neo4j 配置（按需修改）
 neo4j_config = {
@@ -17,21 +24,31 @@ neo4j_config = {
     "password": "xtxzhu2u",
 }
 
+DEFAULT_PAGE_SIZE = 5000  # keyset 分页每页条数
+FINGERPRINT_SAMPLE_SIZE = 64  # 指纹中首尾各取多少个 name 参与哈希
+
+# name 为空的节点无法爬取，统一过滤；DISTINCT 保证与 keyset 分页（name > $after）的结果一致
+_NAME_FILTER = "n.name IS NOT NULL AND n.name <> ''"
+
+
+def _get_driver():
+    return GraphDatabase.driver(neo4j_config["uri"], auth=(neo4j_config["user"], neo4j_config["password"]))
+
 
 def get_words_from_neo4j(limit: Optional[int] = None) -> List[str]:
-    """从 Neo4j 获取词语列表（Word 节点的 name 属性）。
+    """从 Neo4j 获取词语列表（Word 节点的 name 属性，按 name 升序）。
 
     返回字符串列表。出错时返回空列表并打印警告。
     """
     try:
-        driver = GraphDatabase.driver(neo4j_config["uri"], auth=(neo4j_config["user"], neo4j_config["password"]))
+        driver = _get_driver()
         word_list: List[str] = []
         with driver.session() as session:
             if limit:
-                query = "MATCH (n:Word) RETURN n.name AS name LIMIT $limit"
+                query = f"MATCH (n:Word) WHERE {_NAME_FILTER} RETURN DISTINCT n.name AS name ORDER BY name LIMIT $limit"
                 result = session.run(query, limit=limit)
             else:
-                query = "MATCH (n:Word) RETURN n.name AS name"
+                query = f"MATCH (n:Word) WHERE {_NAME_FILTER} RETURN DISTINCT n.name AS name ORDER BY name"
                 result = session.run(query)
             for record in result:
                 name = record.get("name")
@@ -42,3 +59,114 @@ def get_words_from_neo4j(limit: Optional[int] = None) -> List[str]:
     except Exception as e:
         print(f"[WARN] 从 Neo4j 获取词语失败: {e}")
         return []
+
+
+def count_words_in_neo4j() -> int:
+    """返回可爬取的词语数量（与 iter_words_from_neo4j 的条数一致），失败返回 0。"""
+    try:
+        driver = _get_driver()
+        with driver.session() as session:
+            record = session.run(
+                f"MATCH (n:Word) WHERE {_NAME_FILTER} RETURN count(DISTINCT n.name) AS total"
+            ).single()
+        driver.close()
+        return record["total"] if record else 0
+    except Exception as e:
+        print(f"[WARN] 从 Neo4j 统计词语数量失败: {e}")
+        return 0
+
+
+def get_word_fingerprint(sample_size: int = FINGERPRINT_SAMPLE_SIZE) -> Optional[str]:
+    """返回 Neo4j 中词语列表的指纹："数量:首尾样本哈希"，用于判断本地快照是否过期。
+
+    只做三次轻量查询（count + 按 name 升序/降序各取 sample_size 个），失败返回 None。
+    中间位置的改名且总数不变时无法被察觉，必要时可强制刷新快照。
+    """
+    try:
+        driver = _get_driver()
+        with driver.session() as session:
+            total = session.run(
+                f"MATCH (n:Word) WHERE {_NAME_FILTER} RETURN count(DISTINCT n.name) AS total"
+            ).single()["total"]
+            head = [r["name"] for r in session.run(
+                f"MATCH (n:Word) WHERE {_NAME_FILTER} RETURN DISTINCT n.name AS name ORDER BY name LIMIT $n",
+                n=sample_size)]
+            tail = [r["name"] for r in session.run(
+                f"MATCH (n:Word) WHERE {_NAME_FILTER} RETURN DISTINCT n.name AS name ORDER BY name DESC LIMIT $n",
+                n=sample_size)]
+        driver.close()
+        digest = hashlib.sha1("\n".join(head + ["|"] + tail).encode("utf-8")).hexdigest()[:16]
+        return f"{total}:{digest}"
+    except Exception as e:
+        print(f"[WARN] 获取 Neo4j 词语指纹失败: {e}")
+        return None
+
+
+def iter_words_from_neo4j(page_size: int = DEFAULT_PAGE_SIZE, offset: int = 0,
+                          after: Optional[str] = None) -> Iterator[str]:
+    """按 name 升序流式返回词语名称（keyset 分页，内存占用与总数无关）。
+
+    `offset` 会先用一次 SKIP 查询定位第 offset 条的 name，再从其后 keyset 翻页；
+    `after` 直接指定起点（优先于 offset）。中途出错时打印警告并抛出异常。
+    """
+    driver = _get_driver()
+    try:
+        last = after
+        if last is None and offset > 0:
+            with driver.session() as session:
+                record = session.run(
+                    f"MATCH (n:Word) WHERE {_NAME_FILTER} "
+                    "WITH DISTINCT n.name AS name ORDER BY name SKIP $skip LIMIT 1 RETURN name",
+                    skip=offset - 1,
+                ).single()
+            if record is None:
+                return
+            last = record["name"]
+
+        # 每页使用独立 session：批次之间可能间隔很久，避免长时间占用同一连接
+        while True:
+            if last is None:
+                query = (f"MATCH (n:Word) WHERE {_NAME_FILTER} "
+                         "RETURN DISTINCT n.name AS name ORDER BY name LIMIT $limit")
+            else:
+                query = (f"MATCH (n:Word) WHERE {_NAME_FILTER} AND n.name > $after "
+                         "RETURN DISTINCT n.name AS name ORDER BY name LIMIT $limit")
+            with driver.session() as session:
+                names = [record["name"] for record in session.run(query, after=last, limit=page_size)]
+            yield from names
+            if len(names) < page_size:
+                return
+            last = names[-1]
+    except Exception as e:
+        print(f"[WARN] 分页读取 Neo4j 词语失败: {e}")
+        raise
+    finally:
+        driver.close()
+
+
+def iter_word_degrees(page_size: int = DEFAULT_PAGE_SIZE) -> Iterator[tuple]:
+    """按 name 升序流式返回 (name, degree)，degree 为该词语节点的关系数（同名多个节点时累加）。
+
+    供优先级调度（common/frontier.py）使用；中途出错时打印警告并抛出异常。
+    """
+    driver = _get_driver()
+    try:
+        last = None
+        while True:
+            after = "" if last is None else "AND n.name > $after "
+            # 先按 keyset 取一页 name，再只为这一页统计度数，避免每页都对全部节点聚合
+            query = (f"MATCH (n:Word) WHERE {_NAME_FILTER} {after}"
+                     "WITH DISTINCT n.name AS name ORDER BY name LIMIT $limit "
+                     "MATCH (m:Word {name: name}) "
+                     "RETURN name, sum(size([(m)--() | 1])) AS degree ORDER BY name")
+            with driver.session() as session:
+                rows = [(r["name"], r["degree"]) for r in session.run(query, after=last, limit=page_size)]
+            yield from rows
+            if len(rows) < page_size:
+                return
+            last = rows[-1][0]
+    except Exception as e:
+        print(f"[WARN] 读取 Neo4j 词语度数失败: {e}")
+        raise
+    finally:
+        driver.close()
@@ -27,12 +27,27 @@ CREATE TABLE IF NOT EXISTS hanyuguoxue_ciyu (
     error TEXT COMMENT '错误信息',
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP COMMENT '创建时间',
     updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP COMMENT '更新时间',
+    checked_at TIMESTAMP NULL DEFAULT NULL COMMENT '最近一次增量复查时间（内容未变化时只更新该列）',
+    content_hash CHAR(40) NULL DEFAULT NULL COMMENT '内容哈希（SHA-1），内容未变化时跳过写库',
     UNIQUE KEY unique_word (word),
-    INDEX idx_pos (part_of_speech)
+    INDEX idx_pos (part_of_speech),
+    INDEX idx_updated_at (updated_at)
 ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COMMENT='汉语国学词语数据'
 """
 
 
+# 旧表缺少的列：(列名, 补列语句)。CREATE TABLE IF NOT EXISTS 不会修改已有表，需要单独补齐
+ADD_COLUMNS = [
+    ("checked_at", "ALTER TABLE hanyuguoxue_ciyu ADD COLUMN checked_at TIMESTAMP NULL DEFAULT NULL COMMENT '最近一次增量复查时间（内容未变化时只更新该列）' AFTER updated_at"),
+    ("content_hash", "ALTER TABLE hanyuguoxue_ciyu ADD COLUMN content_hash CHAR(40) NULL DEFAULT NULL COMMENT '内容哈希（SHA-1），内容未变化时跳过写库' AFTER checked_at"),
+]
+
+# 旧表缺少的索引：(索引名, 建索引语句)。updated_at 索引供 sync_to_neo4j.py 按 (updated_at, id) 增量同步
+ADD_INDEXES = [
+    ("idx_updated_at", "ALTER TABLE hanyuguoxue_ciyu ADD INDEX idx_updated_at (updated_at)"),
+]
+
+
 CREATE_RELATION_SQL = """
 CREATE TABLE IF NOT EXISTS ciyu_relation (
     id INT AUTO_INCREMENT PRIMARY KEY,
@@ -49,6 +64,36 @@ CREATE TABLE IF NOT EXISTS ciyu_relation (
 """
 
 
+def ensure_columns(cur):
+    """为已存在的基础表补齐 ADD_COLUMNS 中缺少的列，返回补上的列名列表。"""
+    cur.execute(
+        "SELECT COLUMN_NAME FROM information_schema.COLUMNS "
+        "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'hanyuguoxue_ciyu'"
+    )
+    existing = {row["COLUMN_NAME"] for row in cur.fetchall()}
+    added = []
+    for name, ddl in ADD_COLUMNS:
+        if name not in existing:
+            cur.execute(ddl)
+            added.append(name)
+    return added
+
+
+def ensure_indexes(cur):
+    """为已存在的基础表补齐 ADD_INDEXES 中缺少的索引，返回补上的索引名列表。"""
+    cur.execute(
+        "SELECT DISTINCT INDEX_NAME FROM information_schema.STATISTICS "
+        "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'hanyuguoxue_ciyu'"
+    )
+    existing = {row["INDEX_NAME"] for row in cur.fetchall()}
+    added = []
+    for name, ddl in ADD_INDEXES:
+        if name not in existing:
+            cur.execute(ddl)
+            added.append(name)
+    return added
+
+
 def create_tables() -> bool:
     conn = get_database_connection()
     if not conn:
@@ -61,6 +106,12 @@ def create_tables() -> bool:
         cur = conn.cursor()
         cur.execute(CREATE_BASE_SQL)
         print("基础表 hanyuguoxue_ciyu 已创建或已存在")
+        added = ensure_columns(cur)
+        if added:
+            print("已为 hanyuguoxue_ciyu 补齐列:", ", ".join(added))
+        added = ensure_indexes(cur)
+        if added:
+            print("已为 hanyuguoxue_ciyu 补齐索引:", ", ".join(added))
 
         cur.execute(CREATE_RELATION_SQL)
         created_relation = True
@@ -10,13 +10,23 @@ import requests
 from bs4 import BeautifulSoup, Tag
 from ciyu_mysql import get_database_connection, TEST_MODE, save_ciyu_to_db
 from ciyu_neo4j import get_words_from_neo4j
+from common.sampled_log import SampledLogger
+
+# 站点根地址（本地压测时改为 bench/mock_hanyuguoxue.py 的地址）
+BASE_URL = "https://www.hanyuguoxue.com"
+
+# 搜索未命中 / 出错按事件抽样输出（前 3 条与之后每 100 条），批量爬取时不再逐条刷屏
+SEARCH_LOG = SampledLogger("extract_ciyu", first=3, every=100)
 
 
 # ========================
 # URL 获取与验证
 # ========================
-def get_ciyu_url(word: str, delay: float = 0.5) -> Optional[str]:
-    """通过搜索接口获取词语详情页 URL，并校验是否为正确详情页。"""
+def get_ciyu_url(word: str, delay: float = 0.5, session: Optional[requests.Session] = None) -> Optional[str]:
+    """通过搜索接口获取词语详情页 URL，并校验是否为正确详情页。
+
+    传入 session 时复用其连接池（keep-alive），否则使用模块级 requests。
+    """
     headers = {
         "User-Agent": (
             "Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
@@ -27,14 +37,15 @@ def get_ciyu_url(word: str, delay: float = 0.5) -> Optional[str]:
     }
 
     search_url = (
-        f"https://www.hanyuguoxue.com/cidian/search?words={urllib.parse.quote(word)}"
+        f"{BASE_URL}/cidian/search?words={urllib.parse.quote(word)}"
     )
 
     try:
         if delay > 0:
             time.sleep(delay)
 
-        response = requests.get(search_url, headers=headers, allow_redirects=True, timeout=10)
+        sess = session or requests
+        response = sess.get(search_url, headers=headers, allow_redirects=True, timeout=10)
         response.raise_for_status()
 
         soup = BeautifulSoup(response.text, "html.parser")
@@ -44,13 +55,13 @@ def get_ciyu_url(word: str, delay: float = 0.5) -> Optional[str]:
             if page_word and page_word.replace(" ", "") == word.replace(" ", ""):
                 return response.url
 
-        print(f"未能在搜索结果中确认词语 '{word}' 的详情页，返回 None")
+        SEARCH_LOG.log("search_miss", word=word)
         return None
     except requests.RequestException as exc:
-        print(f"获取词语 '{word}' 的 URL 失败: {exc}")
+        SEARCH_LOG.log("search_request_error", word=word, error=str(exc))
         raise
     except Exception as exc:  # noqa: BLE001
-        print(f"获取词语 '{word}' 的 URL 时发生未知错误: {exc}")
+        SEARCH_LOG.log("search_error", word=word, error=str(exc))
         return None
 
 
@@ -135,7 +146,7 @@ def extract_ciyu_details_from_html(html_content: str, url: Optional[str] = None)
 # ========================
 # URL 解析入口
 # ========================
-def extract_ciyu_details_from_url(url: str, delay: float = 1.0) -> Dict:
+def extract_ciyu_details_from_url(url: str, delay: float = 1.0, session: Optional[requests.Session] = None) -> Dict:
     """请求词语详情页并解析数据。"""
     headers = {
         "User-Agent": (
@@ -147,7 +158,8 @@ def extract_ciyu_details_from_url(url: str, delay: float = 1.0) -> Dict:
     }
 
     try:
-        response = requests.get(url, headers=headers, timeout=10)
+        sess = session or requests
+        response = sess.get(url, headers=headers, timeout=10)
         response.raise_for_status()
         html = response.text
 
@@ -0,0 +1,79 @@
+# -*- coding: utf-8 -*-
+"""
+词语增量复查脚本
+首轮全量爬取之后，按 updated_at（或最近一次复查时间 checked_at）选出超过 RECRAWL_HORIZON_DAYS 天未更新的词语，
+直接重新抓取详情页，与库中内容的哈希比较：
+ - 内容未变化：只记录 checked_at，不改内容、不动 updated_at；
+ - 内容有变化：经后台批量写线程写回数据库。
+每次运行最多复查 RECRAWL_BUDGET 个（最旧的优先），汇总的变化率追加到 recrawl_metrics.csv，
+可据此调整复查周期与预算。旧表需先运行 create_table_ciyu.py 补齐 checked_at 列。
+
+使用示例：
+    python recrawl.py
+"""
+import os
+import sys
+
+from extract_ciyu import extract_ciyu_details_from_url
+from ciyu_mysql import (ciyu_content_hash, mark_words_checked, save_ciyu_batch_to_db,
+                        select_stale_words)
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from common.recrawl import append_recrawl_metrics, run_recrawl
+
+# === 复查配置 ===
+RECRAWL_HORIZON_DAYS = 90   # 超过该天数未更新/未复查的词语才会被复查
+RECRAWL_BUDGET = 1000       # 每次运行最多复查的词语数
+RECRAWL_WORKERS = 2         # 并发抓取线程数
+RECRAWL_RATE_PER_SEC = 0.5  # 所有线程合计每秒最多发出的请求数
+RECRAWL_BURST = 1           # 令牌桶容量
+THROTTLE_PAUSE = 300        # 遇到限流/封禁时全部线程暂停的秒数
+DB_BATCH_SIZE = 50          # 变化内容每次写入数据库的批量大小
+METRICS_PATH = os.path.join(os.path.dirname(__file__), 'recrawl_metrics.csv')
+# ==========================================
+
+
+def fetch_word(word, url, session, wait):
+    """按库中已知的详情页 url 重新抓取，返回 (data, None) 或 (None, 错误信息)；网络异常（含 429/403/503）直接抛出。"""
+    wait()
+    data = extract_ciyu_details_from_url(url, delay=0, session=session)
+    if isinstance(data, dict) and 'error' in data:
+        return None, f"提取详情失败: {data.get('error')}"
+    if not data.get('data'):
+        return None, "详情页未解析到内容"
+    data['data']['word'] = word  # 以库中的名称为准，保证写回同一行
+    data['url'] = data.get('url') or url
+    return data, None
+
+
+def main():
+    try:
+        rows = select_stale_words(RECRAWL_HORIZON_DAYS, RECRAWL_BUDGET)
+    except Exception as e:
+        print(f"读取待复查词语失败: {e}")
+        return 2
+    if not rows:
+        print(f"没有超过 {RECRAWL_HORIZON_DAYS} 天未更新的词语")
+        return 0
+    print(f"复查 {len(rows)} 个超过 {RECRAWL_HORIZON_DAYS} 天未更新的词语（预算 {RECRAWL_BUDGET}）...")
+
+    try:
+        summary = run_recrawl(
+            rows, fetch_word, ciyu_content_hash, save_ciyu_batch_to_db, mark_words_checked,
+            workers=RECRAWL_WORKERS, rate_per_sec=RECRAWL_RATE_PER_SEC, burst=RECRAWL_BURST,
+            throttle_pause=THROTTLE_PAUSE, db_batch_size=DB_BATCH_SIZE)
+    except KeyboardInterrupt:
+        print("已中断，本次汇总未写入 recrawl_metrics.csv")
+        return 130
+
+    print(f"\n复查完成：变化 {summary['changed']}（{summary['changed_rate']:.1%}），"
+          f"未变化 {summary['unchanged']}（{summary['unchanged_rate']:.1%}），"
+          f"抓取失败 {summary['fetch_failed']}，写库失败 {summary['write_failed']}，"
+          f"耗时 {summary['elapsed_seconds']}s")
+    append_recrawl_metrics(METRICS_PATH, summary, RECRAWL_HORIZON_DAYS)
+    print(f"复查指标已追加到: {METRICS_PATH}")
+    return 0 if summary['fetch_failed'] == 0 and summary['write_failed'] == 0 else 1
+
+
+if __name__ == '__main__':
+    exit(main())
@@ -0,0 +1,6 @@
+# -*- coding: utf-8 -*-
+"""chengyu / ciyu / hanzi 三套爬虫共用的工具模块。
+
+各目录下的脚本以目录为工作路径直接运行（平铺导入），需要使用本包时先把仓库根目录
+加入 sys.path，再 `from common.xxx import ...`。
+"""
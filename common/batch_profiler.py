@@ -0,0 +1,180 @@
+# -*- coding: utf-8 -*-
+"""
+按批次的可选性能剖析（慢批次定位到函数）。
+
+`start_batch_profiler(mode, out_dir, name)` 在批次开始时调用，返回的对象在批次结束时 `stop()`，
+在 out_dir 下写出两个文件：
+
+ - `{name}.prof`：pstats 格式，可用 `python -m pstats`、snakeviz 等查看，或用 bench/profile_diff.py 比较两次运行；
+ - `{name}.collapsed`：折叠栈（每行 `线程;外层帧;...;内层帧 样本数`），可直接交给 flamegraph.pl / speedscope 生成火焰图。
+
+两种模式：
+
+ - 'sample'：统计采样。每 interval 秒（墙钟）用 sys._current_frames() 抓一次所有线程的调用栈，
+   开销与调用次数无关（默认 5ms 一次，通常 <2%），写线程里的序列化与写库也能看到；
+   .prof 由样本换算（tottime/cumtime 为样本数 × 间隔，调用次数记为样本数）。
+   在主线程启动时用 SIGALRM 定时器触发采样：处理函数在主线程的字节码边界上执行，解析等纯 CPU 代码也能采到。
+   后台线程轮询只能在主线程释放 GIL（网络、sqlite、sleep）时拿到样本，会系统性漏掉解析，
+   所以只在无法使用信号（非 Unix、非主线程）时退回这种方式；
+ - 'cprofile'：确定性剖析抓取线程（cProfile 只跟踪启用它的线程），.prof 中的调用次数与耗时是精确的，
+   但开销较大（解析密集时可达 2 倍）；折叠栈仍由同时运行的采样器生成，覆盖所有线程。
+
+mode 为 None 时返回空操作对象，调用方不必判断。
+"""
+import cProfile
+import collections
+import marshal
+import os
+import signal
+import sys
+import threading
+import time
+
+PROFILE_MODES = (None, 'sample', 'cprofile')
+
+
+def _frame_label(code):
+    return f'{os.path.basename(code.co_filename)}:{code.co_name}:{code.co_firstlineno}'
+
+
+def _pstats_key(code):
+    return code.co_filename, code.co_firstlineno, code.co_name
+
+
+class StackSampler:
+    """周期性采样所有线程的调用栈：主线程上用 SIGALRM 定时器，否则用后台线程轮询。"""
+
+    def __init__(self, interval=0.005):
+        self.interval = interval
+        self.samples = collections.Counter()  # (线程名, (code, ...) 由外到内) -> 样本数
+        self._names = {}
+        self._thread = None
+        self._stop_event = threading.Event()
+        self._old_handler = None
+
+    def _thread_name(self, ident):
+        name = self._names.get(ident)
+        if name is None:
+            self._names = {t.ident: t.name for t in threading.enumerate()}
+            name = self._names.get(ident, str(ident))
+        return name
+
+    def _sample(self, skip_ident=None, main_frame=None):
+        main_ident = threading.main_thread().ident
+        for ident, frame in sys._current_frames().items():
+            if ident == skip_ident:
+                continue
+            if ident == main_ident and main_frame is not None:
+                # 信号处理函数里 sys._current_frames() 给出的是处理函数自身，改用被中断的帧
+                frame = main_frame
+            stack = []
+            while frame is not None:
+                stack.append(frame.f_code)
+                frame = frame.f_back
+            stack.reverse()
+            self.samples[(self._thread_name(ident), tuple(stack))] += 1
+
+    def _on_signal(self, signum, frame):
+        self._sample(main_frame=frame)
+
+    def _poll(self):
+        me = threading.get_ident()
+        while not self._stop_event.wait(self.interval):
+            self._sample(skip_ident=me)
+
+    def start(self):
+        if hasattr(signal, 'setitimer') and threading.current_thread() is threading.main_thread():
+            self._old_handler = signal.signal(signal.SIGALRM, self._on_signal)
+            signal.setitimer(signal.ITIMER_REAL, self.interval, self.interval)
+        else:
+            self._thread = threading.Thread(target=self._poll, name='batch-profiler', daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        if self._thread is None:
+            signal.setitimer(signal.ITIMER_REAL, 0)
+            signal.signal(signal.SIGALRM, self._old_handler or signal.SIG_DFL)
+        else:
+            self._stop_event.set()
+            self._thread.join()
+
+    def write_collapsed(self, path):
+        folded = collections.Counter()
+        for (thread, stack), n in self.samples.items():
+            folded[';'.join([thread.replace(' ', '_')] + [_frame_label(c) for c in stack])] += n
+        with open(path, 'w', encoding='utf-8') as f:
+            for line, n in sorted(folded.items()):
+                f.write(f'{line} {n}\n')
+
+    def write_pstats(self, path):
+        """把样本换算成 pstats 的 stats 字典：{func: (cc, nc, tt, ct, {caller: (cc, nc, tt, ct)})}。"""
+        dt = self.interval
+        stats = {}
+        for (_, stack), n in self.samples.items():
+            if not stack:
+                continue
+            keys = [_pstats_key(c) for c in stack]
+            seen = set()
+            for i, key in enumerate(keys):
+                cc, nc, tt, ct, callers = stats.get(key, (0, 0, 0.0, 0.0, {}))
+                if i == len(keys) - 1:
+                    tt += n * dt
+                if key not in seen:
+                    # 递归时同一函数在一条栈里只计一次累计时间
+                    ct += n * dt
+                    cc += n
+                    seen.add(key)
+                nc += n
+                if i > 0:
+                    c_cc, c_nc, c_tt, c_ct = callers.get(keys[i - 1], (0, 0, 0.0, 0.0))
+                    callers[keys[i - 1]] = (c_cc + n, c_nc + n, c_tt + (n * dt if i == len(keys) - 1 else 0.0),
+                                            c_ct + n * dt)
+                stats[key] = (cc, nc, tt, ct, callers)
+        with open(path, 'wb') as f:
+            marshal.dump(stats, f)
+
+
+class _NoProfiler:
+    paths = ()
+
+    def stop(self):
+        return ()
+
+
+class BatchProfiler:
+    def __init__(self, mode, out_dir, name, interval=0.005):
+        if mode not in PROFILE_MODES:
+            raise ValueError(f'未知的剖析模式: {mode}（可选 {PROFILE_MODES}）')
+        self.mode = mode
+        self.prof_path = os.path.join(out_dir, f'{name}.prof')
+        self.collapsed_path = os.path.join(out_dir, f'{name}.collapsed')
+        self.paths = (self.prof_path, self.collapsed_path)
+        self._started = time.perf_counter()
+        self._sampler = StackSampler(interval)
+        self._profile = cProfile.Profile() if mode == 'cprofile' else None
+        self._sampler.start()
+        if self._profile is not None:
+            self._profile.enable()
+
+    def stop(self):
+        """停止剖析并写出 .prof 与 .collapsed，返回两个文件路径。"""
+        if self._profile is not None:
+            self._profile.disable()
+        self._sampler.stop()
+        if self._profile is not None:
+            self._profile.dump_stats(self.prof_path)
+        else:
+            self._sampler.write_pstats(self.prof_path)
+        self._sampler.write_collapsed(self.collapsed_path)
+        elapsed = time.perf_counter() - self._started
+        print(f'剖析结果（{self.mode}，{elapsed:.1f}s，{sum(self._sampler.samples.values())} 个栈样本）: '
+              f'{self.prof_path}，{self.collapsed_path}')
+        return self.paths
+
+
+def start_batch_profiler(mode, out_dir, name, interval=0.005):
+    """mode 为 None 时返回空操作对象；否则开始剖析，批次结束时调用返回值的 stop()。"""
+    if mode is None:
+        return _NoProfiler()
+    return BatchProfiler(mode, out_dir, name, interval)
@@ -0,0 +1,135 @@
+# -*- coding: utf-8 -*-
+"""后台批量写库线程（生产者-消费者）。
+
+抓取线程调用 `put()` 入队，写线程按 `batch_size` 条或 `flush_interval` 秒刷新一次，
+把整批记录交给 `flush_fn` 一次性写入（通常是一条多行 upsert + 一次 commit）。
+
+`flush_fn(items)` 需返回 `(saved_items, failed, nbytes)`：
+ - saved_items：写入成功的记录列表
+ - failed：`[(item, error_message), ...]`
+ - nbytes：本批发送给数据库的大致字节数（用于统计 MB/s）
+"""
+import queue
+import threading
+import time
+
+
+class BatchWriter:
+    """单线程批量写入器，附带 rows/s 与 MB/s 统计。"""
+
+    def __init__(self, flush_fn, batch_size=50, flush_interval=3.0,
+                 on_saved=None, on_failed=None, name='db-writer'):
+        self.flush_fn = flush_fn
+        self.batch_size = max(1, int(batch_size))
+        self.flush_interval = flush_interval
+        self.on_saved = on_saved
+        self.on_failed = on_failed
+        self.name = name
+
+        self._queue = queue.Queue()
+        self._stop = threading.Event()
+        self._thread = None
+        self._buffer = []
+        self._lock = threading.Lock()
+        self._started_at = None
+        self._stats = {
+            'rows': 0,
+            'fail': 0,
+            'batches': 0,
+            'bytes': 0,
+            'write_seconds': 0.0,
+        }
+
+    # ---------- 生产者接口 ----------
+    def start(self):
+        self._started_at = time.perf_counter()
+        self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+        self._thread.start()
+        return self
+
+    def put(self, item):
+        self._queue.put(item)
+
+    def stop(self, timeout=None):
+        """通知写线程退出；退出前会把队列与缓冲区全部写完。"""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=timeout)
+        return not self.is_alive()
+
+    def is_alive(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def pending(self):
+        """返回尚未写库的记录数（队列 + 缓冲区）。"""
+        return self._queue.qsize() + len(self._buffer)
+
+    def queue_depth(self):
+        """返回 (队列条数, 队列字节数)；本写入器不统计字节数，恒为 0。"""
+        return self._queue.qsize(), 0
+
+    # ---------- 写线程 ----------
+    def _run(self):
+        last_flush = time.time()
+        while not self._stop.is_set() or not self._queue.empty():
+            try:
+                item = self._queue.get(timeout=0.5)
+            except queue.Empty:
+                item = None
+
+            if item is not None:
+                self._buffer.append(item)
+
+            # 停止时先把队列取空再按整批刷新，避免退出阶段逐条提交
+            if (len(self._buffer) >= self.batch_size) or \
+                    (self._buffer and (time.time() - last_flush) > self.flush_interval) or \
+                    (self._stop.is_set() and self._buffer and self._queue.empty()):
+                self._flush(self._buffer)
+                self._buffer = []
+                last_flush = time.time()
+
+    def _flush(self, items):
+        t0 = time.perf_counter()
+        try:
+            saved, failed, nbytes = self.flush_fn(items)
+        except Exception as exc:
+            print('DB 批量写入异常:', exc)
+            saved, failed, nbytes = [], [(it, str(exc)) for it in items], 0
+        elapsed = time.perf_counter() - t0
+
+        with self._lock:
+            self._stats['rows'] += len(saved)
+            self._stats['fail'] += len(failed)
+            self._stats['batches'] += 1
+            self._stats['bytes'] += nbytes or 0
+            self._stats['write_seconds'] += elapsed
+
+        if saved and self.on_saved:
+            try:
+                self.on_saved(saved)
+            except Exception as exc:
+                print('写入成功回调异常:', exc)
+        if failed and self.on_failed:
+            for it, err in failed:
+                try:
+                    self.on_failed(it, err)
+                except Exception as exc:
+                    print('写入失败回调异常:', exc)
+
+    # ---------- 统计 ----------
+    def stats(self):
+        """返回累计统计：成功/失败行数、批次数、字节数以及 rows/s、MB/s。
+
+        速率按写库耗时（write_seconds）计算，反映数据库本身的吞吐；
+        wall_* 按写线程启动至今的墙钟时间计算，便于与抓取速率对比。
+        """
+        with self._lock:
+            s = dict(self._stats)
+        wall = time.perf_counter() - self._started_at if self._started_at else 0.0
+        busy = s['write_seconds']
+        s['rows_per_sec'] = round(s['rows'] / busy, 3) if busy > 0 else 0.0
+        s['mb_per_sec'] = round(s['bytes'] / busy / 1024 / 1024, 3) if busy > 0 else 0.0
+        s['wall_rows_per_sec'] = round(s['rows'] / wall, 3) if wall > 0 else 0.0
+        s['wall_mb_per_sec'] = round(s['bytes'] / wall / 1024 / 1024, 3) if wall > 0 else 0.0
+        s['write_seconds'] = round(busy, 3)
+        return s
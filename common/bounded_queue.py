@@ -0,0 +1,121 @@
+# -*- coding: utf-8 -*-
+"""
+按条数与字节数双重限额的阻塞队列（抓取线程 → 写库线程）。
+
+`queue.Queue()` 不设上限时，数据库变慢（远程库、逐条事务）后解析结果会在内存里无限堆积，抓取端也感知不到。
+这里在条数（max_items）或字节数（max_bytes）任一达到上限时让 `put()` 阻塞，抓取速度自动降到写库速度：
+
+ - 字节数由调用方传入（通常是记录的 JSON 长度）；队列为空时单条超限的记录也允许放入，避免永久阻塞；
+ - `stats()` 返回当前/峰值深度与字节数、生产者累计阻塞时间与阻塞次数，
+   以及写库滞后（记录从入队到被写线程取走的秒数，平均 / 最大）；`oldest_age()` 为队首记录此刻已等待的秒数。
+
+接口与 queue.Queue 的常用部分一致：put / get(timeout) / empty / qsize，get 超时抛出 queue.Empty；
+`close()` 唤醒等待中的消费者，此后队列为空时 get 立即抛出 queue.Empty（写线程退出时不必等满一次超时）。
+"""
+import collections
+import queue
+import threading
+import time
+
+
+class BoundedQueue:
+    """条数 + 字节数限额的 FIFO 队列，附带深度、生产者等待与写库滞后统计。"""
+
+    def __init__(self, max_items=1000, max_bytes=64 * 1024 * 1024):
+        self.max_items = max(1, int(max_items))
+        self.max_bytes = max(1, int(max_bytes))
+        self._items = collections.deque()  # (item, nbytes, enqueued_at)
+        self._bytes = 0
+        self._closed = False
+        self._lock = threading.Lock()
+        self._not_full = threading.Condition(self._lock)
+        self._not_empty = threading.Condition(self._lock)
+        self._stats = {
+            'puts': 0,
+            'peak_items': 0,
+            'peak_bytes': 0,
+            'producer_waits': 0,
+            'producer_wait_seconds': 0.0,
+            'lag_total_seconds': 0.0,
+            'lag_max_seconds': 0.0,
+            'gets': 0,
+        }
+
+    def _full(self, nbytes):
+        if not self._items:
+            return False
+        return len(self._items) >= self.max_items or self._bytes + nbytes > self.max_bytes
+
+    def put(self, item, nbytes=0):
+        """入队；队列已满时阻塞直到写线程取走足够的记录。"""
+        with self._not_full:
+            if self._full(nbytes):
+                t0 = time.perf_counter()
+                while self._full(nbytes):
+                    # 带超时等待：主线程阻塞期间仍能响应 Ctrl+C
+                    self._not_full.wait(0.5)
+                self._stats['producer_waits'] += 1
+                self._stats['producer_wait_seconds'] += time.perf_counter() - t0
+            self._items.append((item, nbytes, time.perf_counter()))
+            self._bytes += nbytes
+            self._stats['puts'] += 1
+            self._stats['peak_items'] = max(self._stats['peak_items'], len(self._items))
+            self._stats['peak_bytes'] = max(self._stats['peak_bytes'], self._bytes)
+            self._not_empty.notify()
+
+    def get(self, timeout=None):
+        """出队；timeout 秒内没有记录时抛出 queue.Empty。"""
+        with self._not_empty:
+            deadline = None if timeout is None else time.perf_counter() + timeout
+            while not self._items:
+                if self._closed:
+                    raise queue.Empty
+                remaining = None if deadline is None else deadline - time.perf_counter()
+                if remaining is not None and remaining <= 0:
+                    raise queue.Empty
+                self._not_empty.wait(remaining)
+            item, nbytes, enqueued_at = self._items.popleft()
+            self._bytes -= nbytes
+            lag = time.perf_counter() - enqueued_at
+            self._stats['gets'] += 1
+            self._stats['lag_total_seconds'] += lag
+            self._stats['lag_max_seconds'] = max(self._stats['lag_max_seconds'], lag)
+            self._not_full.notify()
+            return item
+
+    def close(self):
+        with self._lock:
+            self._closed = True
+            self._not_empty.notify_all()
+
+    def empty(self):
+        with self._lock:
+            return not self._items
+
+    def qsize(self):
+        with self._lock:
+            return len(self._items)
+
+    def nbytes(self):
+        with self._lock:
+            return self._bytes
+
+    def oldest_age(self):
+        """队首记录已等待的秒数（当前的写库滞后）；队列为空时为 0。"""
+        with self._lock:
+            if not self._items:
+                return 0.0
+            return time.perf_counter() - self._items[0][2]
+
+    def stats(self):
+        """返回队列统计（秒数保留 3 位小数）。"""
+        with self._lock:
+            s = dict(self._stats)
+            s['depth'] = len(self._items)
+            s['bytes'] = self._bytes
+        gets = s['gets']
+        s['lag_avg_seconds'] = round(s['lag_total_seconds'] / gets, 3) if gets else 0.0
+        s['lag_total_seconds'] = round(s['lag_total_seconds'], 3)
+        s['lag_max_seconds'] = round(s['lag_max_seconds'], 3)
+        s['producer_wait_seconds'] = round(s['producer_wait_seconds'], 3)
+        return s
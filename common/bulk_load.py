@@ -0,0 +1,150 @@
+# -*- coding: utf-8 -*-
+"""
+LOAD DATA 批量导入（首次全量入库用）。
+
+逐条 upsert 每条记录要发 4~6 条语句（基础表 upsert、查 id、占位词 INSERT IGNORE、查 id、关系表），
+首次全量入库时这是最慢的路径。这里改为按集合处理一整批：
+
+ 1. 把解析结果写成 TSV 暂存文件（同名词条只保留最后一条）；
+ 2. `LOAD DATA LOCAL INFILE` 导入会话级临时表 `<table>_stage`（结构取自目标表、不带索引）；
+ 3. 一条 `INSERT ... SELECT ... ON DUPLICATE KEY UPDATE` 合并进目标表；
+ 4. 用 JSON_TABLE 展开临时表中的 synonyms / antonyms，一条 `INSERT IGNORE ... SELECT` 补齐占位行，
+    再按名称 join 出 id，一条 `INSERT IGNORE ... SELECT` 写入 `*_relation`（LEAST/GREATEST 保证 min_id < max_id）；
+ 5. 整批一次提交。
+
+需要 MySQL 8.0（JSON_TABLE），服务端开启 `local_infile`，连接时传入 `local_infile=True`。
+
+表结构由调用方以 spec 描述：
+    table / key / columns（含 key）/ relation_table / relation_columns（{relation_type: JSON 列}）/ term_length
+"""
+import os
+import tempfile
+import time
+
+
+def _q(name):
+    return f'`{name}`'
+
+
+def _tsv_field(value):
+    """按 LOAD DATA 默认转义规则编码一个字段（NULL 写作 \\N）。"""
+    if value is None:
+        return '\\N'
+    text = str(value)
+    return (text.replace('\\', '\\\\').replace('\t', '\\t')
+            .replace('\n', '\\n').replace('\r', '\\r'))
+
+
+def write_tsv(path, rows):
+    """把 [tuple] 写成 TSV，返回写入的字节数。"""
+    with open(path, 'w', encoding='utf-8', newline='\n') as f:
+        for row in rows:
+            f.write('\t'.join(_tsv_field(v) for v in row))
+            f.write('\n')
+    return os.path.getsize(path)
+
+
+def build_relations_set_based(cursor, spec, source_table, where='', params=()):
+    """
+    用集合 SQL 为 source_table 中各行的近/反义词列表建立关系。
+
+    source_table 可以是导入用的临时表，也可以是目标表本身（此时直接使用 s.id，配合 where 只处理已爬取的行）。
+    where 中的占位符由 params 提供。先为尚不存在的关联词补齐占位行，再一次性写入全部 (min_id, max_id, relation_type)。
+    返回 {'stub_rows': n, 'relation_rows': n}（MySQL 返回的受影响行数，INSERT IGNORE 忽略的不计）。
+    """
+    table, key = _q(spec['table']), _q(spec['key'])
+    rel_table = _q(spec['relation_table'])
+    n = int(spec.get('term_length', 100))
+    cond = f' AND ({where})' if where else ''
+    from_base = source_table.strip('`') == spec['table']
+    owner = 's' if from_base else 'a'
+    join_owner = '' if from_base else f"JOIN {table} AS a ON a.{key} = s.{key} "
+    stats = {'stub_rows': 0, 'relation_rows': 0}
+
+    for relation_type, column in spec['relation_columns'].items():
+        expand = (f"JSON_TABLE(s.{_q(column)}, '$[*]' COLUMNS (term VARCHAR({n}) PATH '$')) AS jt")
+        stats['stub_rows'] += cursor.execute(
+            f"INSERT IGNORE INTO {table} ({key}) "
+            f"SELECT DISTINCT TRIM(jt.term) FROM {source_table} AS s CROSS JOIN {expand} "
+            f"WHERE s.{_q(column)} IS NOT NULL AND TRIM(jt.term) <> ''{cond}",
+            tuple(params)
+        )
+        stats['relation_rows'] += cursor.execute(
+            f"INSERT IGNORE INTO {rel_table} (min_id, max_id, relation_type) "
+            f"SELECT DISTINCT LEAST({owner}.id, b.id), GREATEST({owner}.id, b.id), %s "
+            f"FROM {source_table} AS s "
+            f"{join_owner}"
+            f"CROSS JOIN {expand} "
+            f"JOIN {table} AS b ON b.{key} = TRIM(jt.term) "
+            f"WHERE s.{_q(column)} IS NOT NULL AND {owner}.id <> b.id{cond}",
+            (relation_type,) + tuple(params)
+        )
+    return stats
+
+
+def bulk_upsert(connection, spec, rows, stage_dir=None, build_relations=True):
+    """
+    把 rows（与 spec['columns'] 一一对应的 tuple）经 TSV + LOAD DATA 合并进目标表。
+
+    Args:
+        connection: 以 local_infile=True 建立的 pymysql 连接（不关闭）
+        build_relations: False 时只合并基础表，关系留给之后的集合任务（见 build_relations_set_based）
+    Returns:
+        统计字典：rows / tsv_bytes / load_seconds / merge_seconds / relation_seconds / stub_rows / relation_rows
+    出错时回滚并抛出异常，由调用方决定整批失败的处理方式。
+    """
+    columns = spec['columns']
+    key_idx = columns.index(spec['key'])
+    deduped = {}
+    for row in rows:
+        deduped[row[key_idx]] = row  # 同名词条只保留最后一条，避免合并时结果依赖行序
+    rows = list(deduped.values())
+    stats = {'rows': len(rows), 'tsv_bytes': 0, 'load_seconds': 0.0, 'merge_seconds': 0.0,
+             'relation_seconds': 0.0, 'stub_rows': 0, 'relation_rows': 0}
+    if not rows:
+        return stats
+
+    table = _q(spec['table'])
+    stage = _q(spec['table'] + '_stage')
+    col_list = ', '.join(_q(c) for c in columns)
+    updates = ', '.join(f'{_q(c)} = VALUES({_q(c)})' for c in columns if c != spec['key'])
+
+    fd, path = tempfile.mkstemp(prefix=spec['table'] + '_', suffix='.tsv', dir=stage_dir)
+    os.close(fd)
+    try:
+        stats['tsv_bytes'] = write_tsv(path, rows)
+        cursor = connection.cursor()
+        t0 = time.perf_counter()
+        cursor.execute(f"CREATE TEMPORARY TABLE IF NOT EXISTS {stage} AS SELECT {col_list} FROM {table} LIMIT 0")
+        cursor.execute(f"TRUNCATE TABLE {stage}")
+        connection.begin()
+        cursor.execute(
+            f"LOAD DATA LOCAL INFILE %s INTO TABLE {stage} CHARACTER SET utf8mb4 "
+            "FIELDS TERMINATED BY '\\t' ESCAPED BY '\\\\' LINES TERMINATED BY '\\n' "
+            f"({col_list})",
+            (path,)
+        )
+        t1 = time.perf_counter()
+        cursor.execute(
+            f"INSERT INTO {table} ({col_list}) SELECT {col_list} FROM {stage} "
+            f"ON DUPLICATE KEY UPDATE {updates}, updated_at = CURRENT_TIMESTAMP"
+        )
+        t2 = time.perf_counter()
+        if build_relations:
+            stats.update(build_relations_set_based(cursor, spec, stage))
+        connection.commit()
+        t3 = time.perf_counter()
+        stats.update(load_seconds=round(t1 - t0, 3), merge_seconds=round(t2 - t1, 3),
+                     relation_seconds=round(t3 - t2, 3))
+        return stats
+    except Exception:
+        try:
+            connection.rollback()
+        except Exception:
+            pass
+        raise
+    finally:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
@@ -0,0 +1,252 @@
+# -*- coding: utf-8 -*-
+"""
+逐条记录爬取状态的检查点库（嵌入式 SQLite，WAL 模式）。
+
+原来的续爬依赖 batch_metrics.csv 的最大 end 偏移 + pending.json：启动时要扫描整份 CSV，
+中途中断的批次只能从批次起点重来，已抓取但未写库的数据也只能重新抓取。这里为每个词条保存：
+
+    name | seq（快照中的位置）| status | attempts | error | payload | batch_idx | priority | 时间戳
+
+status 取值：
+ - queued：待抓取
+ - fetched：已抓取解析、尚未确认写库（payload 保存解析结果，重启后直接回放写库，无需重新抓取）
+ - saved：已写库
+ - failed：抓取/解析/写库失败（交给 retry_errors.py）
+ - missing：搜索不到详情页
+
+priority 为调度优先级（越大越先爬，见 common/frontier.py），与状态一起持久化，重启后无需重新计算。
+
+所有写操作都在一把锁内完成，爬取线程与写库线程可以共用同一个实例。
+`close()` 之后仍在运行的写库线程（强制退出时）再更新单条状态会被忽略，该条保持原状态，下次启动时回放。
+"""
+import json
+import os
+import sqlite3
+import threading
+import time
+
+QUEUED = 'queued'
+FETCHED = 'fetched'
+SAVED = 'saved'
+FAILED = 'failed'
+MISSING = 'missing'
+
+FINAL_STATUSES = (SAVED, FAILED, MISSING)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS items (
+    name TEXT PRIMARY KEY,
+    seq INTEGER NOT NULL,
+    status TEXT NOT NULL DEFAULT 'queued',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    error TEXT,
+    payload TEXT,
+    batch_idx INTEGER,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_items_status_seq ON items (status, seq);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+_CHUNK = 5000  # 批量写入时每个 executemany 的行数
+
+
+class CheckpointStore:
+    """逐条状态检查点。"""
+
+    def __init__(self, path):
+        self.path = path
+        self.is_new = not os.path.exists(path)
+        self._lock = threading.Lock()
+        self._closed = False
+        # isolation_level=None：自己用 BEGIN/COMMIT 控制事务
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('PRAGMA synchronous=NORMAL')
+        self._conn.executescript(_SCHEMA)
+        self._migrate()
+
+    def _migrate(self):
+        """为旧版检查点库补齐新增的列。"""
+        columns = {row[1] for row in self._conn.execute('PRAGMA table_info(items)')}
+        if 'priority' not in columns:
+            self._conn.execute('ALTER TABLE items ADD COLUMN priority REAL NOT NULL DEFAULT 0')
+
+    # ---- 元数据 ----
+    def get_meta(self, key, default=None):
+        with self._lock:
+            row = self._conn.execute('SELECT value FROM meta WHERE key = ?', (key,)).fetchone()
+        return row[0] if row else default
+
+    def set_meta(self, key, value):
+        with self._lock:
+            self._conn.execute('INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)', (key, str(value)))
+
+    def next_batch_idx(self):
+        """分配一个新的批次号（跨运行递增）。"""
+        with self._lock:
+            row = self._conn.execute("SELECT value FROM meta WHERE key = 'next_batch_idx'").fetchone()
+            idx = int(row[0]) if row else 0
+            self._conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('next_batch_idx', ?)",
+                               (str(idx + 1),))
+            return idx
+
+    # ---- 批量写入 ----
+    def _executemany_chunked(self, sql, rows):
+        n = 0
+        chunk = []
+        with self._lock:
+            self._conn.execute('BEGIN')
+            try:
+                for row in rows:
+                    chunk.append(row)
+                    if len(chunk) >= _CHUNK:
+                        self._conn.executemany(sql, chunk)
+                        n += len(chunk)
+                        chunk = []
+                if chunk:
+                    self._conn.executemany(sql, chunk)
+                    n += len(chunk)
+                self._conn.execute('COMMIT')
+            except BaseException:
+                self._conn.execute('ROLLBACK')
+                raise
+        return n
+
+    def enqueue(self, names, start_seq=0):
+        """按顺序登记词条（已存在的保持原状态），返回处理的行数。"""
+        now = time.time()
+        rows = ((name, seq, now, now) for seq, name in enumerate(names, start_seq) if name)
+        return self._executemany_chunked(
+            'INSERT OR IGNORE INTO items (name, seq, created_at, updated_at) VALUES (?, ?, ?, ?)', rows)
+
+    def reconcile(self, todo_names):
+        """
+        以 MySQL 的集合差结果校正状态：不在 todo 中的 queued 项视为已入库（saved），
+        在 todo 中却标记为 saved 的项（例如数据被清理）重新排队。返回 (标记 saved 数, 重新排队数)。
+        """
+        now = time.time()
+        with self._lock:
+            self._conn.execute('CREATE TEMP TABLE IF NOT EXISTS todo (name TEXT PRIMARY KEY)')
+            self._conn.execute('DELETE FROM todo')
+            self._conn.execute('BEGIN')
+            try:
+                self._conn.executemany('INSERT OR IGNORE INTO todo (name) VALUES (?)', ((n,) for n in todo_names))
+                done = self._conn.execute(
+                    "UPDATE items SET status = 'saved', updated_at = ? "
+                    "WHERE status = 'queued' AND name NOT IN (SELECT name FROM todo)", (now,)).rowcount
+                requeued = self._conn.execute(
+                    "UPDATE items SET status = 'queued', updated_at = ? "
+                    "WHERE status = 'saved' AND name IN (SELECT name FROM todo)", (now,)).rowcount
+                self._conn.execute('COMMIT')
+            except BaseException:
+                self._conn.execute('ROLLBACK')
+                raise
+            self._conn.execute('DELETE FROM todo')
+        return done, requeued
+
+    def mark_saved_before(self, seq):
+        """把 seq < 指定值的 queued 项标记为 saved（从旧的 CSV end 偏移迁移时使用）。"""
+        with self._lock:
+            return self._conn.execute(
+                "UPDATE items SET status = 'saved', updated_at = ? WHERE status = 'queued' AND seq < ?",
+                (time.time(), seq)).rowcount
+
+    def set_priorities(self, pairs):
+        """批量写入 [(name, priority)]，返回处理的行数。"""
+        return self._executemany_chunked(
+            'UPDATE items SET priority = ? WHERE name = ?', ((float(p), n) for n, p in pairs))
+
+    def requeue(self, names):
+        """把指定词条重新置为 queued（例如迁移旧 pending.json 中尚未确认写库的项）。"""
+        now = time.time()
+        return self._executemany_chunked(
+            "UPDATE items SET status = 'queued', payload = NULL, updated_at = ? WHERE name = ?",
+            ((now, n) for n in names))
+
+    # ---- 单条状态 ----
+    def _set_status(self, name, status, error=None, payload=None, batch_idx=None, attempt=False):
+        with self._lock:
+            if self._closed:
+                return
+            self._conn.execute(
+                "UPDATE items SET status = ?, error = ?, payload = ?, "
+                "batch_idx = COALESCE(?, batch_idx), attempts = attempts + ?, updated_at = ? WHERE name = ?",
+                (status, error, payload, batch_idx, 1 if attempt else 0, time.time(), name))
+
+    def mark_fetched(self, name, data, batch_idx=None):
+        """记录解析结果，返回 payload 的 UTF-8 字节数（写库队列按字节限额时复用，免得再序列化一次）。"""
+        payload = json.dumps(data, ensure_ascii=False)
+        self._set_status(name, FETCHED, payload=payload, batch_idx=batch_idx, attempt=True)
+        return len(payload.encode('utf-8'))
+
+    def mark_saved(self, name):
+        self._set_status(name, SAVED)
+
+    def mark_failed(self, name, error, batch_idx=None, attempt=True):
+        self._set_status(name, FAILED, error=str(error)[:2000], batch_idx=batch_idx, attempt=attempt)
+
+    def mark_missing(self, name, batch_idx=None):
+        self._set_status(name, MISSING, batch_idx=batch_idx, attempt=True)
+
+    # ---- 查询 ----
+    def next_queued(self, limit):
+        """按 seq 顺序返回至多 limit 个待抓取的词条。"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT name FROM items WHERE status = 'queued' ORDER BY seq LIMIT ?", (limit,)).fetchall()
+        return [r[0] for r in rows]
+
+    def queued_items(self):
+        """返回 [(name, seq, attempts, priority)]：全部 queued 项（供优先级调度使用）。"""
+        with self._lock:
+            return self._conn.execute(
+                "SELECT name, seq, attempts, priority FROM items WHERE status = 'queued'").fetchall()
+
+    def fetched_items(self):
+        """返回 [(name, data)]：已抓取但未确认写库的项，用于重启后回放。"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT name, payload FROM items WHERE status = 'fetched' ORDER BY seq").fetchall()
+        items = []
+        for name, payload in rows:
+            try:
+                items.append((name, json.loads(payload)))
+            except Exception:
+                items.append((name, None))
+        return items
+
+    def failed_items(self):
+        """返回 [(name, error)]：状态为 failed 的项（供 retry_errors.py 合并重试）。"""
+        with self._lock:
+            return self._conn.execute(
+                "SELECT name, error FROM items WHERE status = 'failed' ORDER BY seq").fetchall()
+
+    def names_with_status(self, status):
+        """按 seq 顺序返回指定状态的全部词条名。"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT name FROM items WHERE status = ? ORDER BY seq", (status,)).fetchall()
+        return [r[0] for r in rows]
+
+    def counts(self):
+        """返回 {status: 数量}。"""
+        with self._lock:
+            rows = self._conn.execute('SELECT status, COUNT(*) FROM items GROUP BY status').fetchall()
+        return {status: n for status, n in rows}
+
+    def total(self):
+        with self._lock:
+            return self._conn.execute('SELECT COUNT(*) FROM items').fetchone()[0]
+
+    def close(self):
+        with self._lock:
+            self._closed = True
+            try:
+                self._conn.close()
+            except Exception:
+                pass
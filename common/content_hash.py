@@ -0,0 +1,43 @@
+# -*- coding: utf-8 -*-
+"""
+词条内容哈希：用于判断重新抓取的页面与库中已有数据是否一致。
+
+哈希只覆盖会写入数据库的内容字段（不含 url、时间戳等），
+字段值先做规范化（None 与空串等价、字符串去首尾空白、列表逐项去空白并丢弃空项、空列表与空串等价、布尔转 0/1），
+因此同一份内容无论来自解析结果还是数据库行，得到的哈希都相同。
+"""
+import hashlib
+import json
+
+
+def _normalize(value):
+    if value is None:
+        return ''
+    if isinstance(value, bool):
+        return int(value)
+    if isinstance(value, str):
+        return value.strip()
+    if isinstance(value, (list, tuple)):
+        items = [str(v).strip() for v in value if v is not None and str(v).strip()]
+        return items or ''
+    return value
+
+
+def content_hash(fields, keys):
+    """对 fields 中 keys 对应的字段做规范化后取 SHA-1（40 位十六进制）。"""
+    canonical = {k: _normalize(fields.get(k)) for k in keys}
+    text = json.dumps(canonical, ensure_ascii=False, sort_keys=True, separators=(',', ':'), default=str)
+    return hashlib.sha1(text.encode('utf-8')).hexdigest()
+
+
+def parse_json_list(value):
+    """把数据库 JSON 列（pymysql 返回字符串）还原为列表，无法解析时返回空列表。"""
+    if isinstance(value, (list, tuple)):
+        return list(value)
+    if not value:
+        return []
+    try:
+        parsed = json.loads(value)
+    except (TypeError, ValueError):
+        return []
+    return parsed if isinstance(parsed, list) else []
@@ -0,0 +1,268 @@
+# -*- coding: utf-8 -*-
+"""
+爬虫的实时指标（common/prom_metrics.py 的一组指标定义 + 埋点辅助）。
+
+原先只有 print 与每批结束时的一行 batch_metrics.csv，一批 1000 条跑完之前看不到吞吐和限流情况。
+chengyu / ciyu 的 batch_crawl.py 与 hanzi/hanyuguoxue.py 共用这里的指标，标签 crawler 区分来源：
+
+ - crawler_http_requests_total{route,status}：按路由（search / detail）与状态码计数，重定向的每一跳都计入，
+   连接失败/超时记为 status="error"；crawler_http_request_seconds{route}：单次请求（含重定向与读取正文）耗时；
+ - crawler_stage_seconds{stage}：search / detail（HTTP 部分）、parse（同一次调用中扣除 HTTP 后的解析耗时）、
+   jitter（随机抖动等待）、backoff（一次退避）、db_write（一次批量写库）；
+ - crawler_entries_total{result}：success / fail / missing；crawler_entries_per_second：最近 60 秒的完成速率；
+ - crawler_backoff_seconds_total{reason} 与 crawler_backoff_current_seconds：累计退避秒数与正在进行的退避时长；
+ - crawler_write_queue_items / crawler_write_queue_bytes / crawler_writer_pending / crawler_writer_lag_seconds /
+   crawler_batch_remaining：由 `track_writer()` 以回调方式读取，抓取 /metrics 时才计算。
+
+指标始终采集（开销只是一次加锁累加），只有设置了端口才启动 HTTP 端点（`serve()`）。
+`set_progress()` 设定总条目数后，`snapshot()` 汇总已完成数、速率与剩余时间、各结果计数、退避状态与写库滞后，
+供终端仪表盘（common/dashboard.py）按固定频率读取。
+各阶段耗时用 perf_counter_ns 计时；`begin_batch()` 与 `end_batch()` 之间还会同时记入一个 StageTimer
+（common/stage_timer.py），批次结束时得到写入 batch_metrics.csv 的逐阶段累计秒数与 p50 / p95 / p99 列。
+"""
+import collections
+import contextlib
+import threading
+import time
+
+import requests
+
+from common.prom_metrics import Counter, Gauge, Histogram, start_metrics_server
+from common.stage_timer import StageTimer
+
+RATE_WINDOW_SECONDS = 60  # crawler_entries_per_second 的统计窗口
+
+HTTP_REQUESTS = Counter('crawler_http_requests_total', '按路由与状态码统计的 HTTP 请求数',
+                        ['crawler', 'route', 'status'])
+HTTP_SECONDS = Histogram('crawler_http_request_seconds', '单次 HTTP 请求耗时（含重定向与读取正文）',
+                         ['crawler', 'route'])
+STAGE_SECONDS = Histogram('crawler_stage_seconds', '各阶段耗时：search / detail / parse / jitter / backoff / db_write',
+                          ['crawler', 'stage'])
+ENTRIES = Counter('crawler_entries_total', '处理完成的条目数（success / fail / missing）', ['crawler', 'result'])
+ENTRIES_PER_SECOND = Gauge('crawler_entries_per_second', f'最近 {RATE_WINDOW_SECONDS} 秒每秒完成的条目数',
+                           ['crawler'])
+BACKOFF_SECONDS = Counter('crawler_backoff_seconds_total', '限流/网络异常退避累计秒数', ['crawler', 'reason'])
+BACKOFF_CURRENT = Gauge('crawler_backoff_current_seconds', '正在进行的退避时长（未退避时为 0）', ['crawler'])
+WRITE_QUEUE_ITEMS = Gauge('crawler_write_queue_items', '抓取→写库队列中的记录数', ['crawler'])
+WRITE_QUEUE_BYTES = Gauge('crawler_write_queue_bytes', '抓取→写库队列中的记录字节数', ['crawler'])
+WRITER_PENDING = Gauge('crawler_writer_pending', '尚未写库的记录数（队列 + 写线程缓冲区）', ['crawler'])
+WRITER_LAG = Gauge('crawler_writer_lag_seconds', '写库队列队首记录已等待的秒数', ['crawler'])
+BATCH_REMAINING = Gauge('crawler_batch_remaining', '当前批次尚未处理的条目数', ['crawler'])
+
+
+def route_of(url):
+    return 'search' if '/search' in str(url) else 'detail'
+
+
+class CrawlMetrics:
+    """绑定 crawler 标签的埋点入口；同一进程内每个爬虫一个实例。"""
+
+    def __init__(self, crawler):
+        self.crawler = crawler
+        self._http_local = threading.local()  # 当前线程在 timed() 调用内累计的 HTTP 纳秒数
+        self._backoff_started = None
+        self._backoff = None  # 正在进行的退避：(原因, 秒数, 开始的 monotonic 时间)
+        self.timer = None  # 当前批次的 StageTimer
+        self.batch_label = ''
+        self._done = collections.deque()
+        self._done_lock = threading.Lock()
+        self._counts = collections.Counter()  # 本进程各结果的条目数
+        self._total = None
+        self._done_base = 0  # set_progress() 时已完成的条目数（含以前的运行）
+        self._counted_base = 0  # set_progress() 时本进程已计数的条目数
+        self._started = time.monotonic()
+        self._writer = None
+        self._remaining_fn = None
+        self._server = None
+        ENTRIES_PER_SECOND.labels(crawler).set_function(self.entries_per_second)
+        BACKOFF_CURRENT.labels(crawler).set(0)
+
+    # ---------- HTTP ----------
+    def _observe_http(self, url, send):
+        route = route_of(url)
+        t0 = time.perf_counter_ns()
+        try:
+            resp = send()
+        except requests.RequestException:
+            HTTP_REQUESTS.labels(self.crawler, route, 'error').inc()
+            raise
+        finally:
+            elapsed = time.perf_counter_ns() - t0
+            HTTP_SECONDS.labels(self.crawler, route).observe(elapsed / 1e9)
+            self._http_local.ns = getattr(self._http_local, 'ns', 0) + elapsed
+        for r in list(resp.history) + [resp]:
+            HTTP_REQUESTS.labels(self.crawler, route_of(r.url), r.status_code).inc()
+        return resp
+
+    def session(self):
+        """返回带埋点的 requests.Session（请求耗时与状态码计入指标）。"""
+        metrics = self
+
+        class InstrumentedSession(requests.Session):
+            def request(self, method, url, *args, **kwargs):
+                return metrics._observe_http(url, lambda: super(InstrumentedSession, self).request(
+                    method, url, *args, **kwargs))
+
+        return InstrumentedSession()
+
+    def get(self, url, **kwargs):
+        """带埋点的 requests.get（不复用连接的旧代码路径用）。"""
+        return self._observe_http(url, lambda: requests.get(url, **kwargs))
+
+    # ---------- 阶段耗时 ----------
+    def begin_batch(self, label=''):
+        """开始一个批次：此后的阶段耗时同时记入新的 StageTimer；label 显示在仪表盘上。"""
+        self.timer = StageTimer()
+        self.batch_label = label
+        return self.timer
+
+    def end_batch(self):
+        """结束批次，返回逐阶段的 CSV 列（见 common/stage_timer.py）。"""
+        timer, self.timer = self.timer, None
+        return (timer or StageTimer()).columns()
+
+    def observe_stage_ns(self, stage, ns):
+        STAGE_SECONDS.labels(self.crawler, stage).observe(ns / 1e9)
+        timer = self.timer
+        if timer is not None:
+            timer.add_ns(stage, ns)
+
+    @contextlib.contextmanager
+    def stage(self, stage):
+        t0 = time.perf_counter_ns()
+        try:
+            yield
+        finally:
+            self.observe_stage_ns(stage, time.perf_counter_ns() - t0)
+
+    def timed(self, stage, func, *args, idle_seconds=0.0, **kwargs):
+        """调用 func：其中的 HTTP 耗时计入 stage，其余（解析）计入 parse；idle_seconds 为 func 内部固定延时，不计入解析。"""
+        self._http_local.ns = 0
+        t0 = time.perf_counter_ns()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            total = time.perf_counter_ns() - t0
+            http = min(getattr(self._http_local, 'ns', 0), total)
+            self.observe_stage_ns(stage, http)
+            self.observe_stage_ns('parse', max(0, total - http - int(idle_seconds * 1e9)))
+
+    def sleep(self, stage, seconds):
+        """time.sleep(seconds)，实际等待时长计入 stage（如 jitter）。"""
+        with self.stage(stage):
+            time.sleep(seconds)
+
+    # ---------- 条目与速率 ----------
+    def entry(self, result):
+        ENTRIES.labels(self.crawler, result).inc()
+        now = time.monotonic()
+        with self._done_lock:
+            self._counts[result] += 1
+            self._done.append(now)
+            self._trim(now)
+
+    def _trim(self, now):
+        while self._done and now - self._done[0] > RATE_WINDOW_SECONDS:
+            self._done.popleft()
+
+    def entries_per_second(self):
+        now = time.monotonic()
+        with self._done_lock:
+            self._trim(now)
+            if not self._done:
+                return 0.0
+            # 刚启动不足一个窗口时按实际经过的时间计算
+            span = min(RATE_WINDOW_SECONDS, max(now - self._done[0], 1.0))
+            return len(self._done) / span
+
+    # ---------- 退避 ----------
+    def backoff(self, reason, seconds):
+        """退避开始：累计秒数并把当前退避时长设为 seconds；结束后调用 backoff_done()。"""
+        BACKOFF_SECONDS.labels(self.crawler, reason).inc(seconds)
+        BACKOFF_CURRENT.labels(self.crawler).set(seconds)
+        self._backoff_started = time.perf_counter_ns()
+        self._backoff = (reason, seconds, time.monotonic())
+
+    def backoff_done(self):
+        """退避结束：实际等待时长计入 backoff 阶段。"""
+        BACKOFF_CURRENT.labels(self.crawler).set(0)
+        self._backoff = None
+        if self._backoff_started is not None:
+            self.observe_stage_ns('backoff', time.perf_counter_ns() - self._backoff_started)
+            self._backoff_started = None
+
+    # ---------- 写库队列 ----------
+    def track_writer(self, writer, remaining_fn=None):
+        """以回调方式暴露 writer（ShardedWriter / BatchWriter）的队列深度与待写条数；writer 为 None 时清零。"""
+        self._writer, self._remaining_fn = writer, remaining_fn
+        if writer is None:
+            for gauge in (WRITE_QUEUE_ITEMS, WRITE_QUEUE_BYTES, WRITER_PENDING, WRITER_LAG, BATCH_REMAINING):
+                gauge.labels(self.crawler).set(0)
+            return
+        WRITE_QUEUE_ITEMS.labels(self.crawler).set_function(lambda: writer.queue_depth()[0])
+        WRITE_QUEUE_BYTES.labels(self.crawler).set_function(lambda: writer.queue_depth()[1])
+        WRITER_PENDING.labels(self.crawler).set_function(writer.pending)
+        # BatchWriter 的 queue.Queue 不记录入队时间，没有滞后
+        if hasattr(writer, 'oldest_age'):
+            WRITER_LAG.labels(self.crawler).set_function(writer.oldest_age)
+        if remaining_fn is not None:
+            BATCH_REMAINING.labels(self.crawler).set_function(remaining_fn)
+
+    # ---------- 进度快照 ----------
+    def set_progress(self, total, done=0):
+        """设定总条目数与此刻已完成的条目数（如检查点中已处理的）；此后每次 entry() 计入已完成。"""
+        with self._done_lock:
+            self._total = total
+            self._done_base = done
+            self._counted_base = sum(self._counts.values())
+
+    def snapshot(self):
+        """返回仪表盘所需的当前状态（dict）；total 未设定时 done / eta_seconds 为 None。"""
+        now = time.monotonic()
+        with self._done_lock:
+            counts = dict(self._counts)
+            done = self._done_base + sum(counts.values()) - self._counted_base if self._total is not None else None
+        rate = self.entries_per_second()
+        eta = None
+        if done is not None and rate > 0:
+            eta = max(0, self._total - done) / rate
+
+        backoff = self._backoff
+        if backoff is not None:
+            reason, seconds, started = backoff
+            backoff = {'reason': reason, 'seconds': seconds, 'remaining': max(0.0, seconds - (now - started))}
+
+        writer = self._writer
+        queue_items = queue_bytes = pending = lag = None
+        if writer is not None:
+            queue_items, queue_bytes = writer.queue_depth()
+            pending = writer.pending()
+            if hasattr(writer, 'oldest_age'):
+                lag = writer.oldest_age()
+        return {
+            'crawler': self.crawler,
+            'batch': self.batch_label,
+            'uptime': now - self._started,
+            'total': self._total,
+            'done': done,
+            'rate': rate,
+            'eta_seconds': eta,
+            'success': counts.get('success', 0),
+            'fail': counts.get('fail', 0),
+            'missing': counts.get('missing', 0),
+            'backoff': backoff,
+            'queue_items': queue_items,
+            'queue_bytes': queue_bytes,
+            'pending': pending,
+            'writer_lag': lag,
+            'batch_remaining': self._remaining_fn() if self._remaining_fn is not None else None,
+        }
+
+    # ---------- 端点 ----------
+    def serve(self, port, host='127.0.0.1'):
+        """port 为 None 时不启动；同一进程只启动一次。"""
+        if port is None or self._server is not None:
+            return self._server
+        self._server = start_metrics_server(port, host=host)
+        print(f'指标端点: http://{self._server.server_address[0]}:{self._server.server_address[1]}/metrics')
+        return self._server
@@ -0,0 +1,178 @@
+# -*- coding: utf-8 -*-
+"""
+终端实时仪表盘（进度、速率、剩余时间、退避与写库滞后）。
+
+原先的控制台输出是一串 print，要知道跑到哪、多快、是否在退避，只能翻日志。CrawlDashboard 在后台线程里
+每 refresh 秒读取一次 `CrawlMetrics.snapshot()`（common/crawl_metrics.py）并重绘，刷新频率与吞吐无关：
+
+ - 终端（stdout 是 TTY）：在屏幕底部固定几行原地重绘。期间 sys.stdout 换成一个代理，其他 print 先擦掉仪表盘再输出，
+   滚动到仪表盘上方，下一次刷新再画回来；一行只写了一半（print 的正文与换行分两次写入）时本次刷新跳过；
+ - 非终端（重定向到文件、nohup）：不能擦除重绘，每 summary_interval 秒输出一行汇总。
+
+`stop()` 恢复 sys.stdout，并把最后一帧留在屏幕上。
+"""
+import shutil
+import sys
+import threading
+import time
+import unicodedata
+
+BAR_WIDTH = 24
+
+
+def _hms(seconds):
+    if seconds is None:
+        return '--:--:--'
+    seconds = int(seconds)
+    if seconds >= 100 * 3600:
+        return f'{seconds // 86400}d{seconds % 86400 // 3600:02d}h'
+    return f'{seconds // 3600:02d}:{seconds % 3600 // 60:02d}:{seconds % 60:02d}'
+
+
+def _mb(nbytes):
+    return f'{(nbytes or 0) / 1024 / 1024:.1f} MB'
+
+
+def _fit(line, width):
+    """按显示宽度（中文占两列）截断，避免折行后擦除的行数不对。"""
+    used = 0
+    for i, ch in enumerate(line):
+        used += 2 if unicodedata.east_asian_width(ch) in ('W', 'F') else 1
+        if used > width:
+            return line[:i]
+    return line
+
+
+def render(snap):
+    """把 CrawlMetrics.snapshot() 排成几行文本。"""
+    title = f"[{snap['crawler']}] {snap['batch'] or '准备中'}  已运行 {_hms(snap['uptime'])}"
+    total, done = snap['total'], snap['done']
+    if total:
+        ratio = min(1.0, done / total)
+        filled = int(ratio * BAR_WIDTH)
+        progress = (f"进度  [{'#' * filled}{'.' * (BAR_WIDTH - filled)}] {done}/{total} ({ratio * 100:.1f}%)"
+                    f"  剩余 {_hms(snap['eta_seconds'])}")
+    else:
+        progress = f"进度  已完成 {snap['success'] + snap['fail'] + snap['missing']}"
+    counts = (f"速率  {snap['rate']:.2f} 条/s  成功 {snap['success']}  失败 {snap['fail']}  缺失 {snap['missing']}")
+    backoff = snap['backoff']
+    if backoff:
+        backoff_line = (f"退避  {backoff['reason']}：{backoff['seconds']}s，剩余 {backoff['remaining']:.0f}s")
+    else:
+        backoff_line = '退避  无'
+    if snap['pending'] is None:
+        writer_line = '写库  同步写入'
+    else:
+        lag = '--' if snap['writer_lag'] is None else f"{snap['writer_lag']:.1f}s"
+        writer_line = (f"写库  队列 {snap['queue_items']} 条 / {_mb(snap['queue_bytes'])}  "
+                       f"待写 {snap['pending']}  滞后 {lag}")
+    if snap['batch_remaining'] is not None:
+        writer_line += f"  本批剩余 {snap['batch_remaining']}"
+    return [title, progress, counts, backoff_line, writer_line]
+
+
+def summary_line(snap):
+    """非终端时定期输出的一行汇总。"""
+    done = f"{snap['done']}/{snap['total']}" if snap['total'] else str(snap['success'] + snap['fail'] + snap['missing'])
+    backoff = snap['backoff']
+    lag = '' if snap['writer_lag'] is None else f" 写库滞后 {snap['writer_lag']:.1f}s"
+    return (f"[{snap['crawler']}] {snap['batch']} 进度 {done} 速率 {snap['rate']:.2f} 条/s "
+            f"剩余 {_hms(snap['eta_seconds'])} 成功/失败/缺失 {snap['success']}/{snap['fail']}/{snap['missing']}"
+            f"{lag}{' 退避中(' + backoff['reason'] + ')' if backoff else ''}")
+
+
+class _DashboardStream:
+    """替换 sys.stdout：其他输出写入前先擦掉仪表盘。"""
+
+    def __init__(self, dashboard, stream):
+        self._dashboard = dashboard
+        self._stream = stream
+
+    def write(self, text):
+        return self._dashboard._write(text)
+
+    def flush(self):
+        self._stream.flush()
+
+    def __getattr__(self, name):
+        return getattr(self._stream, name)
+
+
+class CrawlDashboard:
+    def __init__(self, metrics, refresh=0.5, summary_interval=30.0, stream=None):
+        self.metrics = metrics
+        self.refresh = refresh
+        self.summary_interval = summary_interval
+        self._stream = stream or sys.stdout
+        self.interactive = self._stream.isatty()
+        self._lock = threading.RLock()
+        self._drawn = 0  # 当前屏幕上仪表盘占的行数
+        self._line_open = False  # 最近一次输出没有以换行结尾
+        self._stop = threading.Event()
+        self._thread = None
+        self._last_summary = 0.0
+
+    def start(self):
+        if self.interactive:
+            sys.stdout = _DashboardStream(self, self._stream)
+        self._thread = threading.Thread(target=self._run, name='dashboard', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        if self._thread is None:
+            return
+        self._stop.set()
+        self._thread.join()
+        self._thread = None
+        if self.interactive:
+            self.draw()
+            sys.stdout = self._stream
+        else:
+            print(summary_line(self.metrics.snapshot()))
+
+    def _run(self):
+        while not self._stop.wait(self.refresh):
+            try:
+                if self.interactive:
+                    self.draw()
+                elif time.monotonic() - self._last_summary >= self.summary_interval:
+                    self._last_summary = time.monotonic()
+                    print(summary_line(self.metrics.snapshot()))
+            except Exception as exc:  # 仪表盘出错不影响抓取
+                self._stream.write(f'仪表盘刷新失败: {exc}\n')
+
+    def _erase(self):
+        if self._drawn:
+            self._stream.write(f'\x1b[{self._drawn}F\x1b[J')
+            self._drawn = 0
+
+    def _write(self, text):
+        with self._lock:
+            if text:
+                self._erase()
+                self._line_open = not text.endswith('\n')
+            return self._stream.write(text)
+
+    def draw(self):
+        lines = render(self.metrics.snapshot())
+        width = max(20, shutil.get_terminal_size().columns - 1)
+        with self._lock:
+            if self._line_open:
+                return
+            self._erase()
+            self._stream.write(''.join(_fit(line, width) + '\n' for line in lines))
+            self._stream.flush()
+            self._drawn = len(lines)
+
+
+class _NoDashboard:
+    def stop(self):
+        pass
+
+
+def start_dashboard(metrics, enabled=True, refresh=0.5, summary_interval=30.0):
+    """enabled 为 False 时返回空操作对象；否则启动仪表盘，结束时调用返回值的 stop()。"""
+    if not enabled:
+        return _NoDashboard()
+    return CrawlDashboard(metrics, refresh=refresh, summary_interval=summary_interval).start()
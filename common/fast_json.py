@@ -0,0 +1,22 @@
+# -*- coding: utf-8 -*-
+"""JSON 序列化工具：优先使用 orjson（可选依赖），未安装时回退到标准库 json。
+
+orjson 默认即输出 UTF-8 原文（等价于 ensure_ascii=False），并且比 json.dumps 快数倍，
+适合在批量写库时序列化大量 JSON 列。
+"""
+import json
+
+try:
+    import orjson
+except ImportError:  # orjson 为可选依赖
+    orjson = None
+
+
+JSON_ENCODER = 'orjson' if orjson is not None else 'json'
+
+
+def dumps(obj):
+    """把对象序列化为 JSON 字符串（不转义非 ASCII 字符）。"""
+    if orjson is not None:
+        return orjson.dumps(obj).decode('utf-8')
+    return json.dumps(obj, ensure_ascii=False)
@@ -0,0 +1,134 @@
+# -*- coding: utf-8 -*-
+"""
+优先级爬取前沿（frontier）。
+
+默认按快照顺序（Neo4j 的 name 顺序）爬取，在请求预算有限、只能爬一部分时，先入库的往往不是最有价值的词条。
+这里用二叉堆维护待爬词条，按优先级从高到低弹出：
+
+    priority = W_DEGREE  * log(1 + Neo4j 度数)          —— 图中关联越多越重要
+             + W_MENTION * log(1 + 被近/反义关系引用次数) —— 其他词条页面中出现得越多越常用
+             + W_COMMON  * is_common                     —— 站点标注的常用词
+             + W_STALE   * 陈旧度（0~1）                  —— 从未爬取为 1，按 updated_at 距今天数线性增长
+             + W_RETRY   * 重试紧迫度                     —— 曾失败后重新排队的项：第一次重试最紧迫，反复失败逐渐降级
+
+优先级由 rescore_queued() 计算后保存在检查点库（common/checkpoint_store.py）的 priority 列中，
+重启后 PriorityFrontier.from_store() 直接从库中重建堆，不必重新查询 Neo4j / MySQL。
+"""
+import heapq
+import math
+import time
+
+W_DEGREE = 1.0
+W_MENTION = 1.0
+W_COMMON = 2.0
+W_STALE = 1.5
+W_RETRY = 1.0
+STALE_HORIZON_DAYS = 180  # 超过该天数未更新即视为完全陈旧
+
+
+def staleness(updated_at, crawled, horizon_days=STALE_HORIZON_DAYS, now=None):
+    """返回 0~1 的陈旧度：未爬取为 1，否则按 updated_at 距今天数 / horizon_days 截断到 1。"""
+    if not crawled or updated_at is None:
+        return 1.0
+    now = now or time.time()
+    ts = updated_at.timestamp() if hasattr(updated_at, 'timestamp') else float(updated_at)
+    return max(0.0, min(1.0, (now - ts) / 86400.0 / horizon_days))
+
+
+def score_priority(degree=0, mentions=0, is_common=0, stale=1.0, attempts=0):
+    """按模块顶部的权重计算优先级（越大越先爬）。"""
+    retry = 1.0 / attempts if attempts > 0 else 0.0
+    return (W_DEGREE * math.log1p(max(0, degree or 0))
+            + W_MENTION * math.log1p(max(0, mentions or 0))
+            + W_COMMON * (1 if is_common else 0)
+            + W_STALE * stale
+            + W_RETRY * retry)
+
+
+class PriorityFrontier:
+    """以 (−priority, seq, name) 为元素的最小堆；同优先级按 seq（快照顺序）先后弹出。"""
+
+    def __init__(self, items=(), store=None):
+        """
+        Args:
+            items: [(name, priority, seq)]
+            store: 可选的 CheckpointStore；push 时会同步写入其 priority 列以便重启后恢复
+        """
+        self._heap = [(-float(p), seq, name) for name, p, seq in items]
+        heapq.heapify(self._heap)
+        self._store = store
+
+    @classmethod
+    def from_store(cls, store):
+        """用检查点库中全部 queued 项及其已保存的优先级重建堆。"""
+        return cls(((name, priority, seq) for name, seq, _attempts, priority in store.queued_items()),
+                   store=store)
+
+    def __len__(self):
+        return len(self._heap)
+
+    def push(self, name, priority, seq=0):
+        heapq.heappush(self._heap, (-float(priority), seq, name))
+        if self._store is not None:
+            self._store.set_priorities([(name, priority)])
+
+    def peek(self):
+        """返回 (name, priority)，堆为空时返回 None。"""
+        if not self._heap:
+            return None
+        neg, _seq, name = self._heap[0]
+        return name, -neg
+
+    def pop(self):
+        neg, _seq, name = heapq.heappop(self._heap)
+        return name
+
+    def pop_batch(self, n):
+        """弹出至多 n 个优先级最高的词条。"""
+        batch = []
+        while self._heap and len(batch) < n:
+            batch.append(self.pop())
+        return batch
+
+
+def rescore_queued(store, iter_degrees, iter_features, noun='词条', horizon_days=STALE_HORIZON_DAYS):
+    """
+    为检查点库中全部 queued 项重新计算优先级并写回 priority 列。
+
+    Args:
+        iter_degrees: 无参可调用，返回 (name, degree) 迭代器（Neo4j）
+        iter_features: 无参可调用，返回 (name, is_common, mentions, updated_at, crawled) 迭代器（MySQL）
+    任一数据源读取失败时打印警告并忽略该项因子，不影响其余因子。
+    Returns:
+        重新打分的条数
+    """
+    t0 = time.perf_counter()
+    queued = store.queued_items()
+    if not queued:
+        return 0
+    # 只为 queued 项保留特征，内存与待爬数量成正比
+    features = {name: [0, 0, 0, 1.0] for name, _seq, _attempts, _p in queued}  # degree, mentions, is_common, stale
+
+    try:
+        for name, degree in iter_degrees():
+            f = features.get(name)
+            if f is not None:
+                f[0] = degree or 0
+    except Exception as e:
+        print(f'[WARN] 读取 Neo4j 度数失败，忽略度数因子: {e}')
+
+    now = time.time()
+    try:
+        for name, is_common, mentions, updated_at, crawled in iter_features():
+            f = features.get(name)
+            if f is not None:
+                f[1], f[2] = mentions, is_common
+                f[3] = staleness(updated_at, crawled, horizon_days, now)
+    except Exception as e:
+        print(f'[WARN] 读取 MySQL 特征失败，忽略使用频度与陈旧度因子: {e}')
+
+    store.set_priorities(
+        (name, score_priority(*features[name][:3], stale=features[name][3], attempts=attempts))
+        for name, _seq, attempts, _p in queued)
+    print(f'已为 {len(queued)} 个待爬{noun}计算优先级（{time.perf_counter() - t0:.1f}s）')
+    return len(queued)
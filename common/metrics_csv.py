@@ -0,0 +1,61 @@
+# -*- coding: utf-8 -*-
+"""
+指标 CSV 的追加写入。
+
+batch_metrics.csv 的列会随功能增加（例如 termination_reason、skipped_unchanged）。
+直接按新列追加会让旧文件的表头与数据错位，这里在追加前检查表头：
+缺少新列时先按「新行的列顺序 + 旧文件独有的列」重写整个文件，旧行缺失的值留空。
+
+`upgrade_metrics_csv()` 可在不追加数据的情况下提前把新列补到旧文件末尾（例如逐阶段耗时列，
+见 common/stage_timer.py 的 `stage_columns()`），供 fix_csv_columns.py 等迁移脚本使用。
+"""
+import csv
+import os
+
+
+def _rewrite(path, fieldnames, rows, encoding):
+    tmp = path + '.tmp'
+    with open(tmp, 'w', encoding=encoding, newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=fieldnames, restval='')
+        writer.writeheader()
+        writer.writerows(rows)
+    os.replace(tmp, path)
+
+
+def upgrade_metrics_csv(path, columns, encoding='utf-8-sig'):
+    """把 columns 中表头缺少的列追加到表头末尾（旧行留空）；返回新增的列名列表。文件不存在时不做任何事。"""
+    if not os.path.exists(path) or os.path.getsize(path) == 0:
+        return []
+    with open(path, 'r', encoding=encoding, newline='') as f:
+        reader = csv.DictReader(f)
+        header = reader.fieldnames or []
+        missing = [k for k in columns if k not in header]
+        old_rows = list(reader) if missing else None
+    if missing:
+        _rewrite(path, header + missing, old_rows, encoding)
+        print(f'已升级 {os.path.basename(path)} 表头，新增列: {", ".join(missing)}')
+    return missing
+
+
+def append_metrics_row(path, row, encoding='utf-8-sig'):
+    """把一行 dict 追加到 CSV；文件不存在时写表头，表头缺列时先升级表头。"""
+    fieldnames = list(row.keys())
+    if os.path.exists(path) and os.path.getsize(path) > 0:
+        with open(path, 'r', encoding=encoding, newline='') as f:
+            reader = csv.DictReader(f)
+            header = reader.fieldnames or []
+            missing = [k for k in fieldnames if k not in header]
+            old_rows = list(reader) if missing else None
+        if missing:
+            upgraded = fieldnames + [k for k in header if k not in fieldnames]
+            _rewrite(path, upgraded, old_rows, encoding)
+            print(f'已升级 {os.path.basename(path)} 表头，新增列: {", ".join(missing)}')
+            header = upgraded
+        with open(path, 'a', encoding=encoding, newline='') as f:
+            csv.DictWriter(f, fieldnames=header, restval='').writerow(row)
+        return
+
+    with open(path, 'w', encoding=encoding, newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=fieldnames)
+        writer.writeheader()
+        writer.writerow(row)
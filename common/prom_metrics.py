@@ -0,0 +1,244 @@
+# -*- coding: utf-8 -*-
+"""
+Prometheus 文本格式的进程内指标与本地 /metrics 端点（仅用标准库，不依赖 prometheus_client）。
+
+ - Counter / Gauge / Histogram 支持标签：`metric.labels('chengyu', 'detail').inc()`；
+   Gauge 可用 `set_function(fn)` 在每次抓取时回调取值（队列深度、剩余条数等无需主动上报）；
+ - 指标注册到 Registry（默认 REGISTRY），`Registry.render()` 输出 text/plain; version=0.0.4 格式；
+ - `start_metrics_server(port)` 在守护线程里起 ThreadingHTTPServer，只响应 GET /metrics，
+   默认只监听 127.0.0.1，无需任何外部服务即可用 curl 或浏览器查看。
+
+各方法都是线程安全的（抓取线程、写线程与 HTTP 线程并发访问）。
+"""
+import bisect
+import math
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# 秒级延迟的默认分桶：覆盖本地 mock 的毫秒级与远程站点/远程库的数秒级
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+def _format_value(value):
+    if value == math.inf:
+        return '+Inf'
+    if value == -math.inf:
+        return '-Inf'
+    if isinstance(value, float) and value.is_integer() and abs(value) < 1e15:
+        return str(int(value))
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def _escape_label(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _format_labels(names, values, extra=()):
+    pairs = [f'{n}="{_escape_label(v)}"' for n, v in list(zip(names, values)) + list(extra)]
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = []
+        self._lock = threading.Lock()
+
+    def register(self, metric):
+        with self._lock:
+            if any(m.name == metric.name for m in self._metrics):
+                raise ValueError(f'指标重复注册: {metric.name}')
+            self._metrics.append(metric)
+        return metric
+
+    def get(self, name):
+        with self._lock:
+            return next((m for m in self._metrics if m.name == name), None)
+
+    def render(self):
+        with self._lock:
+            metrics = list(self._metrics)
+        lines = []
+        for m in metrics:
+            lines.append(f'# HELP {m.name} {m.documentation}')
+            lines.append(f'# TYPE {m.name} {m.kind}')
+            lines.extend(m.samples())
+        return '\n'.join(lines) + '\n'
+
+
+REGISTRY = Registry()
+
+
+class _Metric:
+    kind = 'untyped'
+
+    def __init__(self, name, documentation, labelnames=(), registry=REGISTRY):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children = {}
+        self._lock = threading.Lock()
+        if registry is not None:
+            registry.register(self)
+
+    def labels(self, *values):
+        if len(values) != len(self.labelnames):
+            raise ValueError(f'{self.name} 需要标签 {self.labelnames}，实际传入 {values}')
+        key = tuple(str(v) for v in values)
+        with self._lock:
+            child = self._children.get(key)
+            if child is None:
+                child = self._children[key] = self._new_child()
+        return child
+
+    def _default(self):
+        # 无标签的指标直接在自身上调用 inc/set/observe
+        return self.labels()
+
+    def _items(self):
+        with self._lock:
+            return sorted(self._children.items())
+
+
+class _CounterChild:
+    def __init__(self):
+        self._value = 0.0
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1.0):
+        if amount < 0:
+            raise ValueError('Counter 只能递增')
+        with self._lock:
+            self._value += amount
+
+    def get(self):
+        with self._lock:
+            return self._value
+
+
+class Counter(_Metric):
+    kind = 'counter'
+    _new_child = _CounterChild
+
+    def inc(self, amount=1.0):
+        self._default().inc(amount)
+
+    def samples(self):
+        return [f'{self.name}{_format_labels(self.labelnames, k)} {_format_value(c.get())}' for k, c in self._items()]
+
+
+class _GaugeChild:
+    def __init__(self):
+        self._value = 0.0
+        self._fn = None
+        self._lock = threading.Lock()
+
+    def set(self, value):
+        with self._lock:
+            self._value = float(value)
+            self._fn = None
+
+    def inc(self, amount=1.0):
+        with self._lock:
+            self._value += amount
+
+    def dec(self, amount=1.0):
+        self.inc(-amount)
+
+    def set_function(self, fn):
+        """每次读取时调用 fn() 取值；fn 为 None 时恢复为最后一次 set 的值。"""
+        with self._lock:
+            self._fn = fn
+
+    def get(self):
+        with self._lock:
+            fn, value = self._fn, self._value
+        if fn is None:
+            return value
+        try:
+            return float(fn())
+        except Exception:
+            return math.nan
+
+
+class Gauge(_Metric):
+    kind = 'gauge'
+    _new_child = _GaugeChild
+
+    def set(self, value):
+        self._default().set(value)
+
+    def set_function(self, fn):
+        self._default().set_function(fn)
+
+    def samples(self):
+        return [f'{self.name}{_format_labels(self.labelnames, k)} {_format_value(c.get())}' for k, c in self._items()]
+
+
+class _HistogramChild:
+    def __init__(self, buckets):
+        self._upper = buckets
+        self._counts = [0] * (len(buckets) + 1)  # 最后一格是 +Inf
+        self._sum = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value):
+        idx = bisect.bisect_left(self._upper, value)
+        with self._lock:
+            self._counts[idx] += 1
+            self._sum += value
+
+    def snapshot(self):
+        with self._lock:
+            return list(self._counts), self._sum
+
+
+class Histogram(_Metric):
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS, registry=REGISTRY):
+        self.buckets = tuple(sorted(float(b) for b in buckets if b != math.inf))
+        super().__init__(name, documentation, labelnames, registry)
+
+    def _new_child(self):
+        return _HistogramChild(self.buckets)
+
+    def observe(self, value):
+        self._default().observe(value)
+
+    def samples(self):
+        lines = []
+        for key, child in self._items():
+            counts, total = child.snapshot()
+            cumulative = 0
+            for upper, n in zip(self.buckets + (math.inf,), counts):
+                cumulative += n
+                le = _format_labels(self.labelnames, key, [('le', _format_value(upper))])
+                lines.append(f'{self.name}_bucket{le} {cumulative}')
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f'{self.name}_sum{labels} {_format_value(total)}')
+            lines.append(f'{self.name}_count{labels} {cumulative}')
+        return lines
+
+
+def start_metrics_server(port, host='127.0.0.1', registry=REGISTRY):
+    """在守护线程中启动 /metrics 端点，返回 server（server.server_address 为实际地址，port=0 时自动分配）。"""
+
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, fmt, *args):
+            pass
+
+        def do_GET(self):
+            if self.path.split('?', 1)[0] != '/metrics':
+                self.send_error(404)
+                return
+            body = registry.render().encode('utf-8')
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name='metrics-http', daemon=True).start()
+    return server
@@ -0,0 +1,59 @@
+# -*- coding: utf-8 -*-
+"""
+线程安全的令牌桶限速器。
+
+多个抓取线程共用一个 TokenBucket：每次发请求前调用 `acquire()`，整体请求速率不超过 rate 次/秒，
+允许 burst 次突发。遇到限流 / 封禁时调用 `pause(seconds)`，所有线程一起暂停，避免并发放大封禁。
+"""
+import threading
+import time
+
+
+class TokenBucket:
+    """令牌桶：rate 为每秒补充的令牌数，burst 为桶容量。"""
+
+    def __init__(self, rate, burst=1):
+        if rate <= 0:
+            raise ValueError('rate 必须大于 0')
+        self.rate = float(rate)
+        self.burst = max(1.0, float(burst))
+        self._tokens = self.burst
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+        self._lock = threading.Lock()
+        self.waited_seconds = 0.0  # 累计等待时长，便于观察限速是否成为瓶颈
+
+    def _refill(self, now):
+        self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def acquire(self, tokens=1):
+        """阻塞直到取得 tokens 个令牌，返回本次等待的秒数。"""
+        waited = 0.0
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                if now < self._paused_until:
+                    delay = self._paused_until - now
+                else:
+                    self._refill(now)
+                    if self._tokens >= tokens:
+                        self._tokens -= tokens
+                        self.waited_seconds += waited
+                        return waited
+                    delay = (tokens - self._tokens) / self.rate
+            time.sleep(delay)
+            waited += delay
+
+    def pause(self, seconds):
+        """让所有调用 acquire() 的线程至少暂停 seconds 秒（用于限流/封禁后的集体退避）。"""
+        with self._lock:
+            now = time.monotonic()
+            self._paused_until = max(self._paused_until, now + seconds)
+            self._tokens = 0.0
+            self._updated = now
+
+    def paused_for(self):
+        """返回剩余的暂停秒数（未暂停时为 0）。"""
+        with self._lock:
+            return max(0.0, self._paused_until - time.monotonic())
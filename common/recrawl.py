@@ -0,0 +1,139 @@
+# -*- coding: utf-8 -*-
+"""
+增量复查（recrawl）引擎：重新抓取陈旧词条，按内容哈希判断是否变化，只写回真正变化的行。
+
+首轮全量爬取之后，站点内容的更新原来只能靠清空 batch_metrics.csv 重跑 batch_crawl.py 来获取。这里：
+
+ 1. 调用方从 MySQL 选出最近一次更新/复查早于 horizon 的已爬取行（附库中内容的哈希与详情页 url）；
+ 2. 线程池按共享令牌桶限速直接抓取详情页（已知 url，不再走搜索）；
+ 3. 新内容哈希与库中一致的只记录复查时间（不改内容、不动 updated_at），
+    不一致的交给 common.batch_writer.BatchWriter 按批写库；
+ 4. 汇总 changed / unchanged / failed 比例，追加写入 recrawl_metrics.csv，便于据此调整复查预算与周期。
+"""
+import csv
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+import requests
+
+from common.batch_writer import BatchWriter
+from common.rate_limit import TokenBucket
+from common.retry_engine import THROTTLE, classify_error, classify_exception
+
+METRICS_HEADER = ['run_ts', 'horizon_days', 'selected', 'changed', 'unchanged', 'fetch_failed',
+                  'write_failed', 'changed_rate', 'unchanged_rate', 'elapsed_seconds',
+                  'fetch_per_sec', 'rate_limit_wait_seconds']
+
+
+def run_recrawl(rows, fetch_fn, hash_fn, save_batch_fn, mark_checked_fn, workers=2, rate_per_sec=0.5,
+                burst=1, throttle_pause=60.0, db_batch_size=50, db_flush_interval=3.0, check_batch_size=500):
+    """
+    Args:
+        rows: [(name, url, old_hash)]
+        fetch_fn: fetch_fn(name, url, session, wait) -> (data, None) 或 (None, error_message)；
+                  每次发请求前调用 wait()；网络异常可直接抛出
+        hash_fn: hash_fn(data) -> 新抓取内容的哈希（与 old_hash 的计算方式一致）
+        save_batch_fn: save_*_batch_to_db，返回 (saved, failed, nbytes)
+        mark_checked_fn: mark_checked_fn(names) 只记录复查时间
+        throttle_pause: 遇到限流 / 封禁时全部线程暂停的秒数
+    Returns:
+        summary 字典（计数、比例与耗时）
+    """
+    t0 = time.perf_counter()
+    counts = {'changed': 0, 'unchanged': 0, 'fetch_failed': 0, 'write_failed': 0}
+    lock = threading.Lock()
+    unchanged = []
+
+    def bump(key, n=1):
+        with lock:
+            counts[key] += n
+
+    def flush_unchanged(force=False):
+        with lock:
+            if not unchanged or (not force and len(unchanged) < check_batch_size):
+                return
+            names = unchanged[:]
+            unchanged.clear()
+        try:
+            mark_checked_fn(names)
+        except Exception as e:
+            print(f'[WARN] 记录复查时间失败（{len(names)} 条）: {e}')
+
+    limiter = TokenBucket(rate_per_sec, burst)
+    local = threading.local()
+
+    def get_session():
+        if not hasattr(local, 'session'):
+            local.session = requests.Session()
+        return local.session
+
+    def on_saved(items):
+        bump('changed', len(items))
+
+    def on_failed(item, err):
+        bump('write_failed')
+        print(f'[WARN] 写入变化内容失败: {err}')
+
+    writer = BatchWriter(save_batch_fn, batch_size=db_batch_size, flush_interval=db_flush_interval,
+                         on_saved=on_saved, on_failed=on_failed, name='recrawl-writer').start()
+
+    def work(row):
+        name, url, old_hash = row
+        try:
+            data, err = fetch_fn(name, url, get_session(), limiter.acquire)
+        except Exception as exc:
+            data, err, category = None, f'{type(exc).__name__}: {exc}', classify_exception(exc)
+        else:
+            category = classify_error(err) if err else None
+        if data is None:
+            bump('fetch_failed')
+            if category == THROTTLE:
+                limiter.pause(throttle_pause)
+            print(f'  复查失败 {name}: {err}')
+            return
+        if hash_fn(data) == old_hash:
+            with lock:
+                unchanged.append(name)
+                counts['unchanged'] += 1
+            flush_unchanged()
+        else:
+            writer.put(data)
+
+    executor = ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix='recrawl')
+    try:
+        for future in [executor.submit(work, r) for r in rows]:
+            future.result()
+    except KeyboardInterrupt:
+        print('收到中断信号，取消剩余复查任务并写完已抓取的数据...')
+        executor.shutdown(wait=False, cancel_futures=True)
+        raise
+    finally:
+        executor.shutdown(wait=True)
+        writer.stop()
+        flush_unchanged(force=True)
+
+    elapsed = time.perf_counter() - t0
+    fetched = counts['changed'] + counts['unchanged'] + counts['write_failed']
+    return dict(
+        counts,
+        selected=len(rows),
+        changed_rate=round(counts['changed'] / fetched, 4) if fetched else 0.0,
+        unchanged_rate=round(counts['unchanged'] / fetched, 4) if fetched else 0.0,
+        elapsed_seconds=round(elapsed, 3),
+        fetch_per_sec=round((fetched + counts['fetch_failed']) / elapsed, 3) if elapsed > 0 else 0.0,
+        rate_limit_wait_seconds=round(limiter.waited_seconds, 3),
+    )
+
+
+def append_recrawl_metrics(path, summary, horizon_days):
+    """把一次复查的汇总追加到 CSV（文件不存在时写表头）。"""
+    is_new = not os.path.exists(path)
+    row = dict(summary, run_ts=datetime.now().isoformat(timespec='seconds'), horizon_days=horizon_days)
+    with open(path, 'a', encoding='utf-8-sig', newline='') as f:
+        writer = csv.writer(f)
+        if is_new:
+            writer.writerow(METRICS_HEADER)
+        writer.writerow([row.get(k, '') for k in METRICS_HEADER])
@@ -0,0 +1,244 @@
+# -*- coding: utf-8 -*-
+"""
+错误重试引擎：去重、按错误类别分流、并发重试、批量写库。
+
+原来的 retry_errors.py 逐个读取 batch_*_errors.csv 串行重试（每次固定 sleep 1.5s），
+同一个词在多个文件中出现会被重复抓取，解析类的永久性错误也会被一遍遍重试。这里：
+
+ 1. 读取所有错误文件（以及检查点库中的 failed 项），按词去重，同一个词以最新记录为准；
+ 2. 按错误信息分类：network / throttle / parse / db / missing / unknown，
+    parse 与 missing 视为永久性错误，默认跳过；
+ 3. 其余的由线程池并发重试，所有线程共用一个令牌桶（common.rate_limit.TokenBucket）限速，
+    每个线程复用自己的 requests.Session；遇到限流时整个令牌桶集体暂停退避；
+ 4. 抓取结果交给 common.batch_writer.BatchWriter 按批写库。
+"""
+import csv
+import glob
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+from common.batch_writer import BatchWriter
+from common.rate_limit import TokenBucket
+
+NETWORK = 'network'
+THROTTLE = 'throttle'
+PARSE = 'parse'
+DB = 'db'
+MISSING = 'missing'
+UNKNOWN = 'unknown'
+
+TRANSIENT_CATEGORIES = (NETWORK, THROTTLE, DB, UNKNOWN)
+PERMANENT_CATEGORIES = (PARSE, MISSING)
+
+# 按顺序匹配（小写后做子串匹配）；网络类放在解析类之前，
+# 因为 "处理失败: HTTPSConnectionPool ... timed out" 这类信息本质是网络错误
+_ERROR_PATTERNS = [
+    (THROTTLE, ('blocked', 'status=429', 'status=403', 'status=503', ' 429', ' 403', ' 503',
+                'too many requests', '限流', '封禁')),
+    (NETWORK, ('timed out', 'timeout', 'connectionerror', 'connection aborted', 'connection reset',
+               'max retries', 'name resolution', 'remote end closed', 'requestexception',
+               'ssl', '网络')),
+    (DB, ('db 写入', '数据库', 'mysql', 'deadlock', 'lock wait', '写库')),
+    (MISSING, ('无法获取', '详情页url', 'not found', '404')),
+    (PARSE, ('解析', '处理失败', 'parse', 'html', 'attributeerror', 'keyerror', 'indexerror')),
+]
+
+
+def classify_error(message):
+    """根据错误信息返回错误类别。"""
+    text = (message or '').lower()
+    for category, needles in _ERROR_PATTERNS:
+        if any(n in text for n in needles):
+            return category
+    return UNKNOWN
+
+
+def classify_exception(exc):
+    """根据异常类型（优先）或异常信息返回错误类别。"""
+    if isinstance(exc, requests.RequestException):
+        response = getattr(exc, 'response', None)
+        if response is not None and response.status_code in (429, 403, 503):
+            return THROTTLE
+        return NETWORK
+    return classify_error(f'{type(exc).__name__}: {exc}')
+
+
+def is_transient(category):
+    return category in TRANSIENT_CATEGORIES
+
+
+def load_error_entries(directory, key_columns, pattern='batch_*_errors.csv'):
+    """
+    读取 directory 下所有错误文件并按词去重。
+
+    Args:
+        key_columns: 词所在列名的候选（例如 ('chengyu',) 或 ('word', 'ciyu')）
+    Returns:
+        {word: entry}，entry 含 word / error / category / source_file / occurrences；
+        同一个词出现在多个文件中时以修改时间最新的文件为准。
+    """
+    files = sorted(glob.glob(os.path.join(directory, pattern)), key=os.path.getmtime)
+    entries = {}
+    for path in files:
+        try:
+            with open(path, 'r', encoding='utf-8-sig') as f:
+                for row in csv.DictReader(f):
+                    word = ''
+                    for col in key_columns:
+                        word = (row.get(col) or '').strip()
+                        if word:
+                            break
+                    if not word:
+                        continue
+                    error = (row.get('error') or '').strip()
+                    prev = entries.get(word)
+                    entries[word] = {
+                        'word': word,
+                        'error': error,
+                        'category': classify_error(error),
+                        'source_file': os.path.basename(path),
+                        'occurrences': (prev['occurrences'] + 1) if prev else 1,
+                    }
+        except Exception as e:
+            print(f'读取错误文件 {path} 失败: {e}')
+    return entries
+
+
+def merge_entries(entries, extra):
+    """把另一来源的 [(word, error, source)] 合并进 entries（已有的词只累加出现次数）。"""
+    for word, error, source in extra:
+        if not word:
+            continue
+        if word in entries:
+            entries[word]['occurrences'] += 1
+            continue
+        entries[word] = {
+            'word': word,
+            'error': error or '',
+            'category': classify_error(error),
+            'source_file': source,
+            'occurrences': 1,
+        }
+    return entries
+
+
+def run_retries(entries, fetch_fn, save_batch_fn, workers=4, rate_per_sec=1.0, burst=2,
+                max_attempts=3, backoff_base=2.0, db_batch_size=50, db_flush_interval=3.0,
+                include_permanent=False):
+    """
+    并发重试。
+
+    Args:
+        entries: load_error_entries / merge_entries 的结果
+        fetch_fn: fetch_fn(word, session, wait) -> (data, None) 或 (None, error_message)；
+                  每次发 HTTP 请求前调用 wait() 以遵守共享限速；网络异常可直接抛出
+        save_batch_fn: save_*_batch_to_db，返回 (saved, failed, nbytes)
+        include_permanent: True 时连 parse / missing 类错误也重试
+    Returns:
+        (results, summary)：results 为 {word: result}，result 在 entry 基础上增加
+        success / message / retry_category / attempts；summary 为计数与耗时。
+    """
+    t0 = time.perf_counter()
+    results = {}
+    results_lock = threading.Lock()
+
+    def record(entry, success, message, category=None, attempts=0):
+        with results_lock:
+            results[entry['word']] = dict(entry, success=success, message=message,
+                                          retry_category=category or '', attempts=attempts)
+
+    to_run = []
+    for entry in entries.values():
+        if include_permanent or is_transient(entry['category']):
+            to_run.append(entry)
+        else:
+            record(entry, False, f"永久性错误（{entry['category']}），跳过重试", entry['category'])
+
+    limiter = TokenBucket(rate_per_sec, burst)
+    local = threading.local()
+    attempts_by_word = {}
+
+    def get_session():
+        if not hasattr(local, 'session'):
+            local.session = requests.Session()
+        return local.session
+
+    def flush(items):
+        by_id = {id(data): entry for entry, data in items}
+        saved, failed, nbytes = save_batch_fn([data for _, data in items])
+        return ([(by_id[id(d)], d) for d in saved],
+                [((by_id[id(d)], d), err) for d, err in failed],
+                nbytes)
+
+    def on_saved(items):
+        for entry, _ in items:
+            record(entry, True, '成功保存到数据库', attempts=attempts_by_word.get(entry['word'], 0))
+
+    def on_failed(item, err):
+        entry = item[0]
+        record(entry, False, f'保存到数据库失败: {err}', DB, attempts_by_word.get(entry['word'], 0))
+
+    writer = BatchWriter(flush, batch_size=db_batch_size, flush_interval=db_flush_interval,
+                         on_saved=on_saved, on_failed=on_failed, name='retry-writer').start()
+
+    def work(entry):
+        word = entry['word']
+        message, category = '', UNKNOWN
+        for attempt in range(1, max_attempts + 1):
+            attempts_by_word[word] = attempt
+            try:
+                data, err = fetch_fn(word, get_session(), limiter.acquire)
+            except Exception as exc:
+                data, message, category = None, f'{type(exc).__name__}: {exc}', classify_exception(exc)
+            else:
+                if data is not None:
+                    writer.put((entry, data))
+                    return
+                message, category = err, classify_error(err)
+            if not is_transient(category) or attempt == max_attempts:
+                break
+            backoff = backoff_base * (2 ** (attempt - 1))
+            if category == THROTTLE:
+                limiter.pause(backoff)  # 限流时所有线程一起退避
+            else:
+                time.sleep(backoff)
+        record(entry, False, message, category, attempts_by_word.get(word, 0))
+
+    executor = ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix='retry')
+    try:
+        for future in [executor.submit(work, e) for e in to_run]:
+            future.result()
+    except KeyboardInterrupt:
+        print('收到中断信号，取消剩余重试任务并写完已抓取的数据...')
+        executor.shutdown(wait=False, cancel_futures=True)
+        raise
+    finally:
+        executor.shutdown(wait=True)
+        writer.stop()
+
+    summary = {
+        'total': len(entries),
+        'attempted': len(to_run),
+        'skipped_permanent': len(entries) - len(to_run),
+        'success': sum(1 for r in results.values() if r['success']),
+        'fail': sum(1 for r in results.values() if not r['success']),
+        'elapsed_seconds': round(time.perf_counter() - t0, 3),
+        'rate_limit_wait_seconds': round(limiter.waited_seconds, 3),
+        'writer': writer.stats(),
+    }
+    return results, summary
+
+
+def write_results_csv(path, results, key_column):
+    """把重试结果写入 CSV（覆盖）。"""
+    with open(path, 'w', encoding='utf-8-sig', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow([key_column, 'original_error', 'category', 'source_file', 'occurrences',
+                         'retry_success', 'retry_category', 'retry_attempts', 'retry_message'])
+        for r in results.values():
+            writer.writerow([r['word'], r['error'], r['category'], r['source_file'], r['occurrences'],
+                             r['success'], r['retry_category'], r['attempts'], r['message']])
@@ -0,0 +1,42 @@
+# -*- coding: utf-8 -*-
+"""
+按事件抽样的结构化日志（替代逐条 print）。
+
+TEST_MODE 下每条记录都打印完整 SQL 与参数，高速率时终端输出本身就成了瓶颈，也把有用的信息淹没了。
+SampledLogger 对每个事件名单独计数：前 first 次与之后每 every 次输出一行 JSON（ts / logger / event / n 及调用方字段），
+其余只累加计数。字段可以传一个无参函数，只在这一条被抽中时才计算（如拼装 SQL 与参数）。
+
+`summary()` 返回各事件的总次数，便于结束时打印一行汇总。
+"""
+import json
+import threading
+import time
+
+
+class SampledLogger:
+    def __init__(self, name, first=3, every=100):
+        self.name = name
+        self.first = max(0, int(first))
+        self.every = max(1, int(every))
+        self._counts = {}
+        self._lock = threading.Lock()
+
+    def log(self, event, fields=None, **kwargs):
+        """记录一次 event；被抽中时输出一行 JSON。fields 可为 dict 或返回 dict 的函数。返回是否输出。"""
+        with self._lock:
+            n = self._counts.get(event, 0) + 1
+            self._counts[event] = n
+        if n > self.first and n % self.every:
+            return False
+        record = {'ts': time.strftime('%H:%M:%S'), 'logger': self.name, 'event': event, 'n': n}
+        if callable(fields):
+            fields = fields()
+        if fields:
+            record.update(fields)
+        record.update(kwargs)
+        print(json.dumps(record, ensure_ascii=False, default=str))
+        return True
+
+    def summary(self):
+        with self._lock:
+            return dict(self._counts)
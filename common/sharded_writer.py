@@ -0,0 +1,184 @@
+# -*- coding: utf-8 -*-
+"""
+按键哈希分片的多线程写库器（抓取线程 → N 个写线程）。
+
+单个写线程要串行完成序列化、网络往返与提交，并发抓取时跟不上。这里起 num_writers 个写线程：
+
+ - 每个写线程有自己的有界队列（common/bounded_queue.py，总限额按线程数均分）、缓冲区与数据库连接；
+ - `put()` 按 key_fn(item) 的 CRC32 取模选择分片：同一个键总是落在同一个写线程，其 upsert 保持先后顺序；
+ - 写线程按 batch_size 条或 flush_interval 秒刷新，调用 `flush_fn(items, connection)`，
+   返回 `(成功条数, 失败条数)`；检查点与计数由调用方在 flush_fn 中更新；
+ - 连接由 `open_fn()` 在写线程首次刷新时建立、线程退出时关闭；flush_fn 抛出异常时关闭并在下次刷新时重建；
+ - `stop()` 后写线程不再按 batch_size 分段，而是把队列取空、连同缓冲区整批一次提交后退出（每个写线程一个事务）；
+ - `abandon()` 用于强制退出：写线程不再发起新的刷新，正在进行的一次刷新完成后即退出，其余条目留给调用方回放。
+
+`stats()` 汇总各分片队列（峰值深度与字节数、生产者等待、写库滞后），`writer_stats()` 返回每个写线程的
+rows / fail / batches / write_seconds / rows_per_sec（按写库耗时计算）。
+"""
+import queue
+import threading
+import time
+import zlib
+
+from common.bounded_queue import BoundedQueue
+
+
+class _Shard:
+    def __init__(self, idx, max_items, max_bytes):
+        self.idx = idx
+        self.queue = BoundedQueue(max_items, max_bytes)
+        self.thread = None
+        self.buffer = []
+        self.stats = {'rows': 0, 'fail': 0, 'batches': 0, 'write_seconds': 0.0}
+
+
+class ShardedWriter:
+    """num_writers 个按键分片的写线程；num_writers = 1 时等价于原来的单写线程。"""
+
+    def __init__(self, flush_fn, num_writers=1, key_fn=None, batch_size=50, flush_interval=3.0,
+                 max_items=1000, max_bytes=64 * 1024 * 1024, open_fn=None, name='db-writer'):
+        self.flush_fn = flush_fn
+        self.num_writers = max(1, int(num_writers))
+        self.key_fn = key_fn or (lambda item: item)
+        self.batch_size = max(1, int(batch_size))
+        self.flush_interval = flush_interval
+        self.open_fn = open_fn
+        self.name = name
+        per_items = -(-int(max_items) // self.num_writers)
+        per_bytes = -(-int(max_bytes) // self.num_writers)
+        self._shards = [_Shard(i, per_items, per_bytes) for i in range(self.num_writers)]
+        self._stop = threading.Event()
+        self._abandon = threading.Event()
+        self._lock = threading.Lock()
+
+    # ---------- 生产者接口 ----------
+    def start(self):
+        for shard in self._shards:
+            shard.thread = threading.Thread(target=self._run, args=(shard,),
+                                            name=f'{self.name}-{shard.idx}', daemon=True)
+            shard.thread.start()
+        return self
+
+    def shard_of(self, key):
+        if self.num_writers == 1:
+            return 0
+        return zlib.crc32(str(key).encode('utf-8')) % self.num_writers
+
+    def put(self, item, nbytes=0):
+        """按键分片入队；该分片队列已满时阻塞（背压）。"""
+        self._shards[self.shard_of(self.key_fn(item))].queue.put(item, nbytes)
+
+    def stop(self, timeout=None):
+        """通知写线程退出（退出前写完各自的队列与缓冲区）；timeout 为所有线程共用的等待上限，返回是否全部退出。"""
+        self._stop.set()
+        for shard in self._shards:
+            shard.queue.close()
+        deadline = None if timeout is None else time.perf_counter() + timeout
+        for shard in self._shards:
+            if shard.thread is None:
+                continue
+            remaining = None if deadline is None else max(0.0, deadline - time.perf_counter())
+            shard.thread.join(timeout=remaining)
+        return not self.is_alive()
+
+    def abandon(self):
+        """放弃尚未写库的条目并通知写线程退出（不等待）；已在进行中的一次刷新仍会完成。"""
+        self._abandon.set()
+        self._stop.set()
+        for shard in self._shards:
+            shard.queue.close()
+
+    def pending(self):
+        """返回尚未写库的记录数（各分片队列 + 缓冲区）。"""
+        return sum(s.queue.qsize() + len(s.buffer) for s in self._shards)
+
+    def queue_depth(self):
+        """返回各分片队列合计的 (条数, 字节数)。"""
+        return sum(s.queue.qsize() for s in self._shards), sum(s.queue.nbytes() for s in self._shards)
+
+    def oldest_age(self):
+        """返回各分片队首记录已等待秒数的最大值（当前写库滞后）。"""
+        return max(s.queue.oldest_age() for s in self._shards)
+
+    def is_alive(self):
+        return any(s.thread is not None and s.thread.is_alive() for s in self._shards)
+
+    # ---------- 写线程 ----------
+    def _run(self, shard):
+        last_flush = time.time()
+        connection = None
+        q = shard.queue
+        try:
+            while not self._abandon.is_set() and (not self._stop.is_set() or not q.empty()):
+                try:
+                    item = q.get(timeout=0.5)
+                except queue.Empty:
+                    item = None
+
+                if item is not None:
+                    shard.buffer.append(item)
+
+                if self._abandon.is_set():
+                    break
+                stopping = self._stop.is_set()
+                # 停止时先把队列取空，再把缓冲区整批一次提交，避免退出阶段分段提交
+                if (not stopping and len(shard.buffer) >= self.batch_size) or \
+                        (not stopping and shard.buffer and (time.time() - last_flush) > self.flush_interval) or \
+                        (stopping and shard.buffer and q.empty()):
+                    if connection is None and self.open_fn is not None:
+                        connection = self.open_fn()
+                    connection = self._flush(shard, shard.buffer, connection)
+                    shard.buffer = []
+                    last_flush = time.time()
+        finally:
+            self._close(connection)
+
+    def _flush(self, shard, items, connection):
+        t0 = time.perf_counter()
+        try:
+            saved, failed = self.flush_fn(items, connection)
+        except Exception as exc:
+            print(f'{self.name}-{shard.idx} 批量写入异常:', exc)
+            saved, failed = 0, len(items)
+            self._close(connection)
+            connection = None
+        elapsed = time.perf_counter() - t0
+        with self._lock:
+            shard.stats['rows'] += saved
+            shard.stats['fail'] += failed
+            shard.stats['batches'] += 1
+            shard.stats['write_seconds'] += elapsed
+        return connection
+
+    @staticmethod
+    def _close(connection):
+        if connection is None:
+            return
+        try:
+            connection.close()
+        except Exception:
+            pass
+
+    # ---------- 统计 ----------
+    def stats(self):
+        """汇总各分片队列的统计：峰值深度/字节数与生产者等待取总和，写库滞后取总滞后/总出队数与最大值。"""
+        per = [s.queue.stats() for s in self._shards]
+        gets = sum(p['gets'] for p in per)
+        return {
+            'peak_items': sum(p['peak_items'] for p in per),
+            'peak_bytes': sum(p['peak_bytes'] for p in per),
+            'producer_waits': sum(p['producer_waits'] for p in per),
+            'producer_wait_seconds': round(sum(p['producer_wait_seconds'] for p in per), 3),
+            'lag_avg_seconds': round(sum(p['lag_total_seconds'] for p in per) / gets, 3) if gets else 0.0,
+            'lag_max_seconds': max(p['lag_max_seconds'] for p in per),
+        }
+
+    def writer_stats(self):
+        """返回每个写线程的统计列表（rows_per_sec 按写库耗时计算）。"""
+        with self._lock:
+            result = [dict(s.stats, writer=s.idx) for s in self._shards]
+        for s in result:
+            busy = s['write_seconds']
+            s['rows_per_sec'] = round(s['rows'] / busy, 3) if busy > 0 else 0.0
+            s['write_seconds'] = round(busy, 3)
+        return result
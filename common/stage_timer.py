@@ -0,0 +1,107 @@
+# -*- coding: utf-8 -*-
+"""
+按阶段累计耗时与流式分位数（写入 batch_metrics.csv 的逐阶段列）。
+
+batch_metrics.csv 原先只有整批的 elapsed_seconds，慢批次分不清是搜索、详情页、解析、抖动等待、退避还是写库拖慢的。
+StageTimer 在一批内按阶段累计 perf_counter_ns 计时，并用 QuantileSketch 流式估计 p50 / p95 / p99：
+
+ - QuantileSketch 按对数分桶计数（相对误差 relative_accuracy，默认 1%），内存只与取值的数量级跨度有关，
+   与样本数无关；加一个样本只是一次 log 与一次字典累加；
+ - `StageTimer.columns()` 返回 `{stage}_seconds`（累计秒数）与 `{stage}_p50_ms` / `_p95_ms` / `_p99_ms`（单次耗时毫秒），
+   列名由 `stage_columns()` 给出，旧 CSV 的迁移见 common/metrics_csv.py 的 `upgrade_metrics_csv()`。
+
+`add_ns()` 线程安全（写线程的 db_write 与抓取线程并发记录）。
+"""
+import contextlib
+import math
+import threading
+import time
+
+STAGES = ('search', 'detail', 'parse', 'jitter', 'backoff', 'db_write')
+QUANTILES = (50, 95, 99)
+
+
+def stage_columns(stages=STAGES):
+    """按 CSV 列顺序返回各阶段的列名。"""
+    columns = []
+    for stage in stages:
+        columns.append(f'{stage}_seconds')
+        columns.extend(f'{stage}_p{q}_ms' for q in QUANTILES)
+    return columns
+
+
+class QuantileSketch:
+    """对数分桶的流式分位数估计（DDSketch 思路）：估计值与真实分位数的相对误差不超过 relative_accuracy。"""
+
+    def __init__(self, relative_accuracy=0.01):
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self._log_gamma = math.log(self.gamma)
+        self._buckets = {}
+        self._zero = 0  # 非正值单独计数（如 0ns 的空等待）
+        self.count = 0
+
+    def add(self, value):
+        self.count += 1
+        if value <= 0:
+            self._zero += 1
+            return
+        key = math.ceil(math.log(value) / self._log_gamma)
+        self._buckets[key] = self._buckets.get(key, 0) + 1
+
+    def merge(self, other):
+        self.count += other.count
+        self._zero += other._zero
+        for key, n in other._buckets.items():
+            self._buckets[key] = self._buckets.get(key, 0) + n
+
+    def quantile(self, q):
+        """q 取 0~1；没有样本时返回 None。"""
+        if not self.count:
+            return None
+        rank = q * (self.count - 1)
+        seen = self._zero
+        if rank < seen:
+            return 0.0
+        for key in sorted(self._buckets):
+            seen += self._buckets[key]
+            if rank < seen:
+                # 取桶 (gamma^(k-1), gamma^k] 的中点，使相对误差对称
+                return 2 * self.gamma ** key / (self.gamma + 1)
+        return 2 * self.gamma ** max(self._buckets) / (self.gamma + 1)
+
+
+class StageTimer:
+    """一批内各阶段的累计耗时与分位数。"""
+
+    def __init__(self, stages=STAGES, relative_accuracy=0.01):
+        self.stages = tuple(stages)
+        self._total_ns = {s: 0 for s in self.stages}
+        self._sketches = {s: QuantileSketch(relative_accuracy) for s in self.stages}
+        self._lock = threading.Lock()
+
+    def add_ns(self, stage, ns):
+        if stage not in self._total_ns:
+            return
+        with self._lock:
+            self._total_ns[stage] += ns
+            self._sketches[stage].add(ns)
+
+    @contextlib.contextmanager
+    def measure(self, stage):
+        t0 = time.perf_counter_ns()
+        try:
+            yield
+        finally:
+            self.add_ns(stage, time.perf_counter_ns() - t0)
+
+    def columns(self):
+        """返回 stage_columns() 对应的 dict；没有样本的阶段累计为 0、分位数留空。"""
+        row = {}
+        with self._lock:
+            for stage in self.stages:
+                row[f'{stage}_seconds'] = round(self._total_ns[stage] / 1e9, 3)
+                sketch = self._sketches[stage]
+                for q in QUANTILES:
+                    value = sketch.quantile(q / 100)
+                    row[f'{stage}_p{q}_ms'] = '' if value is None else round(value / 1e6, 3)
+        return row
@@ -0,0 +1,222 @@
+# -*- coding: utf-8 -*-
+"""
+存储后端：MySQL（远程库）与 SQLite（本地文件库）。
+
+写库代码（`_write_chengyu`、`save_*_batch_to_db`、`save_characters_to_db` 等）只依赖 pymysql 风格的连接：
+`cursor()` 返回字典行、`%s` 占位符、`begin / commit / rollback / close`、`SAVEPOINT`。
+两种后端都提供这样的连接，写库路径除驱动外完全相同，便于离线运行与本地端到端压测（TEST_MODE 只打印 SQL，测不出吞吐）。
+
+SQLite 后端：
+ - 首次连接时按调用方给出的建表语句建表（列、唯一键、关系表有序对与 MySQL 表一致）；
+ - 执行前把本仓库用到的 MySQL 方言改写为 SQLite 等价写法：
+     `%s` → `?`，`INSERT IGNORE` → `INSERT OR IGNORE`，
+     `ON DUPLICATE KEY UPDATE c = VALUES(c)` → `ON CONFLICT(唯一键) DO UPDATE SET c = excluded.c`，
+     `GREATEST / LEAST` → `MAX / MIN`，`NOW() - INTERVAL %s DAY` → `datetime('now', ...)`，
+     `COLLATE utf8mb4_bin` → `COLLATE BINARY`，`VERSION()` → `sqlite_version()`；
+ - TIMESTAMP 列读出为 datetime，与 pymysql 一致；
+ - 使用 WAL 日志，爬取线程与写线程可各自持有连接并发读写。
+
+LOAD DATA 批量导入与 JSON_TABLE 集合构建关系只有 MySQL 支持（`supports_load_data`），SQLite 下由调用方退回逐条写入路径。
+"""
+import os
+import re
+import sqlite3
+import threading
+from datetime import datetime
+
+import pymysql
+
+
+class MySQLStorage:
+    """pymysql 连接工厂（DictCursor，utf8mb4）。"""
+
+    name = 'mysql'
+    supports_load_data = True
+
+    def __init__(self, config):
+        self.config = config
+
+    def connect(self, local_infile=False):
+        return pymysql.connect(
+            host=self.config["host"],
+            user=self.config["user"],
+            password=self.config["password"],
+            database=self.config["database"],
+            port=self.config["port"],
+            charset="utf8mb4",
+            cursorclass=pymysql.cursors.DictCursor,
+            local_infile=local_infile,
+        )
+
+    def describe(self):
+        return f"mysql://{self.config['host']}:{self.config['port']}/{self.config['database']}"
+
+
+# ================= SQLite 方言改写 =================
+
+_INSERT_TABLE_RE = re.compile(r"INSERT\s+(?:IGNORE\s+)?INTO\s+`?(\w+)`?", re.I)
+_ON_DUPLICATE_RE = re.compile(r"ON\s+DUPLICATE\s+KEY\s+UPDATE", re.I)
+_VALUES_FN_RE = re.compile(r"VALUES\(\s*(`?\w+`?)\s*\)", re.I)
+_INTERVAL_RE = re.compile(r"NOW\(\)\s*-\s*INTERVAL\s+%s\s+DAY", re.I)
+_SIMPLE_REWRITES = [
+    (re.compile(r"INSERT\s+IGNORE\s+INTO", re.I), "INSERT OR IGNORE INTO"),
+    (re.compile(r"\bGREATEST\(", re.I), "MAX("),
+    (re.compile(r"\bLEAST\(", re.I), "MIN("),
+    (re.compile(r"COLLATE\s+utf8mb4_bin", re.I), "COLLATE BINARY"),
+    (re.compile(r"\bVERSION\(\)", re.I), "sqlite_version()"),
+]
+
+
+def translate_mysql(sql, conflict_keys):
+    """把本仓库用到的 MySQL 方言改写为 SQLite（见模块说明）；conflict_keys 为 {表名: 唯一键列}。"""
+    m = _ON_DUPLICATE_RE.search(sql)
+    if m:
+        table = _INSERT_TABLE_RE.search(sql).group(1)
+        key = conflict_keys.get(table)
+        if not key:
+            raise ValueError(f'SQLite 后端未登记 {table} 的唯一键，无法改写 ON DUPLICATE KEY UPDATE')
+        head, tail = sql[:m.start()], sql[m.end():]
+        tail = _VALUES_FN_RE.sub(lambda v: f"excluded.{v.group(1)}", tail)
+        sql = f"{head}ON CONFLICT({key}) DO UPDATE SET{tail}"
+    sql = _INTERVAL_RE.sub("datetime('now', '-' || %s || ' days')", sql)
+    for pattern, repl in _SIMPLE_REWRITES:
+        sql = pattern.sub(repl, sql)
+    return sql.replace('%s', '?')
+
+
+def _convert_timestamp(value):
+    text = value.decode('utf-8')
+    try:
+        return datetime.fromisoformat(text)
+    except ValueError:
+        return text
+
+
+sqlite3.register_converter('TIMESTAMP', _convert_timestamp)
+sqlite3.register_adapter(datetime, lambda d: d.strftime('%Y-%m-%d %H:%M:%S'))
+
+
+def _dict_row(cursor, row):
+    return {col[0]: value for col, value in zip(cursor.description, row)}
+
+
+class SQLiteCursor:
+    """pymysql 游标的最小兼容层：execute 返回受影响行数，fetch* 返回字典（或 tuple）行。"""
+
+    def __init__(self, conn, conflict_keys, as_dict=True):
+        self._cur = conn.cursor()
+        if as_dict:
+            self._cur.row_factory = _dict_row
+        self._conflict_keys = conflict_keys
+
+    def execute(self, sql, params=()):
+        self._cur.execute(translate_mysql(sql, self._conflict_keys), tuple(params or ()))
+        return max(self._cur.rowcount, 0)
+
+    def executemany(self, sql, seq_of_params):
+        self._cur.executemany(translate_mysql(sql, self._conflict_keys), [tuple(p) for p in seq_of_params])
+        return max(self._cur.rowcount, 0)
+
+    def fetchone(self):
+        return self._cur.fetchone()
+
+    def fetchmany(self, size=None):
+        return self._cur.fetchmany(size or self._cur.arraysize)
+
+    def fetchall(self):
+        return self._cur.fetchall()
+
+    @property
+    def rowcount(self):
+        return self._cur.rowcount
+
+    @property
+    def lastrowid(self):
+        return self._cur.lastrowid
+
+    def close(self):
+        self._cur.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class SQLiteConnection:
+    """pymysql 连接的最小兼容层（事务语义：DML 前隐式开启，commit / rollback 结束）。"""
+
+    def __init__(self, path, conflict_keys):
+        self._conn = sqlite3.connect(path, timeout=30, detect_types=sqlite3.PARSE_DECLTYPES)
+        self._conn.execute("PRAGMA foreign_keys = ON")
+        self._conn.execute("PRAGMA synchronous = NORMAL")
+        self._conflict_keys = conflict_keys
+
+    def cursor(self, cursor_type=None):
+        # 传入 pymysql.cursors.SSCursor 等非字典游标类时返回 tuple 行，与 pymysql 一致
+        as_dict = cursor_type is None or 'Dict' in getattr(cursor_type, '__name__', '')
+        return SQLiteCursor(self._conn, self._conflict_keys, as_dict=as_dict)
+
+    def begin(self):
+        if not self._conn.in_transaction:
+            self._conn.execute("BEGIN")
+
+    def commit(self):
+        self._conn.commit()
+
+    def rollback(self):
+        self._conn.rollback()
+
+    def ping(self, reconnect=False):
+        # 本地文件库没有断线问题，仅为与 pymysql 连接接口一致
+        return None
+
+    def close(self):
+        self._conn.close()
+
+
+class SQLiteStorage:
+    """本地 SQLite 文件库；schema 为建表语句列表，conflict_keys 为 {表名: upsert 冲突判断用的唯一键列}。"""
+
+    name = 'sqlite'
+    supports_load_data = False
+
+    _init_lock = threading.Lock()
+    _initialized = set()
+
+    def __init__(self, path, schema=(), conflict_keys=None):
+        self.path = os.path.abspath(path)
+        self.schema = list(schema)
+        self.conflict_keys = dict(conflict_keys or {})
+
+    def _ensure_schema(self):
+        with self._init_lock:
+            if self.path in self._initialized:
+                return
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=30)
+            try:
+                conn.execute("PRAGMA journal_mode = WAL")
+                for ddl in self.schema:
+                    conn.executescript(ddl)
+                conn.commit()
+            finally:
+                conn.close()
+            self._initialized.add(self.path)
+
+    def connect(self, local_infile=False):
+        self._ensure_schema()
+        return SQLiteConnection(self.path, self.conflict_keys)
+
+    def describe(self):
+        return f"sqlite:///{self.path}"
+
+
+def open_storage(backend, mysql_config=None, sqlite_path=None, sqlite_schema=(), conflict_keys=None):
+    """按 backend（'mysql' / 'sqlite'）创建存储后端。"""
+    if backend == 'mysql':
+        return MySQLStorage(mysql_config)
+    if backend == 'sqlite':
+        return SQLiteStorage(sqlite_path, sqlite_schema, conflict_keys)
+    raise ValueError(f'未知的存储后端: {backend}')
@@ -0,0 +1,231 @@
+# -*- coding: utf-8 -*-
+"""
+Neo4j 词条列表的本地快照（紧凑、可 mmap、有序）。
+
+每次启动都从远程 Neo4j 拉取全量 Idiom/Word 列表很慢。这里把列表写成一个本地二进制文件，
+并记录生成时 Neo4j 的指纹（数量 + 首尾样本哈希）。启动时只需查询一次指纹：
+一致则直接 mmap 打开快照（毫秒级），不一致或快照缺失时才全量刷新。
+
+文件格式（小端）：
+    magic(8) | header_len(uint32) | header JSON(utf-8，补齐到 4 字节) |
+    offsets(uint32 × (count + 1)) | names(utf-8 拼接)
+第 i 个词为 names[offsets[i]:offsets[i+1]]。词条按 Neo4j 的 ORDER BY name 顺序存放，
+与 keyset 分页的顺序（以及 batch_metrics.csv 的 end 偏移）保持一致。
+"""
+import bisect
+import json
+import mmap
+import os
+import struct
+import sys
+import time
+from array import array
+
+MAGIC = b'WSNAP01\0'
+
+
+class WordSnapshot:
+    """只读的词条快照，支持 len / 下标 / 切片 / 迭代 / 成员判断。"""
+
+    def __init__(self, path):
+        self.path = path
+        self._file = open(path, 'rb')
+        try:
+            self._mm = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:  # 空文件无法 mmap
+            self._file.close()
+            raise ValueError(f'快照文件为空: {path}')
+        if self._mm[:8] != MAGIC:
+            self.close()
+            raise ValueError(f'不是有效的快照文件: {path}')
+        header_len = struct.unpack_from('<I', self._mm, 8)[0]
+        self.meta = json.loads(bytes(self._mm[12:12 + header_len]).decode('utf-8'))
+        self.count = int(self.meta['count'])
+        offsets_start = 12 + _pad4(header_len)
+        offsets_end = offsets_start + 4 * (self.count + 1)
+        # mmap 按本机字节序解读；快照按小端写入，目前只支持小端平台（x86 / ARM 均是）
+        self._offsets = memoryview(self._mm)[offsets_start:offsets_end].cast('I')
+        self._names_start = offsets_end
+
+    @property
+    def fingerprint(self):
+        return self.meta.get('fingerprint')
+
+    def __len__(self):
+        return self.count
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(self.count))]
+        if index < 0:
+            index += self.count
+        if not 0 <= index < self.count:
+            raise IndexError(index)
+        start = self._names_start + self._offsets[index]
+        end = self._names_start + self._offsets[index + 1]
+        return self._mm[start:end].decode('utf-8')
+
+    def __iter__(self):
+        return self.iter_from(0)
+
+    def iter_from(self, index):
+        for i in range(index, self.count):
+            yield self[i]
+
+    def __contains__(self, name):
+        # 快照按 Neo4j 顺序存放；只有该顺序与 Python 字符串顺序一致时才能二分查找
+        if self.meta.get('python_sorted', False):
+            i = bisect.bisect_left(_SnapshotView(self), name)
+            return i < self.count and self[i] == name
+        return any(n == name for n in self)
+
+    def close(self):
+        try:
+            self._offsets.release()
+        except Exception:
+            pass
+        try:
+            self._mm.close()
+        except Exception:
+            pass
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class _SnapshotView:
+    """给 bisect 用的序列视图。"""
+
+    def __init__(self, snapshot):
+        self._snapshot = snapshot
+
+    def __len__(self):
+        return len(self._snapshot)
+
+    def __getitem__(self, index):
+        return self._snapshot[index]
+
+
+def _pad4(n):
+    return (n + 3) & ~3
+
+
+def build_snapshot(path, names, fingerprint, label=''):
+    """
+    把可迭代的词条流写成快照文件（先写临时文件再原子替换）。
+
+    词条逐条写入，只在内存中保留偏移数组（每词 4 字节），适合直接消费 keyset 分页流。
+    返回写入的词条数。
+    """
+    tmp_blob = path + '.names.tmp'
+    tmp_path = path + '.tmp'
+    try:
+        offsets = array('I', [0])
+        python_sorted = True
+        prev = None
+        size = 0
+        with open(tmp_blob, 'wb') as bf:
+            for name in names:
+                if not name:
+                    continue
+                if prev is not None and name <= prev:
+                    python_sorted = False
+                prev = name
+                data = name.encode('utf-8')
+                bf.write(data)
+                size += len(data)
+                offsets.append(size)
+        if offsets.itemsize != 4:
+            raise RuntimeError('当前平台 array("I") 不是 4 字节，无法生成快照')
+        if size >= 2 ** 32:
+            raise RuntimeError('快照过大（超过 4GB）')
+
+        count = len(offsets) - 1
+        meta = {
+            'label': label,
+            'count': count,
+            'fingerprint': fingerprint,
+            'python_sorted': python_sorted,
+            'created_at': time.strftime('%Y-%m-%d %H:%M:%S'),
+        }
+        header = json.dumps(meta, ensure_ascii=False).encode('utf-8')
+        with open(tmp_path, 'wb') as f:
+            f.write(MAGIC)
+            f.write(struct.pack('<I', len(header)))
+            f.write(header.ljust(_pad4(len(header)), b' '))
+            if sys.byteorder != 'little':
+                offsets.byteswap()
+            f.write(offsets.tobytes())
+            with open(tmp_blob, 'rb') as bf:
+                while True:
+                    chunk = bf.read(1 << 20)
+                    if not chunk:
+                        break
+                    f.write(chunk)
+        os.replace(tmp_path, path)
+    finally:
+        for p in (tmp_blob, tmp_path):
+            if os.path.exists(p):
+                os.remove(p)
+    return count
+
+
+def load_snapshot(path, fingerprint_fn, fetch_fn, label='', verify=True, force_refresh=False):
+    """
+    打开与 Neo4j 一致的本地快照；不一致或不存在时用 fetch_fn() 的词条流全量刷新。
+
+    Args:
+        path: 快照文件路径
+        fingerprint_fn: 返回 Neo4j 当前指纹（字符串）的函数，失败返回 None
+        fetch_fn: 返回有序词条可迭代对象的函数（通常是 keyset 分页迭代器）
+        verify: False 时跳过指纹校验，直接使用已有快照
+        force_refresh: True 时忽略已有快照强制刷新
+
+    Returns:
+        WordSnapshot | None：刷新失败时退回已有的旧快照；无法获得任何可用列表时返回 None
+    """
+    t0 = time.perf_counter()
+    snapshot = None
+    if os.path.exists(path) and not force_refresh:
+        try:
+            snapshot = WordSnapshot(path)
+        except Exception as exc:
+            print(f'[WARN] 快照文件损坏，将重新生成: {exc}')
+            snapshot = None
+
+    if snapshot is not None and not verify:
+        print(f'使用本地快照（未校验）：{len(snapshot)} 条，耗时 {(time.perf_counter() - t0) * 1000:.1f}ms')
+        return snapshot
+
+    fingerprint = fingerprint_fn()
+    if snapshot is not None:
+        if fingerprint is None:
+            print('[WARN] 无法获取 Neo4j 指纹，暂用本地快照')
+            return snapshot
+        if snapshot.fingerprint == fingerprint:
+            print(f'本地快照与 Neo4j 一致：{len(snapshot)} 条，耗时 {(time.perf_counter() - t0) * 1000:.1f}ms')
+            return snapshot
+        print(f'Neo4j 数据已变化（{snapshot.fingerprint} -> {fingerprint}），刷新本地快照...')
+    elif fingerprint is None:
+        return None
+
+    # 先生成到旁路文件：刷新中途失败（如 Neo4j 断开）时旧快照保持打开、原文件不动，仍可继续使用
+    new_path = path + '.new'
+    try:
+        count = build_snapshot(new_path, fetch_fn(), fingerprint, label=label)
+    except Exception as exc:
+        if snapshot is not None:
+            print(f'[WARN] 刷新本地快照失败，暂用本地快照（{len(snapshot)} 条）: {exc}')
+            return snapshot
+        print(f'[WARN] 刷新本地快照失败: {exc}')
+        return None
+    # 替换前关闭旧快照的 mmap（Windows 上无法替换仍被映射的文件）
+    if snapshot is not None:
+        snapshot.close()
+    os.replace(new_path, path)
+    print(f'已刷新本地快照：{count} 条，耗时 {time.perf_counter() - t0:.1f}s')
+    return WordSnapshot(path)
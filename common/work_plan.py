@@ -0,0 +1,68 @@
+# -*- coding: utf-8 -*-
+"""
+按集合差规划爬取任务：只爬 Neo4j 中有、MySQL 中还没有的词条。
+
+位置偏移（batch_metrics.csv 的 end）无法得知某个词是否已被 retry_errors.py 补写，
+也感知不到 Neo4j 中新增的词。这里直接对两边的键做差集：
+ - 内存模式：把已入库的键读成 set，再按候选顺序过滤；
+ - 有序归并模式：两边按同一顺序（Unicode 码点升序）流式归并，额外内存为 O(1)，适合超大集合。
+"""
+import time
+
+
+def sorted_difference(candidates, existing):
+    """对两个按同一顺序升序排列的流求差集（candidates - existing），保持 candidates 的顺序。"""
+    existing_iter = iter(existing)
+    current = next(existing_iter, None)
+    for name in candidates:
+        while current is not None and current < name:
+            current = next(existing_iter, None)
+        if current is not None and current == name:
+            continue
+        yield name
+
+
+def plan_missing(candidates, existing, sorted_merge=False):
+    """
+    计算尚未入库的候选词条。
+
+    Args:
+        candidates: 候选词条（可迭代，通常是 Neo4j 快照）
+        existing: 已入库的键（可迭代）；sorted_merge=True 时两者都必须按码点升序
+        sorted_merge: 是否使用有序归并
+
+    Returns:
+        (todo_list, stats)：stats 含 candidates / already_done / todo / seconds / mode
+    """
+    t0 = time.perf_counter()
+    total = 0
+    todo = []
+    if sorted_merge:
+        def counted():
+            nonlocal total
+            for name in candidates:
+                total += 1
+                yield name
+        todo = list(sorted_difference(counted(), existing))
+    else:
+        existing_set = set(existing)
+        for name in candidates:
+            total += 1
+            if name not in existing_set:
+                todo.append(name)
+    stats = {
+        'mode': 'sorted_merge' if sorted_merge else 'in_memory',
+        'candidates': total,
+        'already_done': total - len(todo),
+        'todo': len(todo),
+        'seconds': round(time.perf_counter() - t0, 3),
+    }
+    return todo, stats
+
+
+def print_plan_summary(stats, noun='词条'):
+    """打印规划结果与节省的工作量。"""
+    total = stats['candidates']
+    saved_pct = stats['already_done'] / total * 100 if total else 0.0
+    print(f"任务规划（{stats['mode']}，耗时 {stats['seconds']}s）：候选 {total} 个{noun}，"
+          f"已入库 {stats['already_done']} 个，待爬取 {stats['todo']} 个，节省 {saved_pct:.1f}% 的抓取量")
@@ -0,0 +1,172 @@
+# -*- coding: utf-8 -*-
+"""把 MySQL 中的成语/词语及其关系导出为 neo4j-admin 离线导入用的 CSV：`export_neo4j_import.py`
+
+全量重建词汇图时，逐条（甚至按批）执行 Cypher 事务都太慢。`neo4j-admin database import full`
+直接从 CSV 构建存储文件，数百万条边也只需几分钟。本脚本用服务端游标（SSCursor）流式读取：
+
+ - hanyuguoxue_chengyu -> idiom_nodes.csv      （ID 空间 Idiom，ID 为 MySQL 主键）
+ - chengyu_relation    -> idiom_relations.csv  （:START_ID(Idiom) / :END_ID(Idiom) / :TYPE）
+ - hanyuguoxue_ciyu    -> word_nodes.csv       （ID 空间 Word）
+ - ciyu_relation       -> word_relations.csv
+
+成语与词语的主键各自从 1 开始，分属两个 ID 空间，互不冲突。关联关系产生的占位行（url 为 NULL）
+同样导出为节点（crawled=false），保证每条边的两端都存在。导出完成后打印可直接执行的导入命令。
+
+用法：
+    python export_neo4j_import.py
+"""
+import csv
+import importlib
+import os
+import time
+
+import pymysql
+
+EXPORT_SOURCES = ['chengyu', 'ciyu']  # 要导出的数据源
+EXPORT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'neo4j_import')
+IMPORT_DATABASE = 'neo4j'             # neo4j-admin 导入的目标数据库名
+FETCH_SIZE = 10000                    # 服务端游标每次拉取的行数
+# =======================================================================
+
+SOURCES = {
+    'chengyu': {
+        'mysql_module': 'chengyu.chengyu_mysql',
+        'label': 'Idiom',
+        'base_table': 'hanyuguoxue_chengyu',
+        'relation_table': 'chengyu_relation',
+        'name_column': 'chengyu',
+        'prop_columns': [('pinyin', 'string'), ('zhuyin', 'string'), ('emotion', 'string'),
+                         ('explanation', 'string'), ('translation', 'string')],
+        'node_file': 'idiom_nodes.csv',
+        'relation_file': 'idiom_relations.csv',
+    },
+    'ciyu': {
+        'mysql_module': 'ciyu.ciyu_mysql',
+        'label': 'Word',
+        'base_table': 'hanyuguoxue_ciyu',
+        'relation_table': 'ciyu_relation',
+        'name_column': 'word',
+        'prop_columns': [('pinyin', 'string'), ('zhuyin', 'string'), ('part_of_speech', 'string'),
+                         ('is_common', 'boolean'), ('definition', 'string')],
+        'node_file': 'word_nodes.csv',
+        'relation_file': 'word_relations.csv',
+    },
+}
+
+RELATION_TYPES = {'synonym': 'SYNONYM', 'antonym': 'ANTONYM'}
+
+
+def _stream(conn, sql, fetch_size=FETCH_SIZE):
+    """用服务端游标逐批返回行（tuple），内存占用与表大小无关。"""
+    cur = conn.cursor(pymysql.cursors.SSCursor)
+    try:
+        cur.execute(sql)
+        while True:
+            rows = cur.fetchmany(fetch_size)
+            if not rows:
+                return
+            yield from rows
+    finally:
+        cur.close()
+
+
+def _csv_value(value, kind):
+    if value is None:
+        return ''
+    if kind == 'boolean':
+        return 'true' if value else 'false'
+    return value
+
+
+def export_nodes(conn, cfg, path):
+    label = cfg['label']
+    cols = ', '.join(f'`{c}`' for c, _ in cfg['prop_columns'])
+    sql = (f"SELECT id, `{cfg['name_column']}`, url IS NOT NULL, {cols} "
+           f"FROM {cfg['base_table']} ORDER BY id")
+    header = ([f'mysql_id:ID({label})', 'name', 'crawled:boolean']
+              + [f'{c}:{kind}' if kind != 'string' else c for c, kind in cfg['prop_columns']])
+    kinds = [kind for _, kind in cfg['prop_columns']]
+    count = 0
+    with open(path, 'w', encoding='utf-8', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(header)
+        for row in _stream(conn, sql):
+            row_id, name, crawled = row[0], row[1], row[2]
+            if not name:
+                continue
+            props = [_csv_value(v, k) for v, k in zip(row[3:], kinds)]
+            writer.writerow([row_id, name, 'true' if crawled else 'false'] + props)
+            count += 1
+    return count
+
+
+def export_relations(conn, cfg, path):
+    label = cfg['label']
+    sql = f"SELECT min_id, max_id, relation_type FROM {cfg['relation_table']} ORDER BY id"
+    count = 0
+    with open(path, 'w', encoding='utf-8', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow([f':START_ID({label})', f':END_ID({label})', ':TYPE'])
+        for min_id, max_id, relation_type in _stream(conn, sql):
+            rel_type = RELATION_TYPES.get(relation_type)
+            if not rel_type:
+                continue
+            writer.writerow([min_id, max_id, rel_type])
+            count += 1
+    return count
+
+
+def export_source(source, out_dir=EXPORT_DIR):
+    """导出一个数据源的节点与关系 CSV，返回 (节点文件, 关系文件) 或 None。"""
+    cfg = SOURCES[source]
+    mod = importlib.import_module(cfg['mysql_module'])
+    conn = mod.get_database_connection()
+    if not conn:
+        print(f'无法连接到 {source} 数据库，跳过')
+        return None
+    node_path = os.path.join(out_dir, cfg['node_file'])
+    rel_path = os.path.join(out_dir, cfg['relation_file'])
+    try:
+        t0 = time.perf_counter()
+        nodes = export_nodes(conn, cfg, node_path)
+        t1 = time.perf_counter()
+        print(f'{cfg["label"]} 节点：{nodes} 行 -> {node_path}（{t1 - t0:.1f}s，{nodes / max(t1 - t0, 1e-9):.0f} rows/s）')
+        rels = export_relations(conn, cfg, rel_path)
+        t2 = time.perf_counter()
+        print(f'{cfg["label"]} 关系：{rels} 行 -> {rel_path}（{t2 - t1:.1f}s，{rels / max(t2 - t1, 1e-9):.0f} rows/s）')
+    finally:
+        conn.close()
+    return node_path, rel_path
+
+
+def build_import_command(exported, database=IMPORT_DATABASE):
+    """根据导出结果拼出 neo4j-admin 导入命令。"""
+    parts = [f'neo4j-admin database import full {database}']
+    for source, (node_path, rel_path) in exported.items():
+        label = SOURCES[source]['label']
+        parts.append(f'--nodes={label}={node_path}')
+        parts.append(f'--relationships={rel_path}')
+    # ID 均为 MySQL 整型主键；释义等字段可能包含换行
+    parts += ['--id-type=integer', '--multiline-fields=true', '--overwrite-destination=true']
+    return ' \\\n    '.join(parts)
+
+
+def main(sources=EXPORT_SOURCES, out_dir=EXPORT_DIR):
+    os.makedirs(out_dir, exist_ok=True)
+    exported = {}
+    for source in sources:
+        if source not in SOURCES:
+            print('未知的数据源:', source)
+            return 2
+        result = export_source(source, out_dir)
+        if result is None:
+            return 2
+        exported[source] = result
+    print('\n导出完成。停止 Neo4j 后执行以下命令离线重建图（会覆盖目标数据库）：\n')
+    print(build_import_command(exported))
+    print('\n导入后可运行 sync_to_neo4j.py（或手动执行 CREATE CONSTRAINT）为 name 建唯一约束。')
+    return 0
+
+
+if __name__ == '__main__':
+    exit(main())
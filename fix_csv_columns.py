@@ -1,12 +1,16 @@
 # -*- coding: utf-8 -*-
 """
 修复CSV文件列结构的脚本
-为batch_metrics.csv添加termination_reason列（如果不存在的话）
+为batch_metrics.csv添加termination_reason列（如果不存在的话），
+并为 chengyu / ciyu 的 batch_metrics.csv 补齐逐阶段耗时列（{stage}_seconds、{stage}_p50/p95/p99_ms，旧行留空）
 """
 import os
 import csv
 import shutil
 
+from common.metrics_csv import upgrade_metrics_csv
+from common.stage_timer import stage_columns
+
 
 def fix_csv_columns(csv_path, default_value='completed'):
     """
@@ -92,6 +96,14 @@ def main():
     # print(f"正在检查: {ciyu_csv}")
     # fix_csv_columns(ciyu_csv, default_value='completed')
     
+    # 逐阶段耗时列：新批次追加时也会自动补齐，这里提前迁移，便于旧文件直接按新表头分析
+    for target in ('chengyu', 'ciyu'):
+        csv_path = os.path.join(os.path.dirname(__file__), target, 'batch_metrics.csv')
+        if os.path.exists(csv_path):
+            added = upgrade_metrics_csv(csv_path, stage_columns())
+            if not added:
+                print(f"{csv_path} 已包含逐阶段耗时列")
+
     print("\n修复完成！现在可以正常使用断点续爬功能了。")
 
 
@@ -0,0 +1,196 @@
+# -*- coding: utf-8 -*-
+"""
+对比汉字两种存储布局的空间占用与查询延迟：
+
+ - blob：hanyuguoxue_hanzi（各板块整块 JSON）
+ - normalized：hanzi_character / hanzi_reading / hanzi_explanation（见 hanzi_normalized.py）
+
+步骤：
+ 1. （可选）backfill：用服务端游标流式读取 hanyuguoxue_hanzi，转换后写入规范化表，
+    不必重新爬取即可得到可对比的数据；
+ 2. 从 information_schema 读取两种布局的 data_length + index_length；
+ 3. 对若干拼音 / 部首 / 笔画取值，分别在两种布局上重复执行查询，输出 p50 / p95 毫秒。
+
+运行示例：
+    python bench_hanzi_layout.py
+"""
+import json
+import time
+
+import pymysql
+
+from hanyuguoxue import get_database_connection, mysql_config
+from hanzi_normalized import NORMALIZED_TABLES, write_normalized_rows
+
+BACKFILL = True            # 是否先从 blob 表回填规范化表
+BACKFILL_BATCH_SIZE = 500  # 回填时每批写入并提交的汉字数
+QUERY_REPEAT = 20          # 每个查询重复次数
+
+PINYIN_SAMPLES = ['wáng', 'zhōng', 'dà', 'yī']
+RADICAL_SAMPLES = ['王', '口', '木', '氵']
+STROKE_SAMPLES = [4, 8, 12]
+
+BLOB_QUERIES = {
+    'pinyin': (
+        "SELECT `character` FROM hanyuguoxue_hanzi "
+        "WHERE JSON_SEARCH(basic_info, 'one', %s, NULL, '$.data.pinyin_info[*].pinyin') IS NOT NULL"
+    ),
+    'radical': (
+        "SELECT `character` FROM hanyuguoxue_hanzi "
+        "WHERE JSON_UNQUOTE(JSON_EXTRACT(basic_info, '$.data.bushou_detail.text')) = %s"
+    ),
+    'strokes': (
+        "SELECT `character` FROM hanyuguoxue_hanzi "
+        "WHERE CAST(REGEXP_SUBSTR(JSON_UNQUOTE(JSON_EXTRACT(basic_info, '$.data.total_strokes.text')), '[0-9]+') "
+        "AS UNSIGNED) = %s"
+    ),
+}
+
+NORMALIZED_QUERIES = {
+    'pinyin': (
+        "SELECT DISTINCT c.`character` FROM hanzi_reading r "
+        "JOIN hanzi_character c ON c.id = r.character_id WHERE r.pinyin = %s"
+    ),
+    'radical': "SELECT `character` FROM hanzi_character WHERE radical = %s",
+    'strokes': "SELECT `character` FROM hanzi_character WHERE total_strokes = %s",
+}
+
+QUERY_SAMPLES = {
+    'pinyin': PINYIN_SAMPLES,
+    'radical': RADICAL_SAMPLES,
+    'strokes': STROKE_SAMPLES,
+}
+
+
+def _load_json(value, default):
+    if value is None:
+        return default
+    if isinstance(value, (dict, list)):
+        return value
+    try:
+        return json.loads(value)
+    except Exception:
+        return default
+
+
+def backfill_normalized(conn, batch_size=BACKFILL_BATCH_SIZE):
+    """把 hanyuguoxue_hanzi 中的数据转换写入规范化表，返回写入的汉字数。"""
+    read_conn = get_database_connection()
+    if not read_conn:
+        print('[WARN] 无法建立回填读取连接')
+        return 0
+    written = 0
+    try:
+        read_cur = read_conn.cursor(pymysql.cursors.SSDictCursor)
+        read_cur.execute(
+            "SELECT url, unicode_decimal, basic_info, gaishu_info, yisi_info, fanyi_info, "
+            "guoyu_info, liangan_info, evolution_data FROM hanyuguoxue_hanzi WHERE `error` IS NULL"
+        )
+        cur = conn.cursor()
+        while True:
+            rows = read_cur.fetchmany(batch_size)
+            if not rows:
+                break
+            batch = []
+            for r in rows:
+                batch.append({
+                    'url': r['url'],
+                    'unicode_decimal': r['unicode_decimal'],
+                    'basic_info': _load_json(r['basic_info'], {}),
+                    'gaishu_info': _load_json(r['gaishu_info'], {}),
+                    'yisi_info': _load_json(r['yisi_info'], {}),
+                    'fanyi_info': _load_json(r['fanyi_info'], {}),
+                    'guoyu_info': _load_json(r['guoyu_info'], {}),
+                    'liangan_info': _load_json(r['liangan_info'], {}),
+                    'evolution_data': _load_json(r['evolution_data'], []),
+                })
+            saved, _ = write_normalized_rows(cur, batch)
+            conn.commit()
+            written += len(saved)
+            print(f'  回填进度: {written} 字')
+    finally:
+        read_conn.close()
+    return written
+
+
+def table_sizes(conn, tables):
+    """返回 {table: (rows, data_bytes, index_bytes)}。"""
+    cur = conn.cursor()
+    placeholders = ','.join(['%s'] * len(tables))
+    cur.execute(
+        "SELECT TABLE_NAME, TABLE_ROWS, DATA_LENGTH, INDEX_LENGTH FROM information_schema.TABLES "
+        f"WHERE TABLE_SCHEMA=%s AND TABLE_NAME IN ({placeholders})",
+        [mysql_config['database']] + list(tables)
+    )
+    return {r['TABLE_NAME']: (r['TABLE_ROWS'] or 0, r['DATA_LENGTH'] or 0, r['INDEX_LENGTH'] or 0)
+            for r in cur.fetchall()}
+
+
+def time_query(conn, sql, params, repeat=QUERY_REPEAT):
+    """重复执行查询，返回 (行数, p50 毫秒, p95 毫秒)。"""
+    cur = conn.cursor()
+    samples = []
+    rows = 0
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        cur.execute(sql, params)
+        rows = len(cur.fetchall())
+        samples.append((time.perf_counter() - t0) * 1000)
+    samples.sort()
+    p50 = samples[len(samples) // 2]
+    p95 = samples[min(len(samples) - 1, int(len(samples) * 0.95))]
+    return rows, p50, p95
+
+
+def print_storage_report(conn):
+    sizes = table_sizes(conn, ['hanyuguoxue_hanzi'] + NORMALIZED_TABLES)
+    print('\n' + '=' * 60)
+    print('存储占用（information_schema，InnoDB 估算值）')
+    print('-' * 60)
+    print('表\t行数\t数据(MB)\t索引(MB)')
+    for t, (rows, data, index) in sizes.items():
+        print(f'{t}\t{rows}\t{data / 1024 / 1024:.2f}\t{index / 1024 / 1024:.2f}')
+    blob_total = sum(sizes.get('hanyuguoxue_hanzi', (0, 0, 0))[1:])
+    norm_total = sum(sum(sizes.get(t, (0, 0, 0))[1:]) for t in NORMALIZED_TABLES)
+    if blob_total:
+        print(f'blob 合计 {blob_total / 1024 / 1024:.2f} MB，normalized 合计 {norm_total / 1024 / 1024:.2f} MB '
+              f'（{norm_total / blob_total * 100:.1f}%）')
+
+
+def print_query_report(conn):
+    print('\n' + '=' * 60)
+    print(f'查询延迟（每个取值重复 {QUERY_REPEAT} 次，单位 ms）')
+    print('-' * 60)
+    print('查询\t取值\tblob 行数\tblob p50\tblob p95\tnorm 行数\tnorm p50\tnorm p95')
+    for kind, samples in QUERY_SAMPLES.items():
+        for value in samples:
+            b_rows, b_p50, b_p95 = time_query(conn, BLOB_QUERIES[kind], (value,))
+            n_rows, n_p50, n_p95 = time_query(conn, NORMALIZED_QUERIES[kind], (value,))
+            print(f'{kind}\t{value}\t{b_rows}\t{b_p50:.2f}\t{b_p95:.2f}\t{n_rows}\t{n_p50:.2f}\t{n_p95:.2f}')
+
+
+def main():
+    conn = get_database_connection()
+    if not conn:
+        print('无法建立数据库连接')
+        return 2
+    try:
+        if BACKFILL:
+            print('开始从 hanyuguoxue_hanzi 回填规范化表...')
+            t0 = time.perf_counter()
+            n = backfill_normalized(conn)
+            print(f'回填完成：{n} 字，耗时 {time.perf_counter() - t0:.1f}s')
+            # 让 information_schema 的统计信息反映最新数据
+            cur = conn.cursor()
+            for t in ['hanyuguoxue_hanzi'] + NORMALIZED_TABLES:
+                cur.execute(f'ANALYZE TABLE {t}')
+                cur.fetchall()
+        print_storage_report(conn)
+        print_query_report(conn)
+    finally:
+        conn.close()
+    return 0
+
+
+if __name__ == '__main__':
+    exit(main())
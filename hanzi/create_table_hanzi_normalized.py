@@ -0,0 +1,81 @@
+# -*- coding: utf-8 -*-
+"""
+创建汉字规范化布局的三张表：hanzi_character、hanzi_reading、hanzi_explanation。
+
+表结构定义见 hanzi_normalized.py。DDL 在 MySQL 中会自动提交，若中途失败，
+脚本会尝试删除本次已创建的表以清理半成品。
+表已存在时，把带声调拼音列迁移为 utf8mb4_bin（旧表中被吞掉的多音字读音需重新回填）。
+运行示例：
+  python create_table_hanzi_normalized.py
+"""
+import traceback
+
+from hanyuguoxue import get_database_connection
+from hanzi_normalized import BINARY_COLLATION_COLUMNS, CREATE_NORMALIZED_SQL, NORMALIZED_TABLES
+
+
+def ensure_binary_collation(cur):
+    """把 BINARY_COLLATION_COLUMNS 中排序规则不是 utf8mb4_bin 的列迁移过来，返回迁移的 '表.列' 列表。"""
+    migrated = []
+    for table, column, ddl in BINARY_COLLATION_COLUMNS:
+        cur.execute(
+            "SELECT COLLATION_NAME FROM information_schema.COLUMNS "
+            "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s AND COLUMN_NAME = %s",
+            (table, column)
+        )
+        row = cur.fetchone()
+        if row and row["COLLATION_NAME"] != "utf8mb4_bin":
+            cur.execute(ddl)
+            migrated.append(f"{table}.{column}")
+    return migrated
+
+
+def create_tables():
+    conn = get_database_connection()
+    if not conn:
+        print("无法获得数据库连接，跳过建表")
+        return False
+
+    cur = None
+    created = 0
+    try:
+        cur = conn.cursor()
+        for sql in CREATE_NORMALIZED_SQL:
+            cur.execute(sql)
+            created += 1
+        conn.commit()
+        print("规范化表 hanzi_character / hanzi_reading / hanzi_explanation 已创建或已存在")
+        migrated = ensure_binary_collation(cur)
+        if migrated:
+            conn.commit()
+            print("已将拼音列迁移为 utf8mb4_bin:", ", ".join(migrated))
+            print("旧表中被合并的多音字读音不会自动恢复，请重新回填（python hanzi/bench_hanzi_layout.py）或重爬")
+        return True
+    except Exception:
+        print("建表过程中发生错误:")
+        traceback.print_exc()
+        try:
+            if created and cur:
+                # NORMALIZED_TABLES 为子表在前的删除顺序
+                for t in NORMALIZED_TABLES:
+                    cur.execute(f"DROP TABLE IF EXISTS {t}")
+                conn.commit()
+                print("已删除已创建的规范化表")
+        except Exception:
+            print("清理规范化表失败：")
+            traceback.print_exc()
+        return False
+    finally:
+        try:
+            conn.close()
+        except Exception:
+            pass
+
+
+if __name__ == '__main__':
+    print("🔧 尝试创建汉字规范化表...")
+    ok = create_tables()
+    if ok:
+        print("🎉 表创建成功（或已存在）。")
+    else:
+        print("❌ 建表失败，已尝试清理。检查日志并修正后重试。")
@@ -1,10 +1,21 @@
+import os
 import re
+import sys
 import json
-import requests
 import time  # 延时防封
-import pymysql
 from bs4 import BeautifulSoup
 
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from common import fast_json
+from common.batch_writer import BatchWriter
+from common.crawl_metrics import CrawlMetrics
+from common.batch_profiler import start_batch_profiler
+from common.memory_tracker import MemoryTracker
+from common.dashboard import start_dashboard
+from common.sampled_log import SampledLogger
+from common.storage import open_storage
+from hanzi_normalized import SQLITE_NORMALIZED_SQL, write_normalized_rows
+
 # 数据库配置
 mysql_config = {
     "host": "8.153.207.172",
@@ -14,6 +25,47 @@ mysql_config = {
     "port": 3307
 }
 
+# 站点根地址（本地压测时改为 bench/mock_hanyuguoxue.py 的地址）
+HANZI_BASE_URL = "https://www.hanyuguoxue.com"
+
+# 存储后端：'mysql' 写入 mysql_config 指向的库；'sqlite' 写入本地文件库（离线运行与本地压测用，见 common/storage.py）
+HANZI_STORAGE_BACKEND = 'mysql'
+HANZI_SQLITE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'hanzi_local.db')
+
+# 批量写库配置（后台写线程按条数或时间刷新，一次多行 upsert + 一次 commit）
+HANZI_DB_BATCH_SIZE = 100
+HANZI_DB_FLUSH_INTERVAL = 3.0
+
+# 存储布局：'blob' 仅写 hanyuguoxue_hanzi 的 JSON 大字段；'normalized' 仅写规范化表
+# （hanzi_character / hanzi_reading / hanzi_explanation，见 hanzi_normalized.py）；'both' 同时写两套
+HANZI_STORAGE_LAYOUT = 'blob'
+
+# 设为端口号（如 9110）时在 127.0.0.1 上提供 Prometheus 格式的 /metrics 端点（见 common/crawl_metrics.py）
+HANZI_METRICS_PORT = None
+
+# 性能剖析：None 不剖析；'sample' 统计采样（低开销，含写线程）；'cprofile' 确定性剖析抓取线程（见 common/batch_profiler.py）。
+# 每 HANZI_PROFILE_BATCH 个码位为一批（内存统计同样按此分批），在 HANZI_PROFILE_DIR 写 batch_{码位 // HANZI_PROFILE_BATCH}.prof 与 .collapsed
+HANZI_PROFILE_MODE = None
+HANZI_PROFILE_BATCH = 1000
+HANZI_PROFILE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# 内存统计：每 HANZI_PROFILE_BATCH 个码位打印一次 RSS / 峰值 RSS（见 common/memory_tracker.py）；
+# True 时另用 tracemalloc 统计 Python 分配，并在 HANZI_PROFILE_DIR 写 batch_{码位 // HANZI_PROFILE_BATCH}_memory.txt
+HANZI_MEMORY_PROFILE = False
+HANZI_MEMORY_ALARM_BATCHES = 3  # 常驻内存连续增长多少批后检查泄漏
+HANZI_MEMORY_ALARM_MB = 50.0  # 上述批次内累计增长超过该值（MB）时告警（内存模式 save_to_database=False 会持续增长）
+
+# 终端实时仪表盘：进度与剩余时间、速率、成功/失败/缺失、退避状态与写库队列（见 common/dashboard.py）；输出不是终端时改为定期一行汇总
+HANZI_DASHBOARD = True
+HANZI_DASHBOARD_REFRESH = 0.5
+
+# 逐字日志按事件（saved / queued / memory / fail / missing）抽样输出为 JSON 行：前 HANZI_LOG_FIRST 条与之后每 HANZI_LOG_EVERY 条
+HANZI_LOG_FIRST = 10
+HANZI_LOG_EVERY = 50
+
+METRICS = CrawlMetrics('hanzi')
+CRAWL_LOG = SampledLogger('hanzi', first=HANZI_LOG_FIRST, every=HANZI_LOG_EVERY)
+
 
 def extract_character_from_url(url):
     """从URL提取Unicode decimal"""
@@ -29,7 +81,7 @@ def extract_basic_info_from_url(url):
     # 获取HTML，加headers和延时
     headers = {
         'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'}
-    response = requests.get(url, headers=headers)
+    response = METRICS.get(url, headers=headers)
     response.raise_for_status()
     html_content = response.text
     # time.sleep(1)  # 延时1s
@@ -185,7 +237,7 @@ def extract_evolution_data(url):
     # 获取HTML，加headers和延时
     headers = {
         'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'}
-    response = requests.get(url, headers=headers)
+    response = METRICS.get(url, headers=headers)
     response.raise_for_status()
     html_content = response.text
     # time.sleep(1)  # 延时1s
@@ -259,7 +311,7 @@ def extract_gaishu_from_url(url):
     # 获取HTML，加headers和延时
     headers = {
         'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'}
-    response = requests.get(url, headers=headers)
+    response = METRICS.get(url, headers=headers)
     response.raise_for_status()
     html_content = response.text
     # time.sleep(1)  # 延时1s
@@ -321,7 +373,7 @@ def extract_yisi_from_url(url):
     # 获取HTML，加headers和延时
     headers = {
         'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'}
-    response = requests.get(url, headers=headers)
+    response = METRICS.get(url, headers=headers)
     response.raise_for_status()
     html_content = response.text
     # time.sleep(1)  # 延时1s
@@ -519,7 +571,7 @@ def extract_fanyi_from_url(url):
     # 获取HTML，加headers和延时
     headers = {
         'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'}
-    response = requests.get(url, headers=headers)
+    response = METRICS.get(url, headers=headers)
     response.raise_for_status()
     html_content = response.text
     # time.sleep(1)  # 延时1s
@@ -612,7 +664,7 @@ def extract_guoyu_from_url(url):
     # 获取HTML，加headers和延时
     headers = {
         'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'}
-    response = requests.get(url, headers=headers)
+    response = METRICS.get(url, headers=headers)
     response.raise_for_status()
     html_content = response.text
     # time.sleep(1)  # 延时1s
@@ -822,7 +874,7 @@ def extract_liangan_from_url(url):
     # 获取HTML，加headers和延时
     headers = {
         'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'}
-    response = requests.get(url, headers=headers)
+    response = METRICS.get(url, headers=headers)
     response.raise_for_status()
     html_content = response.text
     # time.sleep(1)  # 延时1s
@@ -1121,7 +1173,27 @@ def extract_all_character_data(url):
         }
 
 
-def crawl_all_hanzi(start_unicode=0x4E00, end_unicode=0x9FFF, save_to_database=True):
+def _log_fields(character_data, unicode_decimal):
+    """抽样日志中一个字的摘要：拼音、部首、笔画、结构、造字法与字源字形数。"""
+    basic_data = character_data['basic_info']['data']
+    evolution = character_data.get('evolution_data', [])
+    fields = {
+        'character': basic_data.get('character'),
+        'unicode': unicode_decimal,
+        'pinyin': [p['pinyin'] for p in basic_data.get('pinyin_info', [])],
+        'bushou': basic_data.get('bushou_detail', {}).get('text'),
+        'strokes': basic_data.get('total_strokes', {}).get('text'),
+        'structure': basic_data.get('structure'),
+        'formation': basic_data.get('formation_method'),
+        'evolution_count': len(evolution),
+    }
+    if evolution:
+        fields['first_evolution'] = {'alt': evolution[0].get('alt'), 'image_url': evolution[0].get('image_url')}
+    return fields
+
+
+def crawl_all_hanzi(start_unicode=0x4E00, end_unicode=0x9FFF, save_to_database=True, use_batch_writer=True,
+                    storage_layout=None):
     """
     遍历所有Unicode汉字并爬取基本信息和字源字形数据保存到数据库
     主要覆盖基本汉字区：0x4E00-0x9FFF
@@ -1130,108 +1202,123 @@ def crawl_all_hanzi(start_unicode=0x4E00, end_unicode=0x9FFF, save_to_database=T
         start_unicode: 起始Unicode编码
         end_unicode: 结束Unicode编码
         save_to_database: 是否保存到数据库（默认为True）
+        use_batch_writer: 是否使用后台批量写入（默认为True，False 时逐条同步写库）
+        storage_layout: 存储布局 'blob' / 'normalized' / 'both'（默认取 HANZI_STORAGE_LAYOUT）
     """
-    base_url = "https://www.hanyuguoxue.com/zidian/zi-"
+    storage_layout = storage_layout or HANZI_STORAGE_LAYOUT
+    base_url = f"{HANZI_BASE_URL}/zidian/zi-"
     total_characters = 0
     successful_crawls = 0
     failed_crawls = 0
     all_character_data = []
 
+    METRICS.serve(HANZI_METRICS_PORT)
+
+    def _save_batch(items):
+        with METRICS.stage('db_write'):
+            return save_characters_to_db(items, layout=storage_layout)
+
+    writer = None
+    if save_to_database and use_batch_writer:
+        writer = BatchWriter(_save_batch, batch_size=HANZI_DB_BATCH_SIZE,
+                             flush_interval=HANZI_DB_FLUSH_INTERVAL, name='hanzi-writer').start()
+    METRICS.track_writer(writer, remaining_fn=lambda: end_unicode - start_unicode + 1 - successful_crawls - failed_crawls)
+    METRICS.set_progress(end_unicode - start_unicode + 1)
+
     print(f"开始爬取Unicode汉字范围：{start_unicode:#x} - {end_unicode:#x}")
     print(f"预计总汉字数：{end_unicode - start_unicode + 1}")
-    print(f"保存方式: {'数据库' if save_to_database else '内存'}")
+    print(f"保存方式: {'数据库（布局: ' + storage_layout + '）' if save_to_database else '内存'}")
     print("同时爬取：基本信息 + 概述信息 + 意思信息 + 字源字形数据 + 翻译 + 国语辞典 + 两岸词典")
     print("=" * 60)
 
-    for unicode_decimal in range(start_unicode, end_unicode + 1):
-        try:
-            # 构建URL
-            url = f"{base_url}{unicode_decimal}"
+    memory = MemoryTracker(alarm_batches=HANZI_MEMORY_ALARM_BATCHES, alarm_mb=HANZI_MEMORY_ALARM_MB)
 
-            # 爬取完整数据（基本信息 + 概述 + 意思 + 字源字形 + 翻译等）
-            character_data = extract_all_character_data(url)
+    def _start_profiler(code_point):
+        METRICS.batch_label = f'码位 {code_point:#x} 起'
+        memory.begin_batch(trace=HANZI_MEMORY_PROFILE)
+        return start_batch_profiler(HANZI_PROFILE_MODE, HANZI_PROFILE_DIR,
+                                    f'batch_{code_point // HANZI_PROFILE_BATCH}')
 
-            # 检查是否成功获取到数据
-            if ('basic_info' in character_data and 'data' in character_data['basic_info'] and
-                'character' in character_data['basic_info']['data']):
+    def _end_profile_batch(code_point):
+        name = f'batch_{code_point // HANZI_PROFILE_BATCH}'
+        m = memory.end_batch(name, report_path=os.path.join(HANZI_PROFILE_DIR, f'{name}_memory.txt'))
+        traced = f", traced {m['traced_mb']} MB (峰值 {m['traced_peak_mb']} MB)" if m['traced_mb'] != '' else ''
+        print(f"内存 {name}: RSS {m['rss_mb']} MB, 峰值 {m['peak_rss_mb']} MB{traced}, "
+              f"较上批 {m['retained_growth_mb'] or 0:+} MB")
 
-                total_characters += 1
-                successful_crawls += 1
+    profiler = _start_profiler(start_unicode)
+    batch_start = start_unicode
+    dashboard = start_dashboard(METRICS, enabled=HANZI_DASHBOARD, refresh=HANZI_DASHBOARD_REFRESH)
+    try:
+        for unicode_decimal in range(start_unicode, end_unicode + 1):
+            if unicode_decimal > start_unicode and unicode_decimal % HANZI_PROFILE_BATCH == 0:
+                profiler.stop()
+                _end_profile_batch(batch_start)
+                batch_start = unicode_decimal
+                profiler = _start_profiler(unicode_decimal)
+            try:
+                # 构建URL
+                url = f"{base_url}{unicode_decimal}"
+
+                # 爬取完整数据（基本信息 + 概述 + 意思 + 字源字形 + 翻译等）；HTTP 耗时计入 detail，其余计入 parse
+                character_data = METRICS.timed('detail', extract_all_character_data, url)
 
-                basic_data = character_data['basic_info']['data']
-                character = basic_data['character']
+                # 检查是否成功获取到数据
+                if ('basic_info' in character_data and 'data' in character_data['basic_info'] and
+                    'character' in character_data['basic_info']['data']):
 
-                # 保存到数据库
-                if save_to_database:
-                    if save_character_to_db(character_data):
-                        # 显示爬取进度
-                        if successful_crawls % 50 == 1 or successful_crawls <= 10:
-                            print(f"【{successful_crawls:4d}】成功保存到数据库：{character} (Unicode: {unicode_decimal})")
-
-                            # 显示基本信息
-                            print(f"  拼音: {', '.join([p['pinyin'] for p in basic_data.get('pinyin_info', [])])}")
-                            print(f"  部首: {basic_data.get('bushou_detail', {}).get('text', 'N/A')}")
-                            print(f"  笔画: {basic_data.get('total_strokes', {}).get('text', 'N/A')}")
-                            print(f"  结构: {basic_data.get('structure', 'N/A')}")
-                            print(f"  造字法: {basic_data.get('formation_method', 'N/A')}")
-
-                            # 显示字源字形统计
-                            evolution_count = len(character_data.get('evolution_data', []))
-                            print(f"  字源字形数量: {evolution_count}条")
-
-                            if evolution_count > 0:
-                                # 显示第一个字源字形作为示例
-                                first_evolution = character_data['evolution_data'][0]
-                                print(f"  首个字形: {first_evolution.get('alt', 'N/A')}")
-                                print(f"  图片: {first_evolution.get('image_url', 'N/A')}")
-
-                            print("-" * 40)
+                    total_characters += 1
+                    successful_crawls += 1
+                    METRICS.entry('success')
+
+                    # 保存到数据库
+                    if save_to_database:
+                        if writer is not None:
+                            # 入队后由写线程批量写库；写入失败数在结束时从成功数移入失败数
+                            writer.put(character_data)
+                            saved = True
+                        else:
+                            saved = save_character_to_db(character_data, layout=storage_layout)
+                        if saved:
+                            CRAWL_LOG.log('queued' if writer is not None else 'saved',
+                                          lambda: _log_fields(character_data, unicode_decimal))
+                        else:
+                            successful_crawls -= 1
+                            failed_crawls += 1
                     else:
-                        failed_crawls += 1
-                else:
-                    # 保存到内存列表（原有逻辑）
-                    all_character_data.append(character_data)
-
-                    # 显示爬取进度
-                    if successful_crawls % 10 == 1 or successful_crawls <= 10:
-                        print(f"【{successful_crawls:4d}】汉字：{character} (Unicode: {unicode_decimal})")
-
-                        # 显示基本信息
-                        print(f"  拼音: {', '.join([p['pinyin'] for p in basic_data.get('pinyin_info', [])])}")
-                        print(f"  部首: {basic_data.get('bushou_detail', {}).get('text', 'N/A')}")
-                        print(f"  笔画: {basic_data.get('total_strokes', {}).get('text', 'N/A')}")
-                        print(f"  结构: {basic_data.get('structure', 'N/A')}")
-                        print(f"  造字法: {basic_data.get('formation_method', 'N/A')}")
-
-                        # 显示字源字形统计
-                        evolution_count = len(character_data.get('evolution_data', []))
-                        print(f"  字源字形数量: {evolution_count}条")
+                        # 保存到内存列表（原有逻辑）
+                        all_character_data.append(character_data)
+                        CRAWL_LOG.log('memory', lambda: _log_fields(character_data, unicode_decimal))
 
-                        if evolution_count > 0:
-                            # 显示第一个字源字形作为示例
-                            first_evolution = character_data['evolution_data'][0]
-                            print(f"  首个字形: {first_evolution.get('alt', 'N/A')}")
-                            print(f"  图片: {first_evolution.get('image_url', 'N/A')}")
-
-                        print("-" * 40)
-
-            else:
+                else:
+                    failed_crawls += 1
+                    # 抓取异常记为 fail，页面没有该字的基本信息（未收录的码位）记为 missing
+                    result = 'fail' if 'error' in character_data else 'missing'
+                    METRICS.entry(result)
+                    CRAWL_LOG.log(result, unicode=unicode_decimal, error=character_data.get('error'),
+                                  failed=failed_crawls)
+
+            except Exception as e:
                 failed_crawls += 1
-                # 每100个失败显示一次进度
-                if failed_crawls % 100 == 1:
-                    print(f"  当前进度: Unicode {unicode_decimal}, 失败数: {failed_crawls}")
+                METRICS.entry('fail')
+                CRAWL_LOG.log('fail', unicode=unicode_decimal, error=str(e), failed=failed_crawls)
+                continue
+
+            # 每处理1000个汉字显示一次进度
+            if (unicode_decimal - start_unicode + 1) % 1000 == 0:
+                progress = (unicode_decimal - start_unicode + 1) / (end_unicode - start_unicode + 1) * 100
+                print(f"进度: {progress:.1f}% (成功: {successful_crawls}, 失败: {failed_crawls})")
+    finally:
+        dashboard.stop()
 
-        except Exception as e:
-            failed_crawls += 1
-            # 静默处理错误，避免过多输出
-            if failed_crawls % 100 == 1:
-                print(f"遇到错误，当前失败数：{failed_crawls}")
-            continue
-
-        # 每处理1000个汉字显示一次进度
-        if (unicode_decimal - start_unicode + 1) % 1000 == 0:
-            progress = (unicode_decimal - start_unicode + 1) / (end_unicode - start_unicode + 1) * 100
-            print(f"进度: {progress:.1f}% (成功: {successful_crawls}, 失败: {failed_crawls})")
+    if writer is not None:
+        writer.stop()
+        writer_stats = writer.stats()
+        # 入队时已计入成功，写库失败的条目改记为失败
+        successful_crawls -= writer_stats['fail']
+        failed_crawls += writer_stats['fail']
+    profiler.stop()
+    _end_profile_batch(batch_start)
 
     print("=" * 60)
     print(f"爬取完成！")
@@ -1243,6 +1330,10 @@ def crawl_all_hanzi(start_unicode=0x4E00, end_unicode=0x9FFF, save_to_database=T
 
     if save_to_database:
         print(f"数据已保存到数据库: lab_education.hanyuguoxue_hanzi")
+        if writer is not None:
+            print(f"写库吞吐: {writer_stats['rows_per_sec']} rows/s, {writer_stats['mb_per_sec']} MB/s "
+                  f"(共 {writer_stats['rows']} 行 / {writer_stats['batches']} 批, "
+                  f"写库耗时 {writer_stats['write_seconds']}s, JSON 编码器: {fast_json.JSON_ENCODER})")
     else:
         # 保存到文件（原有逻辑）
         if all_character_data:
@@ -1352,30 +1443,123 @@ def test_small_range_crawl():
 
 # ================= 数据库相关函数 =================
 
+# SQLite 后端的建表语句（blob 布局主表 + 规范化布局各表）
+SQLITE_SCHEMA = [
+    """
+    CREATE TABLE IF NOT EXISTS hanyuguoxue_hanzi (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        `character` TEXT NOT NULL UNIQUE,
+        url TEXT,
+        unicode_decimal INTEGER,
+        basic_info TEXT,
+        gaishu_info TEXT,
+        yisi_info TEXT,
+        fanyi_info TEXT,
+        guoyu_info TEXT,
+        liangan_info TEXT,
+        evolution_data TEXT,
+        `error` TEXT,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    );
+    """,
+] + SQLITE_NORMALIZED_SQL
+SQLITE_CONFLICT_KEYS = {"hanyuguoxue_hanzi": "`character`", "hanzi_character": "`character`"}
+
+_storage = None
+_storage_key = None
+
+
+def get_storage():
+    """按 HANZI_STORAGE_BACKEND / HANZI_SQLITE_PATH 返回存储后端（两者修改后自动重建）。"""
+    global _storage, _storage_key
+    key = (HANZI_STORAGE_BACKEND, HANZI_SQLITE_PATH)
+    if _storage is None or _storage_key != key:
+        _storage = open_storage(HANZI_STORAGE_BACKEND, mysql_config=mysql_config, sqlite_path=HANZI_SQLITE_PATH,
+                                sqlite_schema=SQLITE_SCHEMA, conflict_keys=SQLITE_CONFLICT_KEYS)
+        _storage_key = key
+    return _storage
+
+
 def get_database_connection():
     """
     获取数据库连接
     """
     try:
-        connection = pymysql.connect(
-            host=mysql_config["host"],
-            user=mysql_config["user"],
-            password=mysql_config["password"],
-            database=mysql_config["database"],
-            port=mysql_config["port"],
-            charset="utf8mb4",
-            cursorclass=pymysql.cursors.DictCursor
-        )
-        return connection
+        return get_storage().connect()
     except Exception as e:
         print(f"数据库连接失败: {e}")
         return None
 
 
-def save_character_to_db(character_data):
+HANZI_ERROR_UPSERT_SQL = """
+INSERT INTO hanyuguoxue_hanzi
+(`character`, url, unicode_decimal, `error`)
+VALUES (%s, %s, %s, %s)
+ON DUPLICATE KEY UPDATE
+url = VALUES(url),
+unicode_decimal = VALUES(unicode_decimal),
+`error` = VALUES(`error`),
+updated_at = CURRENT_TIMESTAMP
+"""
+
+HANZI_UPSERT_SQL = """
+INSERT INTO hanyuguoxue_hanzi
+(`character`, url, unicode_decimal, basic_info, gaishu_info, yisi_info,
+ fanyi_info, guoyu_info, liangan_info, evolution_data)
+VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+ON DUPLICATE KEY UPDATE
+url = VALUES(url),
+unicode_decimal = VALUES(unicode_decimal),
+basic_info = VALUES(basic_info),
+gaishu_info = VALUES(gaishu_info),
+yisi_info = VALUES(yisi_info),
+fanyi_info = VALUES(fanyi_info),
+guoyu_info = VALUES(guoyu_info),
+liangan_info = VALUES(liangan_info),
+evolution_data = VALUES(evolution_data),
+updated_at = CURRENT_TIMESTAMP
+"""
+
+
+def _character_row(character_data):
+    """把 extract_all_character_data 的结果转换为 (是否错误记录, SQL 参数元组)。"""
+    character = ""
+    if 'basic_info' in character_data and 'data' in character_data['basic_info']:
+        character = character_data['basic_info']['data'].get('character', '')
+
+    if 'error' in character_data:
+        return True, (
+            character,
+            character_data.get('url', ''),
+            character_data.get('unicode_decimal', ''),
+            character_data['error']
+        )
+
+    return False, (
+        character,
+        character_data.get('url', ''),
+        character_data.get('unicode_decimal', ''),
+        fast_json.dumps(character_data.get('basic_info', {})),
+        fast_json.dumps(character_data.get('gaishu_info', {})),
+        fast_json.dumps(character_data.get('yisi_info', {})),
+        fast_json.dumps(character_data.get('fanyi_info', {})),
+        fast_json.dumps(character_data.get('guoyu_info', {})),
+        fast_json.dumps(character_data.get('liangan_info', {})),
+        fast_json.dumps(character_data.get('evolution_data', []))
+    )
+
+
+def _row_bytes(params):
+    """估算一行参数发送到数据库的字节数（用于 MB/s 统计）。"""
+    return sum(len(v.encode('utf-8')) if isinstance(v, str) else 8 for v in params)
+
+
+def save_character_to_db(character_data, layout=None):
     """
-    将汉字数据保存到数据库
+    将汉字数据保存到数据库（layout 取值见 HANZI_STORAGE_LAYOUT）
     """
+    layout = layout or HANZI_STORAGE_LAYOUT
     connection = get_database_connection()
     if not connection:
         return False
@@ -1383,60 +1567,12 @@ def save_character_to_db(character_data):
     try:
         cursor = connection.cursor()
 
-        # 提取汉字字符
-        character = ""
-        if 'basic_info' in character_data and 'data' in character_data['basic_info']:
-            character = character_data['basic_info']['data'].get('character', '')
-
-        # 如果有错误信息，保存错误记录
-        if 'error' in character_data:
-            sql = """
-            INSERT INTO hanyuguoxue_hanzi
-            (`character`, url, unicode_decimal, `error`)
-            VALUES (%s, %s, %s, %s)
-            ON DUPLICATE KEY UPDATE
-            url = VALUES(url),
-            unicode_decimal = VALUES(unicode_decimal),
-            `error` = VALUES(`error`),
-            updated_at = CURRENT_TIMESTAMP
-            """
-            cursor.execute(sql, (
-                character,
-                character_data.get('url', ''),
-                character_data.get('unicode_decimal', ''),
-                character_data['error']
-            ))
-        else:
-            # 保存完整数据
-            sql = """
-            INSERT INTO hanyuguoxue_hanzi
-            (`character`, url, unicode_decimal, basic_info, gaishu_info, yisi_info,
-             fanyi_info, guoyu_info, liangan_info, evolution_data)
-            VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-            ON DUPLICATE KEY UPDATE
-            url = VALUES(url),
-            unicode_decimal = VALUES(unicode_decimal),
-            basic_info = VALUES(basic_info),
-            gaishu_info = VALUES(gaishu_info),
-            yisi_info = VALUES(yisi_info),
-            fanyi_info = VALUES(fanyi_info),
-            guoyu_info = VALUES(guoyu_info),
-            liangan_info = VALUES(liangan_info),
-            evolution_data = VALUES(evolution_data),
-            updated_at = CURRENT_TIMESTAMP
-            """
-            cursor.execute(sql, (
-                character,
-                character_data.get('url', ''),
-                character_data.get('unicode_decimal', ''),
-                json.dumps(character_data.get('basic_info', {}), ensure_ascii=False),
-                json.dumps(character_data.get('gaishu_info', {}), ensure_ascii=False),
-                json.dumps(character_data.get('yisi_info', {}), ensure_ascii=False),
-                json.dumps(character_data.get('fanyi_info', {}), ensure_ascii=False),
-                json.dumps(character_data.get('guoyu_info', {}), ensure_ascii=False),
-                json.dumps(character_data.get('liangan_info', {}), ensure_ascii=False),
-                json.dumps(character_data.get('evolution_data', []), ensure_ascii=False)
-            ))
+        if layout in ('blob', 'both'):
+            # 如果有错误信息，保存错误记录；否则保存完整数据
+            is_error, params = _character_row(character_data)
+            cursor.execute(HANZI_ERROR_UPSERT_SQL if is_error else HANZI_UPSERT_SQL, params)
+        if layout in ('normalized', 'both'):
+            write_normalized_rows(cursor, [character_data])
 
         connection.commit()
         return True
@@ -1449,13 +1585,67 @@ def save_character_to_db(character_data):
         connection.close()
 
 
+def save_characters_to_db(batch, layout=None):
+    """
+    批量保存汉字数据：一个连接、多行 upsert、整批一次 commit。
+
+    pymysql 的 executemany 会把 `INSERT ... VALUES (...) ON DUPLICATE KEY UPDATE ...`
+    改写成单条多行 INSERT 发送。整批失败时回滚并逐条重试，以便定位坏数据。
+
+    返回 `(saved_items, failed, nbytes)`，供 BatchWriter 统计。
+    """
+    layout = layout or HANZI_STORAGE_LAYOUT
+    full_rows, error_rows = [], []
+    nbytes = 0
+    if layout in ('blob', 'both'):
+        for item in batch:
+            is_error, params = _character_row(item)
+            nbytes += _row_bytes(params)
+            if is_error:
+                error_rows.append(params)
+            else:
+                full_rows.append(params)
+
+    connection = get_database_connection()
+    if not connection:
+        return [], [(it, '无法建立数据库连接') for it in batch], 0
+
+    try:
+        cursor = connection.cursor()
+        if full_rows:
+            cursor.executemany(HANZI_UPSERT_SQL, full_rows)
+        if error_rows:
+            cursor.executemany(HANZI_ERROR_UPSERT_SQL, error_rows)
+        if layout in ('normalized', 'both'):
+            _, normalized_bytes = write_normalized_rows(cursor, batch)
+            nbytes += normalized_bytes
+        connection.commit()
+        return list(batch), [], nbytes
+    except Exception as e:
+        print(f"批量保存 {len(batch)} 条汉字失败，改为逐条写入: {e}")
+        try:
+            connection.rollback()
+        except Exception:
+            pass
+    finally:
+        connection.close()
+
+    saved, failed = [], []
+    for item in batch:
+        if save_character_to_db(item, layout=layout):
+            saved.append(item)
+        else:
+            failed.append((item, '保存数据到数据库失败'))
+    return saved, failed, nbytes
+
+
 
 def crawl_all_hanzi_to_db(start_unicode=0x4E00, end_unicode=0x9FFF):
     """
     遍历所有Unicode汉字并爬取数据保存到数据库
     主要覆盖基本汉字区：0x4E00-0x9FFF
     """
-    base_url = "https://www.hanyuguoxue.com/zidian/zi-"
+    base_url = f"{HANZI_BASE_URL}/zidian/zi-"
 
     total_characters = 0
     successful_crawls = 0
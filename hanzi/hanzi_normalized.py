@@ -0,0 +1,341 @@
+# -*- coding: utf-8 -*-
+"""
+汉字数据的规范化存储布局（可选）。
+
+`hanyuguoxue_hanzi` 把各板块整块存成 JSON，重复携带 "yisiTitle" 等包装键，也没有可建索引的字段，
+按拼音/部首/笔画查询只能全表扫描 + JSON 解析。这里把同一份 extract_all_character_data 的结果拆成：
+
+ - hanzi_character：一字一行，部首、总笔画、结构等可索引字段 + 其余板块压缩后的 extra_z
+ - hanzi_reading：读音（基本信息/意思/国语辞典/两岸词典），拼音与去声调拼音均建索引
+ - hanzi_explanation：释义条目，每条一行，正文 zlib 压缩存储
+
+本模块只负责建表 SQL、数据转换与写入，不建立数据库连接（连接由调用方传入）。
+"""
+import json
+import re
+import unicodedata
+import zlib
+
+from common import fast_json
+
+# zlib 压缩等级（1 最快，9 最小）
+COMPRESS_LEVEL = 6
+
+NORMALIZED_TABLES = ['hanzi_explanation', 'hanzi_reading', 'hanzi_character']
+
+CREATE_CHARACTER_SQL = """
+CREATE TABLE IF NOT EXISTS hanzi_character (
+    id INT AUTO_INCREMENT PRIMARY KEY,
+    `character` VARCHAR(8) NOT NULL COMMENT '汉字',
+    unicode_decimal INT NOT NULL COMMENT 'Unicode 十进制编码',
+    url VARCHAR(255) COMMENT '详情页面URL',
+    radical VARCHAR(8) COMMENT '部首',
+    total_strokes SMALLINT COMMENT '总笔画',
+    structure VARCHAR(20) COMMENT '结构',
+    formation_method VARCHAR(50) COMMENT '造字法',
+    five_elements VARCHAR(8) COMMENT '五行',
+    wubi VARCHAR(32) COMMENT '五笔',
+    cangjie VARCHAR(32) COMMENT '仓颉',
+    extra_z MEDIUMBLOB COMMENT 'zlib 压缩的其余板块（基本信息全文/概述/翻译/字源字形/注释）',
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP COMMENT '创建时间',
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP COMMENT '更新时间',
+    UNIQUE KEY uniq_character (`character`),
+    UNIQUE KEY uniq_unicode (unicode_decimal),
+    INDEX idx_radical_strokes (radical, total_strokes),
+    INDEX idx_total_strokes (total_strokes),
+    INDEX idx_structure (structure)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COMMENT='汉字（规范化布局）';
+"""
+
+CREATE_READING_SQL = """
+CREATE TABLE IF NOT EXISTS hanzi_reading (
+    id INT AUTO_INCREMENT PRIMARY KEY,
+    character_id INT NOT NULL,
+    source ENUM('basic','yisi','guoyu','liangan') NOT NULL COMMENT '来源板块',
+    pinyin VARCHAR(32) COLLATE utf8mb4_bin NOT NULL COMMENT '带声调拼音',
+    pinyin_plain VARCHAR(32) NOT NULL COMMENT '去声调拼音（ü 记作 v）',
+    zhuyin VARCHAR(32) COMMENT '注音',
+    UNIQUE KEY uniq_reading (character_id, source, pinyin),
+    INDEX idx_pinyin (pinyin),
+    INDEX idx_pinyin_plain (pinyin_plain),
+    CONSTRAINT fk_reading_character FOREIGN KEY (character_id) REFERENCES hanzi_character(id) ON DELETE CASCADE
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COMMENT='汉字读音';
+"""
+
+CREATE_EXPLANATION_SQL = """
+CREATE TABLE IF NOT EXISTS hanzi_explanation (
+    id INT AUTO_INCREMENT PRIMARY KEY,
+    character_id INT NOT NULL,
+    source ENUM('yisi_basic','yisi_detail','guoyu','liangan') NOT NULL COMMENT '来源板块',
+    seq SMALLINT NOT NULL COMMENT '板块内序号',
+    pinyin VARCHAR(32) COLLATE utf8mb4_bin COMMENT '所属读音',
+    cixing VARCHAR(20) COMMENT '词性',
+    content_z BLOB COMMENT 'zlib 压缩的释义条目（JSON）',
+    UNIQUE KEY uniq_explanation (character_id, source, seq),
+    INDEX idx_pinyin (pinyin),
+    CONSTRAINT fk_explanation_character FOREIGN KEY (character_id) REFERENCES hanzi_character(id) ON DELETE CASCADE
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COMMENT='汉字释义（正文压缩）';
+"""
+
+CREATE_NORMALIZED_SQL = [CREATE_CHARACTER_SQL, CREATE_READING_SQL, CREATE_EXPLANATION_SQL]
+
+# 带声调拼音必须按二进制比较：默认的 *_ai_ci 排序规则下 hǎo 与 hào 相等，多音字的第二个读音会被唯一键吞掉。
+# 早期建的表没有声明排序规则，由 create_table_hanzi_normalized.py 按此列表迁移：(表, 列, 迁移 DDL)
+BINARY_COLLATION_COLUMNS = [
+    ("hanzi_reading", "pinyin",
+     "ALTER TABLE hanzi_reading MODIFY pinyin VARCHAR(32) COLLATE utf8mb4_bin NOT NULL COMMENT '带声调拼音'"),
+    ("hanzi_explanation", "pinyin",
+     "ALTER TABLE hanzi_explanation MODIFY pinyin VARCHAR(32) COLLATE utf8mb4_bin COMMENT '所属读音'"),
+]
+
+# SQLite 存储后端（common/storage.py）使用的等价建表语句
+SQLITE_NORMALIZED_SQL = [
+    """
+    CREATE TABLE IF NOT EXISTS hanzi_character (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        `character` TEXT NOT NULL UNIQUE,
+        unicode_decimal INTEGER NOT NULL UNIQUE,
+        url TEXT,
+        radical TEXT,
+        total_strokes INTEGER,
+        structure TEXT,
+        formation_method TEXT,
+        five_elements TEXT,
+        wubi TEXT,
+        cangjie TEXT,
+        extra_z BLOB,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    );
+    CREATE INDEX IF NOT EXISTS idx_radical_strokes ON hanzi_character (radical, total_strokes);
+    CREATE INDEX IF NOT EXISTS idx_total_strokes ON hanzi_character (total_strokes);
+    CREATE INDEX IF NOT EXISTS idx_structure ON hanzi_character (structure);
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS hanzi_reading (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        character_id INTEGER NOT NULL REFERENCES hanzi_character(id) ON DELETE CASCADE,
+        source TEXT NOT NULL CHECK (source IN ('basic', 'yisi', 'guoyu', 'liangan')),
+        pinyin TEXT NOT NULL,
+        pinyin_plain TEXT NOT NULL,
+        zhuyin TEXT,
+        UNIQUE (character_id, source, pinyin)
+    );
+    CREATE INDEX IF NOT EXISTS idx_reading_pinyin ON hanzi_reading (pinyin);
+    CREATE INDEX IF NOT EXISTS idx_reading_pinyin_plain ON hanzi_reading (pinyin_plain);
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS hanzi_explanation (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        character_id INTEGER NOT NULL REFERENCES hanzi_character(id) ON DELETE CASCADE,
+        source TEXT NOT NULL CHECK (source IN ('yisi_basic', 'yisi_detail', 'guoyu', 'liangan')),
+        seq INTEGER NOT NULL,
+        pinyin TEXT,
+        cixing TEXT,
+        content_z BLOB,
+        UNIQUE (character_id, source, seq)
+    );
+    CREATE INDEX IF NOT EXISTS idx_explanation_pinyin ON hanzi_explanation (pinyin);
+    """,
+]
+
+CHARACTER_UPSERT_SQL = """
+INSERT INTO hanzi_character
+(`character`, unicode_decimal, url, radical, total_strokes, structure,
+ formation_method, five_elements, wubi, cangjie, extra_z)
+VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+ON DUPLICATE KEY UPDATE
+unicode_decimal = VALUES(unicode_decimal),
+url = VALUES(url),
+radical = VALUES(radical),
+total_strokes = VALUES(total_strokes),
+structure = VALUES(structure),
+formation_method = VALUES(formation_method),
+five_elements = VALUES(five_elements),
+wubi = VALUES(wubi),
+cangjie = VALUES(cangjie),
+extra_z = VALUES(extra_z),
+updated_at = CURRENT_TIMESTAMP
+"""
+
+READING_INSERT_SQL = (
+    "INSERT IGNORE INTO hanzi_reading (character_id, source, pinyin, pinyin_plain, zhuyin) "
+    "VALUES (%s, %s, %s, %s, %s)"
+)
+
+EXPLANATION_INSERT_SQL = (
+    "INSERT INTO hanzi_explanation (character_id, source, seq, pinyin, cixing, content_z) "
+    "VALUES (%s, %s, %s, %s, %s, %s)"
+)
+
+
+# ================= 压缩 =================
+
+def compress_json(obj):
+    """JSON 序列化后 zlib 压缩，返回 bytes。"""
+    return zlib.compress(fast_json.dumps(obj).encode('utf-8'), COMPRESS_LEVEL)
+
+
+def decompress_json(blob):
+    """compress_json 的逆操作。"""
+    if not blob:
+        return None
+    return json.loads(zlib.decompress(blob).decode('utf-8'))
+
+
+# ================= 数据转换 =================
+
+def plain_pinyin(pinyin):
+    """去掉声调：'wáng' -> 'wang'，'lǜ' -> 'lv'。"""
+    if not pinyin:
+        return ''
+    text = unicodedata.normalize('NFD', pinyin.replace('ü', 'v').replace('ǖ', 'v')
+                                 .replace('ǘ', 'v').replace('ǚ', 'v').replace('ǜ', 'v'))
+    return ''.join(ch for ch in text if not unicodedata.combining(ch)).strip().lower()
+
+
+def _first_int(text):
+    match = re.search(r'\d+', text or '')
+    return int(match.group(0)) if match else None
+
+
+def _section_data(character_data, key):
+    section = character_data.get(key) or {}
+    if not isinstance(section, dict) or 'error' in section:
+        return {}
+    return section.get('data') or {}
+
+
+def normalize_character_data(character_data):
+    """
+    把 extract_all_character_data 的结果拆成规范化行。
+
+    Returns:
+        dict | None: {'character': 参数元组, 'readings': [...], 'explanations': [...]}；
+        没有基本信息（或为错误记录）时返回 None
+    """
+    if 'error' in character_data:
+        return None
+    basic = _section_data(character_data, 'basic_info')
+    character = basic.get('character')
+    if not character:
+        return None
+
+    radical = ((basic.get('bushou_detail') or {}).get('text') or basic.get('bushou') or '').strip()
+    if len(radical) > 1 and radical.endswith('部'):
+        radical = radical[:-1]
+    radical = radical[:8] or None
+    strokes = _first_int((basic.get('total_strokes') or {}).get('text')) or _first_int(basic.get('bihua_count'))
+
+    yisi = _section_data(character_data, 'yisi_info')
+    guoyu = _section_data(character_data, 'guoyu_info')
+    liangan = _section_data(character_data, 'liangan_info')
+
+    extra = {
+        'basic': basic,
+        'gaishu': _section_data(character_data, 'gaishu_info'),
+        'fanyi': _section_data(character_data, 'fanyi_info'),
+        'evolution': character_data.get('evolution_data') or [],
+        'notes': {'guoyu': guoyu.get('notes', ''), 'liangan': liangan.get('notes', '')},
+    }
+
+    character_row = (
+        character,
+        character_data.get('unicode_decimal'),
+        character_data.get('url', ''),
+        radical,
+        strokes,
+        basic.get('structure'),
+        basic.get('formation_method'),
+        basic.get('five_elements'),
+        basic.get('wubi'),
+        basic.get('cangjie'),
+        compress_json(extra),
+    )
+
+    readings = []
+    seen = set()
+
+    def add_reading(source, info):
+        pinyin = (info or {}).get('pinyin', '').strip()
+        if not pinyin or (source, pinyin) in seen:
+            return
+        seen.add((source, pinyin))
+        readings.append((source, pinyin[:32], plain_pinyin(pinyin)[:32], (info.get('zhuyin') or '')[:32]))
+
+    for info in basic.get('pinyin_info', []) or []:
+        add_reading('basic', info)
+
+    explanations = []
+    next_seq = {}
+
+    def add_explanation(source, pinyin, cixing, entry):
+        seq = next_seq.get(source, 0)
+        next_seq[source] = seq + 1
+        explanations.append((source, seq, (pinyin or '')[:32] or None, (cixing or '')[:20] or None,
+                             compress_json(entry)))
+
+    for block in yisi.get('explanations', []) or []:
+        pinyin = (block.get('pinyin_info') or {}).get('pinyin')
+        add_reading('yisi', block.get('pinyin_info'))
+        for entry in block.get('basic_explanation', []) or []:
+            add_explanation('yisi_basic', pinyin, None, entry)
+        for entry in block.get('detailed_explanation', []) or []:
+            add_explanation('yisi_detail', pinyin, entry.get('cixing'), entry)
+
+    for source, section in (('guoyu', guoyu), ('liangan', liangan)):
+        for block in section.get('main_content', []) or []:
+            pinyin = (block.get('pinyin_info') or {}).get('pinyin')
+            add_reading(source, block.get('pinyin_info'))
+            for entry in block.get('detailed_explanations', []) or []:
+                add_explanation(source, pinyin, entry.get('cixing'), entry)
+
+    return {'character': character_row, 'readings': readings, 'explanations': explanations}
+
+
+# ================= 写入 =================
+
+def write_normalized_rows(cursor, batch):
+    """
+    在调用方的事务中写入一批汉字的规范化行（不 commit）。
+
+    同一汉字重复写入时先删除旧的读音/释义再插入，保证与最新抓取结果一致。
+    返回 `(written_items, nbytes)`，错误记录与缺少基本信息的记录会被跳过。
+    """
+    normalized = []
+    for item in batch:
+        rows = normalize_character_data(item)
+        if rows:
+            normalized.append((item, rows))
+    if not normalized:
+        return [], 0
+
+    character_rows = [rows['character'] for _, rows in normalized]
+    cursor.executemany(CHARACTER_UPSERT_SQL, character_rows)
+
+    characters = [row[0] for row in character_rows]
+    placeholders = ','.join(['%s'] * len(characters))
+    cursor.execute(f"SELECT id, `character` FROM hanzi_character WHERE `character` IN ({placeholders})", characters)
+    id_map = {r['character']: r['id'] for r in cursor.fetchall()}
+    ids = list(id_map.values())
+    if not ids:
+        return [], 0
+    id_placeholders = ','.join(['%s'] * len(ids))
+    cursor.execute(f"DELETE FROM hanzi_reading WHERE character_id IN ({id_placeholders})", ids)
+    cursor.execute(f"DELETE FROM hanzi_explanation WHERE character_id IN ({id_placeholders})", ids)
+
+    reading_rows, explanation_rows = [], []
+    for _, rows in normalized:
+        cid = id_map.get(rows['character'][0])
+        if cid is None:
+            continue
+        reading_rows.extend((cid,) + r for r in rows['readings'])
+        explanation_rows.extend((cid,) + e for e in rows['explanations'])
+    if reading_rows:
+        cursor.executemany(READING_INSERT_SQL, reading_rows)
+    if explanation_rows:
+        cursor.executemany(EXPLANATION_INSERT_SQL, explanation_rows)
+
+    nbytes = sum(len(r[-1]) for r in character_rows) + sum(len(e[-1]) for e in explanation_rows)
+    nbytes += sum(len(''.join(r[1:]).encode('utf-8')) for r in reading_rows)
+    return [item for item, _ in normalized], nbytes
@@ -0,0 +1,328 @@
+# -*- coding: utf-8 -*-
+"""把 MySQL 中已爬取的属性与近/反义关系批量回写到 Neo4j：`sync_to_neo4j.py`
+
+爬取的起点是 Neo4j 中的 Idiom / Word 节点，但爬到的拼音、感情色彩、释义以及近义词、反义词
+只写进了 MySQL。本脚本分两个阶段回写：
+
+ 1. 节点属性：按 (updated_at, id) 顺序（keyset）读取已爬取的行（url 非空），每批一条
+    `UNWIND $rows AS row MERGE (n:Label {name: row.name}) SET n += row.props` 事务；
+ 2. 关系：按 id 顺序读取 *_relation 表并关联出两端名称，每批一条
+    `UNWIND ... MATCH (a) MATCH (b) MERGE (a)-[:SYNONYM]-(b)` 事务（端点不存在时跳过，不制造孤立节点），
+    新建的边记下 MySQL 中的关系 id（r.mysql_id）；
+ 3. 清理（PRUNE_RELATIONS）：带 mysql_id、但 MySQL 中已不存在的关系（手工删除或随基础行级联删除）从 Neo4j 删除。
+
+每批一次往返，吞吐以 rows/s 计；MERGE + SET 保证重复执行结果不变（幂等）。
+每批提交后把水位写入状态文件，中断后再次运行从断点继续，之后每次运行都是增量同步：
+ - 节点以 updated_at 为变化标记：增量复查（recrawl.py）或重新写库改变了内容的行会刷新 updated_at，
+   下次运行重新推送；内容未变化的复查只更新 checked_at，不会重复推送。
+   只同步 updated_at 早于数据库当前时间 SYNC_SETTLE_SECONDS 秒的行，写库事务尚未提交的行留到下次，水位不会越过它们；
+ - 关系行只增不改（INSERT IGNORE），新关系总有更大的 id，按 id 续传即可；删除由第 3 步处理。
+   同步前 Neo4j 中已有的同名关系不带 mysql_id，不会被清理。
+`RESET_STATE = True` 忽略水位全量重推（如手工改库且未更新 updated_at 时）。
+启动时会为 name 创建唯一约束（已有重复 name 时退化为普通索引），保证 MERGE / MATCH 走索引。
+
+用法：
+    python sync_to_neo4j.py
+"""
+import datetime
+import importlib
+import json
+import os
+import time
+
+TARGET_SOURCE = 'chengyu'  # 'chengyu' 或 'ciyu'
+SYNC_BATCH_SIZE = 1000     # 每个 UNWIND 事务的行数
+SYNC_NODES = True          # 是否回写节点属性
+SYNC_RELATIONS = True      # 是否回写 SYNONYM / ANTONYM 关系
+RESET_STATE = False        # True 时忽略断点，从头同步（增量复查改动的行会按 updated_at 自动重推，通常不需要）
+SYNC_SETTLE_SECONDS = 60   # 只同步 updated_at 早于数据库当前时间该秒数的行（尚未提交的写库事务留到下次）
+PRUNE_RELATIONS = True     # 删除本脚本创建、但 MySQL 中已不存在的关系
+STATE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'neo4j_sync_state.json')
+# =======================================================================
+
+SOURCES = {
+    'chengyu': {
+        'mysql_module': 'chengyu.chengyu_mysql',
+        'neo4j_module': 'chengyu.chengyu_neo4j',
+        'label': 'Idiom',
+        'base_table': 'hanyuguoxue_chengyu',
+        'relation_table': 'chengyu_relation',
+        'name_column': 'chengyu',
+        'prop_columns': ['pinyin', 'zhuyin', 'emotion', 'explanation', 'translation'],
+    },
+    'ciyu': {
+        'mysql_module': 'ciyu.ciyu_mysql',
+        'neo4j_module': 'ciyu.ciyu_neo4j',
+        'label': 'Word',
+        'base_table': 'hanyuguoxue_ciyu',
+        'relation_table': 'ciyu_relation',
+        'name_column': 'word',
+        'prop_columns': ['pinyin', 'zhuyin', 'part_of_speech', 'is_common', 'definition'],
+    },
+}
+
+RELATION_TYPES = {'synonym': 'SYNONYM', 'antonym': 'ANTONYM'}
+
+
+EPOCH = '1970-01-01 00:00:00'
+
+
+def load_state(source):
+    """节点水位为 (nodes_updated_at, nodes_last_id)，关系水位为 relations_last_id。"""
+    fresh = {'nodes_updated_at': EPOCH, 'nodes_last_id': 0, 'relations_last_id': 0}
+    if RESET_STATE or not os.path.exists(STATE_PATH):
+        return fresh
+    try:
+        with open(STATE_PATH, 'r', encoding='utf-8') as f:
+            state = json.load(f).get(source) or {}
+    except Exception as e:
+        print('[WARN] 读取同步状态失败，从头开始:', e)
+        state = {}
+    if 'nodes_updated_at' not in state:
+        # 旧版状态只记录了 id 水位，无法判断哪些行之后被改过：节点重推一遍（幂等），关系水位沿用
+        return dict(fresh, relations_last_id=int(state.get('relations_last_id', 0)))
+    return {'nodes_updated_at': state['nodes_updated_at'],
+            'nodes_last_id': int(state.get('nodes_last_id', 0)),
+            'relations_last_id': int(state.get('relations_last_id', 0))}
+
+
+def save_state(source, state):
+    """原子写入状态文件（先写临时文件再替换），中途被杀也不会留下半截 JSON。"""
+    all_state = {}
+    if os.path.exists(STATE_PATH):
+        try:
+            with open(STATE_PATH, 'r', encoding='utf-8') as f:
+                all_state = json.load(f)
+        except Exception:
+            all_state = {}
+    all_state[source] = dict(state, updated_at=time.strftime('%Y-%m-%d %H:%M:%S'))
+    tmp = STATE_PATH + '.tmp'
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump(all_state, f, ensure_ascii=False, indent=2)
+    os.replace(tmp, STATE_PATH)
+
+
+def ensure_name_constraint(driver, label):
+    """为 label.name 创建唯一约束；已有重复 name 时退化为普通索引。"""
+    key = label.lower()
+    with driver.session() as session:
+        try:
+            session.run(f"CREATE CONSTRAINT {key}_name_unique IF NOT EXISTS "
+                        f"FOR (n:{label}) REQUIRE n.name IS UNIQUE").consume()
+            print(f'唯一约束 {key}_name_unique 已就绪')
+        except Exception as e:
+            print(f'[WARN] 无法创建 {label}.name 唯一约束（可能存在重复 name），改建普通索引: {e}')
+            session.run(f"CREATE INDEX {key}_name IF NOT EXISTS FOR (n:{label}) ON (n.name)").consume()
+
+
+def ensure_relation_indexes(driver):
+    """为各关系类型的 mysql_id 建索引，清理时按 mysql_id 定位边（Neo4j 4.3 起支持关系属性索引）。"""
+    with driver.session() as session:
+        for rel_type in RELATION_TYPES.values():
+            try:
+                session.run(f"CREATE INDEX {rel_type.lower()}_mysql_id IF NOT EXISTS "
+                            f"FOR ()-[r:{rel_type}]-() ON (r.mysql_id)").consume()
+            except Exception as e:
+                print(f'[WARN] 无法为 {rel_type}.mysql_id 建索引，清理关系时将逐边扫描: {e}')
+
+
+def _write_rows(driver, query, rows):
+    """在一个写事务中执行 UNWIND 查询（瞬时错误由驱动自动重试），返回 summary counters。"""
+    def work(tx):
+        return tx.run(query, rows=rows).consume().counters
+
+    with driver.session() as session:
+        return session.execute_write(work)
+
+
+def _ts(value):
+    """TIMESTAMP 列的值（pymysql 为 datetime，SQLite 为字符串）统一成 'YYYY-MM-DD HH:MM:SS'。"""
+    if isinstance(value, datetime.datetime):
+        return value.strftime('%Y-%m-%d %H:%M:%S')
+    return str(value)[:19]
+
+
+def _settled_before(conn):
+    """返回数据库当前时间减去 SYNC_SETTLE_SECONDS（用数据库时钟，避免与本机时钟偏差）。"""
+    cur = conn.cursor()
+    cur.execute("SELECT CURRENT_TIMESTAMP AS now")
+    now = cur.fetchone()['now']
+    if not isinstance(now, datetime.datetime):
+        now = datetime.datetime.strptime(_ts(now), '%Y-%m-%d %H:%M:%S')
+    return _ts(now - datetime.timedelta(seconds=SYNC_SETTLE_SECONDS))
+
+
+def _iter_batches(conn, sql, params, position, batch_size):
+    """按 keyset 分页读取 MySQL，每次返回一批 dict 行；params(position, batch_size) 给出查询参数，position 为上一批的最后一行。"""
+    cur = conn.cursor()
+    while True:
+        cur.execute(sql, params(position, batch_size))
+        rows = cur.fetchall()
+        if not rows:
+            return
+        yield rows
+        position = rows[-1]
+
+
+def sync_nodes(conn, driver, cfg, state, source, batch_size=SYNC_BATCH_SIZE):
+    cols = ', '.join(f'`{c}`' for c in cfg['prop_columns'])
+    # 按 (updated_at, id) 续传；需要 updated_at 索引（create_table_*.py 会补建）
+    sql = (f"SELECT id, `{cfg['name_column']}` AS name, {cols}, updated_at FROM {cfg['base_table']} "
+           "WHERE url IS NOT NULL AND updated_at <= %s "
+           "AND (updated_at > %s OR (updated_at = %s AND id > %s)) "
+           "ORDER BY updated_at, id LIMIT %s")
+    settled = _settled_before(conn)
+
+    def params(last, n):
+        updated_at = _ts(last['updated_at'])
+        return settled, updated_at, updated_at, last['id'], n
+    query = (f"UNWIND $rows AS row "
+             f"MERGE (n:{cfg['label']} {{name: row.name}}) "
+             "SET n += row.props, n.mysql_id = row.id, n.synced_at = datetime()")
+    total = 0
+    props_set = 0
+    t0 = time.perf_counter()
+    start = {'updated_at': state['nodes_updated_at'], 'id': state['nodes_last_id']}
+    for rows in _iter_batches(conn, sql, params, start, batch_size):
+        payload = []
+        for r in rows:
+            props = {c: r[c] for c in cfg['prop_columns'] if r.get(c) not in (None, '')}
+            payload.append({'id': r['id'], 'name': r['name'], 'props': props})
+        counters = _write_rows(driver, query, payload)
+        total += len(rows)
+        props_set += counters.properties_set
+        state['nodes_updated_at'] = _ts(rows[-1]['updated_at'])
+        state['nodes_last_id'] = rows[-1]['id']
+        save_state(source, state)
+        elapsed = time.perf_counter() - t0
+        print(f'  节点: 已同步 {total} 行（updated_at ≤ {state["nodes_updated_at"]}），{total / elapsed:.0f} rows/s')
+    elapsed = time.perf_counter() - t0
+    print(f'节点属性同步完成：{total} 行，设置属性 {props_set} 个，耗时 {elapsed:.1f}s'
+          + (f'，{total / elapsed:.0f} rows/s' if elapsed > 0 and total else ''))
+    return total
+
+
+def sync_relations(conn, driver, cfg, state, source, batch_size=SYNC_BATCH_SIZE):
+    name_col = cfg['name_column']
+    sql = (f"SELECT r.id, r.relation_type, a.`{name_col}` AS a, b.`{name_col}` AS b "
+           f"FROM {cfg['relation_table']} r "
+           f"JOIN {cfg['base_table']} a ON a.id = r.min_id "
+           f"JOIN {cfg['base_table']} b ON b.id = r.max_id "
+           "WHERE r.id > %s ORDER BY r.id LIMIT %s")
+    label = cfg['label']
+    # 关系类型不能参数化，按类型各用一条查询；无向 MERGE 不论方向都只保留一条边
+    queries = {
+        rel: (f"UNWIND $rows AS row "
+              f"MATCH (a:{label} {{name: row.a}}) MATCH (b:{label} {{name: row.b}}) "
+              f"MERGE (a)-[r:{rel_type}]-(b) ON CREATE SET r.mysql_id = row.id")
+        for rel, rel_type in RELATION_TYPES.items()
+    }
+    total = 0
+    created = 0
+    t0 = time.perf_counter()
+    def params(last, n):
+        return last['id'], n
+
+    for rows in _iter_batches(conn, sql, params, {'id': state['relations_last_id']}, batch_size):
+        grouped = {}
+        for r in rows:
+            grouped.setdefault(r['relation_type'], []).append({'id': r['id'], 'a': r['a'], 'b': r['b']})
+        for rel, payload in grouped.items():
+            if rel not in queries:
+                continue
+            created += _write_rows(driver, queries[rel], payload).relationships_created
+        total += len(rows)
+        state['relations_last_id'] = rows[-1]['id']
+        save_state(source, state)
+        elapsed = time.perf_counter() - t0
+        print(f'  关系: 已同步 {total} 行（id ≤ {state["relations_last_id"]}），{total / elapsed:.0f} rows/s')
+    elapsed = time.perf_counter() - t0
+    print(f'关系同步完成：{total} 行，新建关系 {created} 条，耗时 {elapsed:.1f}s'
+          + (f'，{total / elapsed:.0f} rows/s' if elapsed > 0 and total else ''))
+    return total
+
+
+def _stale_relation_ids(conn, driver, cfg, batch_size):
+    """Neo4j 中带 mysql_id 的关系与 MySQL 关系表按 id 有序归并，返回 MySQL 中已不存在的 mysql_id 列表。"""
+    label = cfg['label']
+    types = '|'.join(RELATION_TYPES.values())
+    with driver.session() as session:
+        neo_ids = [record['id'] for record in session.run(
+            f"MATCH (:{label})-[r:{types}]->(:{label}) WHERE r.mysql_id IS NOT NULL "
+            "RETURN r.mysql_id AS id ORDER BY id")]
+    sql = f"SELECT id FROM {cfg['relation_table']} WHERE id > %s ORDER BY id LIMIT %s"
+    stale = []
+    i = 0
+    for rows in _iter_batches(conn, sql, lambda last, n: (last['id'], n), {'id': 0}, batch_size):
+        for r in rows:
+            while i < len(neo_ids) and neo_ids[i] < r['id']:
+                stale.append(neo_ids[i])
+                i += 1
+            while i < len(neo_ids) and neo_ids[i] == r['id']:
+                i += 1
+        if i >= len(neo_ids):
+            break
+    stale.extend(neo_ids[i:])
+    return stale
+
+
+def prune_relations(conn, driver, cfg, batch_size=SYNC_BATCH_SIZE):
+    """删除本脚本创建（带 mysql_id）、但 MySQL 中已不存在的关系，返回删除的条数。"""
+    t0 = time.perf_counter()
+    stale = _stale_relation_ids(conn, driver, cfg, batch_size)
+    label = cfg['label']
+    types = '|'.join(RELATION_TYPES.values())
+    query = (f"UNWIND $rows AS id "
+             f"MATCH (:{label})-[r:{types} {{mysql_id: id}}]->(:{label}) DELETE r")
+    deleted = 0
+    for i in range(0, len(stale), batch_size):
+        deleted += _write_rows(driver, query, stale[i:i + batch_size]).relationships_deleted
+    print(f'关系清理完成：MySQL 中已删除的关系 {len(stale)} 条，从 Neo4j 删除 {deleted} 条，'
+          f'耗时 {time.perf_counter() - t0:.1f}s')
+    return deleted
+
+
+def main(source=TARGET_SOURCE):
+    if source not in SOURCES:
+        print('未知的数据源:', source)
+        return 2
+    cfg = SOURCES[source]
+    mysql_mod = importlib.import_module(cfg['mysql_module'])
+    neo4j_mod = importlib.import_module(cfg['neo4j_module'])
+
+    conn = mysql_mod.get_database_connection()
+    if not conn:
+        print('无法连接到数据库，退出')
+        return 2
+    driver = neo4j_mod._get_driver()
+    state = load_state(source)
+    print(f'开始同步 {source} -> Neo4j:{cfg["label"]}，断点: {state}')
+    try:
+        ensure_name_constraint(driver, cfg['label'])
+        if SYNC_NODES:
+            sync_nodes(conn, driver, cfg, state, source)
+        if SYNC_RELATIONS:
+            sync_relations(conn, driver, cfg, state, source)
+            if PRUNE_RELATIONS:
+                ensure_relation_indexes(driver)
+                prune_relations(conn, driver, cfg)
+        return 0
+    except KeyboardInterrupt:
+        print('收到中断信号，已提交的批次已记录到', STATE_PATH, '，下次运行将继续。')
+        return 130
+    except Exception as e:
+        print('同步失败:', e, '；已提交的批次已记录，修复后重新运行即可继续。')
+        return 3
+    finally:
+        try:
+            driver.close()
+        except Exception:
+            pass
+        try:
+            conn.close()
+        except Exception:
+            pass
+
+
+if __name__ == '__main__':
+    exit(main())